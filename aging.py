@@ -0,0 +1,249 @@
+"""
+Motor de antigüedad de mora (aging) para cualquier fecha de corte.
+
+El notebook calcula el rango de días con `hoy = pd.Timestamp.now()` fila por fila, y los
+scripts de cruce lo aproximan por cantidad de cuotas. Aquí cada cuota pendiente se guarda
+una sola vez como día de vencimiento (int32, días desde 1970-01-01) en un arreglo ordenado,
+con el monto acumulado al lado. Para un corte C y un rango [desde, hasta] de días de mora,
+las cuotas del rango son las que vencen entre C - hasta y C - desde: dos `searchsorted`
+dan los límites y la diferencia del acumulado da el monto. Una serie de cortes se resuelve
+en una sola llamada (matriz cortes × bordes).
+
+Las cuotas que aún no vencen en la fecha de corte no entran en ningún rango; se informan
+aparte como "Por vencer" (el notebook las ponía en 0-30 al recortar los días a 0).
+
+Entradas:
+- BasesDeDatos-CUOTAS.xlsx (hoja BD CuotasPendientes, estado PEN)
+  o, si no existe, RECUPERACION_DE_MORA.csv
+
+Salida (al ejecutarlo directamente):
+- sep/Aging_por_corte.xlsx  (hojas Aging_largo y Aging_montos)
+
+Ejecutar:
+    python aging.py                                  # fin de cada mes con cuotas vencidas
+    python aging.py --corte 2025-12-31 2026-01-31    # cortes puntuales
+    python aging.py --bordes 0,31,61,91,121,181      # rangos configurables
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fuentes import iterar_cuotas, leer_fuente
+
+BASE_DIR = Path(__file__).parent
+
+ARCHIVO_CUOTAS = BASE_DIR / "BasesDeDatos-CUOTAS.xlsx"
+CSV_MORA = BASE_DIR / "RECUPERACION_DE_MORA.csv"
+OUT_AGING = BASE_DIR / "sep" / "Aging_por_corte.xlsx"
+
+# Límite inferior (en días de mora) de cada rango; el último rango queda abierto.
+BORDES = (0, 31, 61, 91, 121)
+POR_VENCER = "Por vencer"
+
+_EPOCA = np.datetime64("1970-01-01", "D")
+
+
+def a_dias(fechas) -> np.ndarray:
+    """Fechas → días desde 1970-01-01 (int64; los NaT quedan como el mínimo de int64)."""
+    f = pd.to_datetime(pd.Series(fechas), errors="coerce").to_numpy(dtype="datetime64[D]")
+    return f.astype("int64")
+
+
+def etiquetas_rangos(bordes=BORDES) -> list[str]:
+    """Etiquetas en el formato del reporte: 'de 0 a 30', ..., 'mas de 121 días'."""
+    bordes = list(bordes)
+    etiq = [f"de {a} a {b - 1}" for a, b in zip(bordes[:-1], bordes[1:])]
+    return etiq + [f"mas de {bordes[-1]} días"]
+
+
+def fines_de_mes(inicio, fin) -> pd.DatetimeIndex:
+    """Último día de cada mes entre inicio y fin (ambos incluidos)."""
+    ini = pd.Timestamp(inicio).to_period("M")
+    ult = pd.Timestamp(fin).to_period("M")
+    return pd.period_range(ini, ult, freq="M").to_timestamp(how="end").normalize()
+
+
+class MotorAging:
+    """Cuotas pendientes ordenadas por vencimiento, listas para consultar cualquier corte."""
+
+    def __init__(self, vencimientos, montos, socios, bordes=BORDES):
+        dias = a_dias(vencimientos)
+        ok = dias != np.iinfo("int64").min
+        orden = np.argsort(dias[ok], kind="stable")
+
+        self.dias = dias[ok][orden].astype("int32")
+        monto = np.asarray(montos, dtype="float64")[ok][orden]
+        self.acumulado = np.r_[0.0, np.cumsum(monto)]
+        cod, self.socios = pd.factorize(pd.Series(socios)[ok].to_numpy()[orden])
+        self.socio_cod = cod.astype("int64")
+        self.sin_fecha = int((~ok).sum())
+        self.bordes = np.asarray(bordes, dtype="int64")
+        if len(self.bordes) == 0 or self.bordes[0] != 0 or np.any(np.diff(self.bordes) <= 0):
+            raise ValueError(f"Los bordes deben empezar en 0 y ser crecientes: {list(bordes)}")
+
+        # Posición anterior del mismo socio en el arreglo ordenado (-1 si es la primera).
+        # Socios distintos en [lo, hi) = posiciones i de ese tramo con anterior[i] < lo.
+        n = len(self.dias)
+        por_socio = np.lexsort((np.arange(n), self.socio_cod))
+        mismo = np.r_[False, self.socio_cod[por_socio][1:] == self.socio_cod[por_socio][:-1]]
+        self.anterior = np.full(n, -1, dtype="int64")
+        self.anterior[por_socio[1:][mismo[1:]]] = por_socio[:-1][mismo[1:]]
+        # Árbol de mezcla sobre `anterior`: en el nivel k, claves (bloque de 2^k posiciones, anterior + 1)
+        # ordenadas; el prefijo [0, hi) se arma con un bloque por cada bit encendido de hi
+        pos = np.arange(n, dtype="int64")
+        self._niveles = [np.sort((pos >> k) * (n + 1) + self.anterior + 1) for k in range(n.bit_length())]
+        # Primer vencimiento de cada socio (ordenado): socios en mora al corte con un searchsorted
+        self.primer_venc = np.sort(self.dias[self.anterior == -1])
+
+    @classmethod
+    def desde_tabla(cls, df: pd.DataFrame, col_fecha: str, col_monto: str, col_socio: str, bordes=BORDES) -> "MotorAging":
+        return cls(df[col_fecha], pd.to_numeric(df[col_monto], errors="coerce").fillna(0.0), df[col_socio], bordes=bordes)
+
+    def __len__(self) -> int:
+        return len(self.dias)
+
+    def _limites(self, cortes: np.ndarray) -> np.ndarray:
+        """Posiciones en el arreglo ordenado: columna j = cuotas con vencimiento <= corte - borde j."""
+        # Vence en (C - hasta, C - desde]  ⇔  días de mora en [desde, hasta)
+        tope = cortes[:, None] - self.bordes[None, :]
+        return np.searchsorted(self.dias, tope, side="right")
+
+    def serie(self, cortes) -> pd.DataFrame:
+        """Aging de todos los cortes en formato largo: Fecha_corte, Rango, Monto, Cuotas, Socios."""
+        fechas = pd.to_datetime(pd.Series(cortes)).dt.normalize()
+        c = a_dias(fechas)
+        lim = self._limites(c)  # (cortes, rangos): lim[:, 0] = vencidas al corte
+        n_total = len(self.dias)
+        # Rango j: posiciones [lim[:, j+1], lim[:, j]) ; el último rango va desde 0
+        hi = lim
+        lo = np.c_[lim[:, 1:], np.zeros(len(c), dtype=lim.dtype)]
+        montos = self.acumulado[hi] - self.acumulado[lo]
+        cuotas = hi - lo
+        # Por vencer: posiciones [lim[:, 0], n)
+        monto_pv = self.acumulado[-1] - self.acumulado[lim[:, 0]]
+        cuotas_pv = n_total - lim[:, 0]
+
+        socios = self._socios_distintos(lo, hi)
+        socios_pv = self._socios_distintos(lim[:, :1], np.full((len(c), 1), n_total))[:, 0]
+
+        etiquetas = etiquetas_rangos(self.bordes)
+        filas = len(c) * (len(etiquetas) + 1)
+        out = pd.DataFrame(
+            {
+                "Fecha_corte": np.repeat(fechas.to_numpy(), len(etiquetas) + 1),
+                "Rango": np.tile(etiquetas + [POR_VENCER], len(c)),
+                "Orden": np.tile(np.arange(1, len(etiquetas) + 2), len(c)),
+                "Monto": np.c_[montos, monto_pv].reshape(filas).round(2),
+                "Cuotas": np.c_[cuotas, cuotas_pv].reshape(filas).astype("int64"),
+                "Socios": np.c_[socios, socios_pv].reshape(filas).astype("int64"),
+            }
+        )
+        return out
+
+    def _socios_distintos(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Socios distintos en cada tramo [lo, hi) del arreglo ordenado.
+
+        Cuenta las posiciones i < hi con anterior[i] < lo (las i < lo cumplen siempre, se restan):
+        un searchsorted por nivel del árbol sobre todos los tramos de todos los cortes a la vez.
+        """
+        lo = np.asarray(lo, dtype="int64")
+        hi = np.asarray(hi, dtype="int64")
+        ancho = len(self.dias) + 1
+        cuenta = np.zeros(lo.shape, dtype="int64")
+        for k, claves in enumerate(self._niveles):
+            # Bit k de hi encendido: el prefijo [0, hi) incluye el bloque (hi >> k) - 1 del nivel k
+            bloque = (hi >> k) - 1
+            dentro = np.searchsorted(claves, bloque * ancho + lo + 1, side="left") - (bloque << k)
+            cuenta += np.where((hi >> k) & 1 == 1, dentro, 0)
+        return np.maximum(cuenta - lo, 0)
+
+    def socios_en_mora(self, cortes) -> np.ndarray:
+        """Socios con al menos una cuota vencida a cada fecha de corte."""
+        return np.searchsorted(self.primer_venc, a_dias(cortes), side="right")
+
+    def al_corte(self, corte) -> pd.DataFrame:
+        """Aging de una sola fecha de corte (una fila por rango + Por vencer)."""
+        return self.serie([corte]).drop(columns="Fecha_corte")
+
+    def por_socio(self, corte) -> pd.DataFrame:
+        """Monto por socio y rango a una fecha de corte (formato ancho, como RECUPERACION_DE_MORA)."""
+        c = a_dias([corte])[0]
+        vencidas = np.searchsorted(self.dias, c, side="right")
+        dias_mora = c - self.dias[:vencidas].astype("int64")
+        rango = np.searchsorted(self.bordes, dias_mora, side="right") - 1
+        monto = np.diff(self.acumulado[: vencidas + 1])
+        etiquetas = etiquetas_rangos(self.bordes)
+        n_socios = max(len(self.socios), 1)
+        clave = self.socio_cod[:vencidas] * len(etiquetas) + rango
+        tabla = np.bincount(clave, weights=monto, minlength=n_socios * len(etiquetas)).reshape(n_socios, len(etiquetas))
+        out = pd.DataFrame(tabla.round(2), columns=etiquetas)
+        out.insert(0, "Codigo_socio", np.asarray(self.socios))
+        out["Total"] = out[etiquetas].sum(axis=1).round(2)
+        return out[out["Total"] > 0].reset_index(drop=True)
+
+
+def cargar_cuotas_pendientes() -> pd.DataFrame:
+    """Cuotas PEN con fecha de vencimiento, monto y socio (Fecha, Monto, Codigo_socio)."""
+    if ARCHIVO_CUOTAS.exists():
+        # Por bloques y solo con las columnas necesarias (ver fuentes.py)
+        columnas = ["socio_id", "estado", "monto", "fecha_liquidacion", "anio", "mes"]
+        df = pd.concat([b[b["estado"] == "PEN"] for b in iterar_cuotas(ARCHIVO_CUOTAS, columnas)], ignore_index=True)
+        fecha = df["fecha_liquidacion"]
+        # Igual que el notebook: sin fecha_liquidacion se usa el día 1 de anio/mes
+        if fecha.isna().any():
+            aux = pd.to_datetime(
+                pd.DataFrame({"year": df["anio"], "month": df["mes"], "day": 1}), errors="coerce"
+            )
+            fecha = fecha.fillna(aux)
+        return pd.DataFrame({"Fecha": fecha, "Monto": df["monto"], "Codigo_socio": df["socio_id"]})
+
+    if CSV_MORA.exists():
+        df = leer_fuente("mora_csv", CSV_MORA, columnas=["Fecha de cuota", "VALOR", "Codigo asociado"])
+        return pd.DataFrame({"Fecha": df["Fecha de cuota"], "Monto": df["VALOR"], "Codigo_socio": df["Codigo asociado"]})
+    raise SystemExit(f"No encuentro {ARCHIVO_CUOTAS.name} ni {CSV_MORA.name}")
+
+
+def aging_a_ancho(largo: pd.DataFrame, valor: str = "Monto") -> pd.DataFrame:
+    """Una fila por fecha de corte y una columna por rango (para gráficos/Power BI)."""
+    ancho = largo.pivot_table(index="Fecha_corte", columns="Rango", values=valor, aggfunc="sum", sort=False)
+    orden = largo.drop_duplicates("Rango").sort_values("Orden")["Rango"].tolist()
+    return ancho[orden].reset_index()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Aging de cuotas pendientes por fecha de corte")
+    parser.add_argument("--corte", nargs="+", help="Fechas de corte AAAA-MM-DD (por defecto: fin de cada mes)")
+    parser.add_argument("--bordes", help="Límites inferiores de los rangos en días, p. ej. 0,31,61,91,121")
+    parser.add_argument("--salida", type=Path, default=OUT_AGING)
+    args = parser.parse_args(argv)
+
+    bordes = tuple(int(b) for b in args.bordes.split(",")) if args.bordes else BORDES
+    cuotas = cargar_cuotas_pendientes()
+    motor = MotorAging.desde_tabla(cuotas, "Fecha", "Monto", "Codigo_socio", bordes=bordes)
+    if motor.sin_fecha:
+        print(f"  Aviso: {motor.sin_fecha} cuotas sin fecha de vencimiento quedan fuera del aging.")
+
+    if args.corte:
+        cortes = pd.to_datetime(pd.Series(args.corte))
+    else:
+        primer = _EPOCA + np.timedelta64(int(motor.dias[0]), "D") if len(motor) else np.datetime64("today")
+        cortes = pd.Series(fines_de_mes(primer, pd.Timestamp.now()))
+
+    largo = motor.serie(cortes)
+    resumen = aging_a_ancho(largo, "Monto")
+    resumen["Socios_en_mora"] = motor.socios_en_mora(cortes)
+
+    args.salida.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(args.salida, engine="openpyxl") as writer:
+        largo.to_excel(writer, sheet_name="Aging_largo", index=False)
+        resumen.to_excel(writer, sheet_name="Aging_montos", index=False)
+
+    print(f"Aging calculado para {len(cortes)} cortes y {len(motor)} cuotas pendientes: {args.salida}")
+    print(resumen.tail(6).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Agregados de pagos Odoo en varios granos (día, semana ISO, mes y año) en una sola pasada.
+
+El detalle se reduce una vez a pares (día, socio) con monto y número de pagos; los granos
+superiores se obtienen de esa tabla compacta mapeando cada día a su semana/mes/año con la
+dimensión calendario. Los socios únicos se cuentan deduplicando (grano, socio), así que no
+hay doble conteo al subir de grano (un socio que paga dos días de la misma semana cuenta una vez).
+
+Cada fila guarda además `Sketch_socios` (ver sketches.py): con él se pueden fusionar
+agregados de un mes nuevo con los existentes, o subir de día a semana/mes/año, sin
+volver a leer los pagos crudos (fusionar_agregados / rollup_desde_dia).
+
+Los pagos sin socio suman monto y pagos pero no cuentan como socio único (SOCIO_COD = -1), y
+un día que no está en el calendario recibido cae en la clave 0 ("Desconocido", como en
+modelo_estrella.py) en lugar de perderse.
+
+Salida (desde preparar_odoo_comparativo.py):
+- odoo/odoo_pagos_agregados.xlsx  (hojas Agg_Pagos_Dia, Agg_Pagos_Semana, Agg_Pagos_Mes, Agg_Pagos_Anio)
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sketches import ConteoDistinto, fusionar_serializados, hash_socios, sketches_por_grupo
+
+BASE_DIR = Path(__file__).parent
+OUT_AGREGADOS = BASE_DIR / "odoo" / "odoo_pagos_agregados.xlsx"
+
+# Grano → (columna del calendario que lo identifica, atributos del calendario que se copian)
+GRANOS = {
+    "Dia": ("FECHA_KEY", ["FECHA_STR", "ANIO", "MES", "DIA", "SEMANA", "ANIO_MES"]),
+    "Semana": ("SEMANA_KEY", ["SEMANA", "ANIO_ISO", "SEMANA_ISO"]),
+    "Mes": ("ANIO_MES_KEY", ["ANIO_MES", "MES_ANIO", "ANIO", "MES", "DIAS_MES"]),
+    "Anio": ("ANIO", []),
+}
+
+
+def pares_dia_socio(det: pd.DataFrame, col_fecha_key: str, col_socio: str, col_monto: str) -> pd.DataFrame:
+    """Única pasada sobre el detalle: monto y número de pagos por (día, socio).
+
+    Los pagos sin socio quedan en su propio par con SOCIO_COD = -1 (y SOCIO_HASH 0).
+    """
+    d = det[[col_fecha_key, col_socio, col_monto]].dropna(subset=[col_fecha_key])
+    socio = d[col_socio]
+    # factorize deja -1 en los nulos (astype(str) los convertiría en un socio "nan")
+    socio_cod, socios = pd.factorize(socio.astype(str).where(socio.notna()), sort=False)
+    dia = d[col_fecha_key].astype("int64").to_numpy()
+    n_socios = len(socios) + 1
+    clave = dia * n_socios + (socio_cod + 1)
+    unicas, inv = np.unique(clave, return_inverse=True)
+    monto = np.bincount(inv, weights=d[col_monto].to_numpy(dtype="float64"), minlength=len(unicas))
+    pagos = np.bincount(inv, minlength=len(unicas))
+    socio_cod_u = (unicas % n_socios).astype("int64") - 1
+    hashes = np.zeros(len(unicas), dtype="uint64")
+    con_socio = socio_cod_u >= 0
+    if len(socios):
+        hashes[con_socio] = hash_socios(socios)[socio_cod_u[con_socio]]
+    return pd.DataFrame(
+        {
+            "FECHA_KEY": unicas // n_socios,
+            "SOCIO_COD": socio_cod_u,
+            "SOCIO_HASH": hashes,
+            "Monto_pagado": monto,
+            "Numero_pagos": pagos.astype("int64"),
+        }
+    )
+
+
+def agregar_multigrano(
+    det: pd.DataFrame,
+    cal: pd.DataFrame,
+    col_fecha_key: str = "FECHA_PAGO_KEY",
+    col_socio: str = "CONSUMIDOR",
+    col_monto: str = "MONTO",
+) -> dict[str, pd.DataFrame]:
+    """Devuelve {grano: DataFrame} con Monto_pagado, Numero_pagos y Socios_unicos por día/semana/mes/año."""
+    pares = pares_dia_socio(det, col_fecha_key, col_socio, col_monto)
+    cal_idx = cal.set_index("FECHA_KEY", drop=False)
+    n_socios = int(pares["SOCIO_COD"].max()) + 1 if len(pares) else 1
+    con_socio = (pares["SOCIO_COD"] >= 0).to_numpy()
+
+    out: dict[str, pd.DataFrame] = {}
+    for grano, (col_grano, attrs) in GRANOS.items():
+        g = _grano_de(pares["FECHA_KEY"], cal_idx[col_grano])
+        claves, inv = np.unique(g, return_inverse=True)
+        monto = np.bincount(inv, weights=pares["Monto_pagado"].to_numpy(), minlength=len(claves))
+        pagos = np.bincount(inv, weights=pares["Numero_pagos"].to_numpy(), minlength=len(claves))
+        # Socios únicos: pares (grano, socio) distintos, sin los pagos sin socio
+        gs = np.unique(g[con_socio] * n_socios + pares["SOCIO_COD"].to_numpy()[con_socio])
+        socios = np.bincount(np.searchsorted(claves, gs // n_socios), minlength=len(claves))
+
+        sketches = sketches_por_grupo(g[con_socio], pares["SOCIO_HASH"].to_numpy()[con_socio])
+
+        tabla = pd.DataFrame(
+            {
+                col_grano: claves,
+                "Monto_pagado": monto.round(2),
+                "Numero_pagos": pagos.astype("int64"),
+                "Socios_unicos": socios.astype("int64"),
+                "Sketch_socios": [sketches.get(int(k), ConteoDistinto()).serializar() for k in claves],
+            }
+        )
+        if attrs:
+            attrs_grano = cal.drop_duplicates(col_grano).set_index(col_grano)[attrs]
+            tabla = tabla.join(attrs_grano, on=col_grano)
+        out[grano] = tabla
+    return out
+
+
+def _grano_de(fecha_key: pd.Series, grano_por_dia: pd.Series) -> np.ndarray:
+    """Clave del grano para cada FECHA_KEY; los días fuera del calendario van a la clave 0."""
+    return fecha_key.map(grano_por_dia).fillna(0).astype("int64").to_numpy()
+
+
+def _sumar_tabla(tabla: pd.DataFrame, col_grano: str) -> pd.DataFrame:
+    """Colapsa filas con el mismo grano: suma montos/pagos y fusiona sketches."""
+    sumas = tabla.groupby(col_grano, sort=True)[["Monto_pagado", "Numero_pagos"]].sum()
+    sk = tabla.groupby(col_grano, sort=True)["Sketch_socios"].agg(fusionar_serializados)
+    out = sumas.join(sk).reset_index()
+    out["Monto_pagado"] = out["Monto_pagado"].round(2)
+    out["Numero_pagos"] = out["Numero_pagos"].astype("int64")
+    out["Socios_unicos"] = [ConteoDistinto.deserializar(t).estimar() for t in out["Sketch_socios"]]
+    return out[[col_grano, "Monto_pagado", "Numero_pagos", "Socios_unicos", "Sketch_socios"]]
+
+
+def rollup_desde_dia(agg_dia: pd.DataFrame, cal: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Sube el agregado diario a semana/mes/año fusionando sketches (sin leer pagos crudos)."""
+    cal_idx = cal.set_index("FECHA_KEY", drop=False)
+    out: dict[str, pd.DataFrame] = {"Dia": agg_dia}
+    for grano, (col_grano, attrs) in GRANOS.items():
+        if grano == "Dia":
+            continue
+        base = agg_dia[["FECHA_KEY", "Monto_pagado", "Numero_pagos", "Sketch_socios"]].copy()
+        base[col_grano] = _grano_de(base["FECHA_KEY"], cal_idx[col_grano])
+        tabla = _sumar_tabla(base, col_grano)
+        if attrs:
+            tabla = tabla.join(cal.drop_duplicates(col_grano).set_index(col_grano)[attrs], on=col_grano)
+        out[grano] = tabla
+    return out
+
+
+def fusionar_agregados(previo: dict[str, pd.DataFrame], nuevo: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """Suma los agregados de un lote nuevo (p. ej. un mes) a los existentes, grano por grano."""
+    out: dict[str, pd.DataFrame] = {}
+    for grano, (col_grano, attrs) in GRANOS.items():
+        partes = [t for t in (previo.get(grano), nuevo.get(grano)) if t is not None and len(t)]
+        if not partes:
+            continue
+        unido = pd.concat(partes, ignore_index=True)
+        tabla = _sumar_tabla(unido, col_grano)
+        if attrs:
+            attrs_grano = unido.drop_duplicates(col_grano).set_index(col_grano)[attrs]
+            tabla = tabla.join(attrs_grano, on=col_grano)
+        out[grano] = tabla
+    return out
+
+
+def guardar_agregados(agregados: dict[str, pd.DataFrame], out_excel: Path = OUT_AGREGADOS) -> Path:
+    out_excel.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(out_excel, engine="openpyxl") as writer:
+        for grano, tabla in agregados.items():
+            tabla.to_excel(writer, sheet_name=f"Agg_Pagos_{grano}", index=False)
+    return out_excel
+
+
+def cargar_agregados(path: Path = OUT_AGREGADOS) -> dict[str, pd.DataFrame]:
+    """Lee los agregados guardados ({} si el archivo no existe)."""
+    if not Path(path).exists():
+        return {}
+    hojas = pd.read_excel(path, sheet_name=None)
+    return {h.replace("Agg_Pagos_", ""): t for h, t in hojas.items() if h.startswith("Agg_Pagos_")}
@@ -0,0 +1,345 @@
+"""
+Almacén analítico local en SQLite (cartera.sqlite) con índices por socio, comprobante y fecha.
+
+Materializa en una sola base las fuentes que hoy hay que abrir por separado:
+- pagos_odoo  ← odoo/odoo_cuotas_unificado (intermedio, ver intermedios.py), con el código de
+                socio resuelto por nombre como en el cruce
+- membership  ← odoo/Membership (res.membership).xlsx
+- socios      ← socios.xlsx
+- mora        ← Reporte_act_cuotas_completas.xlsx (monto y rango por socio)
+- cuotas      ← BasesDeDatos-CUOTAS.xlsx (por bloques, ver fuentes.py)
+- odoo_cuotas, odoo_membership ← registros crudos de Odoo escritos por odoo_rpc.py
+
+Carga: `executemany` dentro de una transacción por tabla (o por parte). Actualización
+incremental: en la tabla _cargas se guarda la huella de lo cargado; si el archivo fuente no
+cambió, la tabla no se toca. Los pagos se comparan por archivo mensual de Odoo (__archivo):
+solo se reemplazan los meses cuyo contenido cambió y se borran los que ya no existen.
+
+Uso:
+    python almacen.py                 # actualiza lo que cambió
+    python almacen.py --forzar        # recarga todo
+    python almacen.py --socio 7572    # qué pagó y qué debe un socio (consultas indexadas)
+
+    from almacen import conectar, consultar
+    con = conectar()
+    consultar(con, "SELECT * FROM pagos_odoo WHERE Codigo_socio = ?", (7572,))
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from huellas import hash_archivo
+from particiones import huella_df
+
+BASE_DIR = Path(__file__).parent
+ODOO_DIR = BASE_DIR / "odoo"
+
+DB_CARTERA = BASE_DIR / "cartera.sqlite"
+ODOO_DETALLE = ODOO_DIR / "odoo_cuotas_unificado.xlsx"
+
+# Tabla → columnas (nombre, tipo SQLite). Las fechas se guardan como texto ISO (AAAA-MM-DD).
+TABLAS = {
+    "membership": [("Codigo_socio", "INTEGER PRIMARY KEY"), ("Nombre_socio", "TEXT"), ("Nombre_norm", "TEXT")],
+    "socios": [("Codigo_socio", "INTEGER PRIMARY KEY"), ("Estado_membresia", "TEXT"), ("Precio_membresia", "REAL")],
+    "mora": [("Codigo_socio", "INTEGER PRIMARY KEY"), ("Monto_mora", "REAL"), ("Rango_dias_por_cuotas", "TEXT")],
+    "cuotas": [
+        ("socio_id", "INTEGER"),
+        ("estado", "TEXT"),
+        ("monto", "REAL"),
+        ("fecha_liquidacion", "TEXT"),
+        ("fecha_creacion", "TEXT"),
+        ("anio", "INTEGER"),
+        ("mes", "INTEGER"),
+    ],
+    "pagos_odoo": [
+        ("parte", "TEXT"),
+        ("COMPROBANTE", "TEXT"),
+        ("Codigo_socio", "INTEGER"),
+        ("CODIGO_SOCIO_ODOO", "INTEGER"),
+        ("CONSUMIDOR", "TEXT"),
+        ("MONTO", "REAL"),
+        ("TIPO_COMPROBANTE", "TEXT"),
+        ("TIPO_PAGO", "TEXT"),
+        ("ESTADO", "TEXT"),
+        ("ESTADO_SOCIO", "TEXT"),
+        ("FECHA_PAGO", "TEXT"),
+        ("FECHA_PERIODO", "TEXT"),
+    ],
+    # Registros crudos de Odoo por JSON-RPC (ver odoo_rpc.py), con las columnas de la exportación
+    "odoo_cuotas": [
+        ("odoo_id", "INTEGER PRIMARY KEY"),
+        ("write_date", "TEXT"),
+        ("COMPROBANTE", "TEXT"),
+        ("MONTO", "REAL"),
+        ("TIPO DE COMPROBANTE", "TEXT"),
+        ("TIPO PAGO", "TEXT"),
+        ("FECHA COMPROB.", "TEXT"),
+        ("FECHA REGISTRO", "TEXT"),
+        ("FECHA APLICACION", "TEXT"),
+        ("ESTADO", "TEXT"),
+        ("CONSUMIDOR", "TEXT"),
+        ("ESTADO SOCIO", "TEXT"),
+    ],
+    "odoo_membership": [
+        ("odoo_id", "INTEGER PRIMARY KEY"),
+        ("write_date", "TEXT"),
+        ("Codigo_socio", "INTEGER"),
+        ("Nombre_socio", "TEXT"),
+        ("Estado_membresia_odoo", "TEXT"),
+        ("Tipo_membresia", "TEXT"),
+    ],
+}
+
+INDICES = [
+    ("ix_cuotas_socio", "cuotas", "socio_id, estado"),
+    ("ix_cuotas_fecha", "cuotas", "fecha_liquidacion"),
+    ("ix_pagos_socio", "pagos_odoo", "Codigo_socio, FECHA_PAGO"),
+    ("ix_pagos_comprobante", "pagos_odoo", "COMPROBANTE"),
+    ("ix_pagos_fecha", "pagos_odoo", "FECHA_PAGO"),
+    ("ix_pagos_parte", "pagos_odoo", "parte"),
+    ("ix_odoo_cuotas_fecha", "odoo_cuotas", "write_date, odoo_id"),
+    ("ix_odoo_membership_socio", "odoo_membership", "Codigo_socio"),
+]
+
+
+def conectar(path: Path = DB_CARTERA) -> sqlite3.Connection:
+    """Abre (y crea si hace falta) la base con su esquema e índices."""
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    with con:
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS _cargas (tabla TEXT, parte TEXT, huella TEXT, filas INTEGER, cargado TEXT, "
+            "PRIMARY KEY (tabla, parte))"
+        )
+        for tabla, columnas in TABLAS.items():
+            cols = ", ".join(f'"{c}" {t}' for c, t in columnas)
+            con.execute(f"CREATE TABLE IF NOT EXISTS {tabla} ({cols})")
+        for nombre, tabla, cols in INDICES:
+            con.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({cols})")
+    return con
+
+
+def consultar(con: sqlite3.Connection, sql: str, params=()) -> pd.DataFrame:
+    return pd.read_sql_query(sql, con, params=params)
+
+
+def _filas(df: pd.DataFrame, columnas: list[str]):
+    """Tuplas listas para executemany: fechas ISO, nulos como None, enteros de Python."""
+    out = pd.DataFrame(index=df.index)
+    for c in columnas:
+        s = df[c] if c in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if pd.api.types.is_datetime64_any_dtype(s):
+            s = s.dt.strftime("%Y-%m-%d")
+        out[c] = s.astype(object).where(s.notna(), None)
+    return out.itertuples(index=False, name=None)
+
+
+def _huella_cargada(con: sqlite3.Connection, tabla: str, parte: str = "") -> str | None:
+    fila = con.execute("SELECT huella FROM _cargas WHERE tabla = ? AND parte = ?", (tabla, parte)).fetchone()
+    return fila[0] if fila else None
+
+
+def _registrar_carga(con: sqlite3.Connection, tabla: str, parte: str, huella: str, filas: int) -> None:
+    con.execute(
+        "INSERT OR REPLACE INTO _cargas VALUES (?, ?, ?, ?, ?)",
+        (tabla, parte, huella, filas, datetime.now().isoformat(timespec="seconds")),
+    )
+
+
+def _insertar(con: sqlite3.Connection, tabla: str, df: pd.DataFrame) -> int:
+    columnas = [c for c, _t in TABLAS[tabla]]
+    marcas = ", ".join("?" * len(columnas))
+    con.executemany(f"INSERT INTO {tabla} VALUES ({marcas})", _filas(df, columnas))
+    return len(df)
+
+
+def reemplazar_tabla(con: sqlite3.Connection, tabla: str, df: pd.DataFrame, huella: str) -> int:
+    """Borra y recarga la tabla completa en una transacción."""
+    with con:
+        con.execute(f"DELETE FROM {tabla}")
+        n = _insertar(con, tabla, df)
+        _registrar_carga(con, tabla, "", huella, n)
+    return n
+
+
+def cargar_maestros(con: sqlite3.Connection, forzar: bool = False) -> dict[str, int | None]:
+    """membership, socios y mora (cargadores del cruce); None en las tablas sin cambios."""
+    from cruzar_odoo_mora_socios import (
+        ARCHIVO_MEMBERSHIP,
+        ARCHIVO_MORA,
+        ARCHIVO_SOCIOS,
+        cargar_membership,
+        cargar_mora,
+        cargar_socios,
+    )
+
+    res: dict[str, int | None] = {}
+    for tabla, archivo, cargador in [
+        ("membership", ARCHIVO_MEMBERSHIP, cargar_membership),
+        ("socios", ARCHIVO_SOCIOS, cargar_socios),
+        ("mora", ARCHIVO_MORA, cargar_mora),
+    ]:
+        huella = hash_archivo(archivo)
+        if tabla == "membership":
+            # Con ingesta por JSON-RPC el maestro puede salir del almacén o del xlsx si es más
+            # nuevo (ver odoo_rpc.py): la huella cubre los dos
+            rpc = _huella_cargada(con, "odoo_membership", "odoo_rpc")
+            huella = f"{rpc}|{huella}" if rpc else huella
+        if huella is None or (not forzar and _huella_cargada(con, tabla) == huella):
+            res[tabla] = None
+            continue
+        res[tabla] = reemplazar_tabla(con, tabla, cargador(), huella)
+    return res
+
+
+def cargar_cuotas(con: sqlite3.Connection, forzar: bool = False) -> int | None:
+    """Base de cuotas por bloques, todo en una transacción (la base se reemplaza entera)."""
+    from fuentes import ARCHIVO_CUOTAS, COLUMNAS_CUOTAS, iterar_cuotas
+
+    huella = hash_archivo(ARCHIVO_CUOTAS)
+    if huella is None or (not forzar and _huella_cargada(con, "cuotas") == huella):
+        return None
+    n = 0
+    with con:
+        con.execute("DELETE FROM cuotas")
+        for bloque in iterar_cuotas(ARCHIVO_CUOTAS, COLUMNAS_CUOTAS):
+            n += _insertar(con, "cuotas", bloque)
+        _registrar_carga(con, "cuotas", "", huella, n)
+    return n
+
+
+def pagos_para_almacen(det: pd.DataFrame, master: pd.DataFrame) -> pd.DataFrame:
+    """Detalle Odoo con código de socio (por nombre, como el cruce) y nombres de columna SQL."""
+    from plan_cuotas import codigo_socio_por_nombre
+
+    return pd.DataFrame(
+        {
+            "parte": det["__archivo"].astype(str).to_numpy(),
+            "COMPROBANTE": det["COMPROBANTE"].to_numpy(),
+            "Codigo_socio": codigo_socio_por_nombre(det, master).astype("Int64").to_numpy(),
+            "CODIGO_SOCIO_ODOO": pd.to_numeric(det.get("CODIGO_SOCIO_ODOO"), errors="coerce").astype("Int64").to_numpy(),
+            "CONSUMIDOR": det["CONSUMIDOR"].to_numpy(),
+            "MONTO": pd.to_numeric(det["MONTO"], errors="coerce").to_numpy(),
+            "TIPO_COMPROBANTE": det["TIPO DE COMPROBANTE"].to_numpy(),
+            "TIPO_PAGO": det["TIPO PAGO"].to_numpy(),
+            "ESTADO": det["ESTADO"].to_numpy(),
+            "ESTADO_SOCIO": det["ESTADO SOCIO"].to_numpy(),
+            "FECHA_PAGO": pd.to_datetime(det["FECHA_PAGO"], errors="coerce").to_numpy(),
+            "FECHA_PERIODO": pd.to_datetime(det["FECHA_PERIODO"], errors="coerce").to_numpy(),
+        }
+    )
+
+
+def cargar_pagos(con: sqlite3.Connection, forzar: bool = False) -> dict[str, list[str]]:
+    """Pagos Odoo por archivo mensual: solo se reemplazan las partes cuyo contenido cambió."""
+    from cruzar_odoo_mora_socios import cargar_membership
+    from intermedios import leer_intermedio
+
+    if not ODOO_DETALLE.exists():
+        print(f"Aviso: no encontré {ODOO_DETALLE.name}; ejecute antes preparar_odoo_comparativo.py.")
+        return {"cargadas": [], "sin_cambios": [], "borradas": []}
+    pagos = pagos_para_almacen(leer_intermedio(ODOO_DETALLE), cargar_membership())
+    # El código de socio sale del maestro: si cambia el maestro, cambian todas las partes
+    huella_master = _huella_cargada(con, "membership") or ""
+
+    previas = {p for (p,) in con.execute("SELECT parte FROM _cargas WHERE tabla = 'pagos_odoo'")}
+    cargadas, iguales = [], []
+    for parte, grupo in pagos.groupby("parte", sort=True):
+        huella = hashlib.sha1(f"{huella_df(grupo)}|{huella_master}".encode("utf-8")).hexdigest()
+        if not forzar and _huella_cargada(con, "pagos_odoo", parte) == huella:
+            iguales.append(parte)
+            continue
+        with con:
+            con.execute("DELETE FROM pagos_odoo WHERE parte = ?", (parte,))
+            n = _insertar(con, "pagos_odoo", grupo)
+            _registrar_carga(con, "pagos_odoo", parte, huella, n)
+        cargadas.append(parte)
+
+    borradas = sorted(previas - set(pagos["parte"].unique()))
+    with con:
+        for parte in borradas:
+            con.execute("DELETE FROM pagos_odoo WHERE parte = ?", (parte,))
+            con.execute("DELETE FROM _cargas WHERE tabla = 'pagos_odoo' AND parte = ?", (parte,))
+    return {"cargadas": cargadas, "sin_cambios": iguales, "borradas": borradas}
+
+
+def actualizar(con: sqlite3.Connection | None = None, forzar: bool = False) -> dict:
+    """Actualiza todas las tablas (maestros primero: los pagos dependen de membership)."""
+    con = con or conectar()
+    res: dict = cargar_maestros(con, forzar)
+    res["cuotas"] = cargar_cuotas(con, forzar)
+    res["pagos_odoo"] = cargar_pagos(con, forzar)
+    return res
+
+
+def estado_de_cuenta(con: sqlite3.Connection, codigo: int) -> dict[str, pd.DataFrame]:
+    """Qué pagó y qué debe un socio: datos del maestro, mora, pagos Odoo y cuotas pendientes."""
+    codigo = int(codigo)
+    return {
+        "socio": consultar(
+            con,
+            "SELECT m.Codigo_socio, m.Nombre_socio, s.Estado_membresia, s.Precio_membresia, "
+            "r.Monto_mora, r.Rango_dias_por_cuotas "
+            "FROM membership m LEFT JOIN socios s USING (Codigo_socio) LEFT JOIN mora r USING (Codigo_socio) "
+            "WHERE m.Codigo_socio = ?",
+            (codigo,),
+        ),
+        "pagos": consultar(
+            con,
+            "SELECT FECHA_PAGO, FECHA_PERIODO, COMPROBANTE, MONTO, TIPO_PAGO, ESTADO "
+            "FROM pagos_odoo WHERE Codigo_socio = ? ORDER BY FECHA_PAGO",
+            (codigo,),
+        ),
+        "pendientes": consultar(
+            con,
+            "SELECT fecha_liquidacion, anio, mes, monto FROM cuotas "
+            "WHERE socio_id = ? AND estado = 'PEN' ORDER BY fecha_liquidacion",
+            (codigo,),
+        ),
+    }
+
+
+def _describir(res) -> str:
+    if res is None:
+        return "sin cambios"
+    if isinstance(res, dict):
+        return f"{len(res['cargadas'])} meses cargados, {len(res['sin_cambios'])} sin cambios, {len(res['borradas'])} borrados"
+    return f"{res} filas cargadas"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Almacén SQLite de la cartera (pagos Odoo, maestros, mora y cuotas).")
+    parser.add_argument("--forzar", action="store_true", help="Recargar todas las tablas aunque no hayan cambiado")
+    parser.add_argument("--socio", type=int, help="Mostrar pagos y deuda de un socio en lugar de actualizar")
+    args = parser.parse_args()
+
+    con = conectar()
+    if args.socio is not None:
+        t0 = time.perf_counter()
+        cuenta = estado_de_cuenta(con, args.socio)
+        ms = (time.perf_counter() - t0) * 1000
+        for nombre, df in cuenta.items():
+            print(f"--- {nombre} ({len(df)})")
+            print(df.to_string(index=False) if len(df) else "(sin filas)")
+        pagado = cuenta["pagos"]["MONTO"].sum()
+        debe = cuenta["pendientes"]["monto"].sum()
+        print(f"Pagado en Odoo: {pagado:,.2f} | Cuotas PEN: {debe:,.2f} | consultas en {ms:.1f} ms")
+        return
+
+    t0 = time.perf_counter()
+    res = actualizar(con, forzar=args.forzar)
+    print(f"Almacén actualizado: {DB_CARTERA}")
+    for tabla, r in res.items():
+        print(f"  {tabla}: {_describir(r)}")
+    print(f"  Tiempo: {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,45 +11,34 @@ Cada socio se clasifica en rangos de días según la cantidad de cuotas:
 
 Salidas:
 - sep/dashboard_montos_socios.html
+
+Si las entradas, el año en curso y el código no cambiaron desde la última generación, no se
+rehace el HTML (ver huellas.py). Para regenerarlo igual: python build_dashboard_montos.py --forzar
+
+Con --preview usa solo los socios de la muestra, escala los KPI globales y escribe en
+preview/sep/ (ver muestra.py).
 """
 
 from pathlib import Path
 import json
-import re
+import sys
 from datetime import datetime
 
 import pandas as pd
 
+from calendario import calendario_para, fecha_key, meses_calendario, unir_calendario
+from fuentes import parse_cuotas, resumen_cuotas_por_socio
+from huellas import calcular_huella, cambios, registrar_huella, salida_vigente
+from muestra import EN_PREVIEW, estimar, filtrar, marcar_html, ruta
+
 BASE_DIR = Path(__file__).parent
 # Ahora usamos el archivo depurado indicado por el usuario:
 # C:\Users\adoni\Downloads\ETL-CTAS\Reporte_act_cuotas_completas.xlsx
 IN_FILE = BASE_DIR / "Reporte_act_cuotas_completas.xlsx"
-OUT_HTML = BASE_DIR / "sep" / "dashboard_montos_socios.html"
+OUT_HTML = ruta(BASE_DIR / "sep" / "dashboard_montos_socios.html")
 CUOTAS_FILE = BASE_DIR / "BasesDeDatos-CUOTAS.xlsx"
 
 
-def parse_cuotas(texto: str):
-    """'25 CUOTAS 38.50' -> (25, 38.50).
-    Implementación robusta: toma los números que aparezcan en el texto.
-    El primero se interpreta como # de cuotas (entero), el segundo como monto de la cuota (puede ser decimal).
-    """
-    if not isinstance(texto, str):
-        return None, None
-    t = texto.strip().upper()
-    if not t:
-        return None, None
-    try:
-        # Buscar números: enteros o decimales (ej. 25, 38.50); primero # cuotas, segundo monto cuota
-        nums = re.findall(r"(\d+(?:[.,]\d+)?)", t)
-        if not nums:
-            return None, None
-        num = int(float(nums[0].replace(",", ".")))
-        monto = float(nums[1].replace(",", ".")) if len(nums) > 1 else None
-        return num, monto
-    except Exception:
-        return None, None
-
-
 def rango_por_cuotas(n: float | int | None) -> str:
     if n is None:
         return "Sin rango"
@@ -70,7 +59,13 @@ def rango_por_cuotas(n: float | int | None) -> str:
     return "mas de 121 días"
 
 
-def main():
+def main(forzar: bool = False):
+    huella = calcular_huella([IN_FILE, CUOTAS_FILE], parametros={"anio_actual": datetime.now().year})
+    if not forzar and salida_vigente([OUT_HTML], huella):
+        print(f"Sin cambios en entradas ni código: se conserva {OUT_HTML} (use --forzar para regenerar)")
+        return
+    print(f"Regenerando dashboard ({'; '.join(cambios([OUT_HTML], huella)) or 'forzado'})")
+
     # El archivo original tiene encabezados en la fila 4 (índice 3) y
     # filas de título antes. Leemos con header=3 y la hoja "Montos por socio".
     df = pd.read_excel(IN_FILE, sheet_name="Montos por socio", header=3)
@@ -111,23 +106,16 @@ def main():
     # Traer información de fechas desde BasesDeDatos-CUOTAS (última fecha_creacion por socio)
     # Usamos fecha_creacion porque es la fecha de las cuotas pendientes de los socios
     try:
-        cuotas = pd.read_excel(CUOTAS_FILE)
-        cuotas.columns = [str(c).strip() for c in cuotas.columns]
-        if "socio_id" in cuotas.columns and "fecha_creacion" in cuotas.columns:
-            cuotas["socio_id"] = pd.to_numeric(cuotas["socio_id"], errors="coerce").astype("Int64")
-            cuotas["fecha_creacion"] = pd.to_datetime(cuotas["fecha_creacion"], errors="coerce")
-            ult = (
-                cuotas.dropna(subset=["socio_id"])
-                .groupby("socio_id")["fecha_creacion"]
-                .max()
-                .reset_index()
-                .rename(columns={"socio_id": col_socio, "fecha_creacion": "Ultima_fecha_cuotas"})
-            )
-            df = df.merge(ult, on=col_socio, how="left")
-            # Si la columna de fecha original está muy vacía, usa la de cuotas
-            base_fecha = df["Ultima_fecha_cuotas"]
-        else:
-            base_fecha = df[col_fecha]
+        por_socio = resumen_cuotas_por_socio(CUOTAS_FILE)
+        ult = (
+            por_socio["ultima_fecha_creacion"]
+            .rename("Ultima_fecha_cuotas")
+            .rename_axis(col_socio)
+            .reset_index()
+        )
+        df = df.merge(ult, on=col_socio, how="left")
+        # Si la columna de fecha original está muy vacía, usa la de cuotas
+        base_fecha = df["Ultima_fecha_cuotas"]
     except Exception:
         base_fecha = df[col_fecha]
 
@@ -150,10 +138,18 @@ def main():
 
     # Filtrar filas sin socio
     df = df[df[col_socio].notna()].copy()
+    df = filtrar(df, col_socio)
 
     # KPIs globales
     total_socios = int(df[col_socio].nunique())
     total_monto = float(df[col_monto].sum())
+    estimaciones = None
+    if EN_PREVIEW:
+        # Vista previa: los KPI globales se escalan de la muestra a toda la cartera
+        estimaciones = estimar(df, col_socio, [col_monto])
+        est = estimaciones.set_index("Columna")["Total_estimado"]
+        total_socios = int(round(est["Socios"]))
+        total_monto = float(est[col_monto])
 
     # Resumen por rango
     resumen_rows = []
@@ -208,13 +204,15 @@ def main():
     # Para fechas futuras, establecer como NaT
     fecha_dt_filtrada = fecha_dt.where(año_serie.notna() | fecha_dt.isna(), pd.NaT)
     
-    detalle["Ultima_fecha_liquidacion"] = fecha_dt_filtrada.dt.strftime("%Y-%m-%d")
-    # Extraer año para el segmentador (solo años válidos)
-    detalle["Anio"] = año_serie.astype("Int64").astype(str).replace("nan", None).replace("None", None)
-    # Extraer año-mes para el segmentador por mes (formato "YYYY-MM")
-    mask_valido = año_serie.notna() & (año_serie <= año_maximo)
-    detalle["AnioMes"] = fecha_dt_filtrada.dt.strftime("%Y-%m")
-    detalle.loc[~mask_valido, "AnioMes"] = None
+    # Atributos de fecha desde la dimensión calendario (una sola vez por ejecución)
+    cal = calendario_para(fecha_dt_filtrada)
+    detalle["FECHA_KEY"] = fecha_key(fecha_dt_filtrada).to_numpy()
+    detalle = unir_calendario(detalle, cal, "FECHA_KEY", ["FECHA_STR", "ANIO", "ANIO_MES"])
+    detalle = detalle.rename(
+        columns={"FECHA_STR": "Ultima_fecha_liquidacion", "ANIO": "Anio", "ANIO_MES": "AnioMes"}
+    )
+    detalle["Anio"] = detalle["Anio"].astype("Int64").astype(str).replace("<NA>", None)
+    detalle = detalle.drop(columns=["FECHA_KEY"])
 
     # Reemplazar NaN/NaT por None antes de serializar
     detalle = detalle.where(pd.notnull(detalle), None)
@@ -237,10 +235,10 @@ def main():
     año_maximo = año_actual  # Solo mostrar hasta el año actual
     
     df_con_anio = df.copy()
-    fecha_dt_anio = pd.to_datetime(df_con_anio[base_fecha.name], errors="coerce")
-    df_con_anio["Anio"] = fecha_dt_anio.dt.year
-    df_con_anio["AnioMes"] = fecha_dt_anio.dt.strftime("%Y-%m")
-    
+    df_con_anio["FECHA_KEY"] = fecha_key(pd.to_datetime(df_con_anio[base_fecha.name], errors="coerce")).to_numpy()
+    df_con_anio["Anio"] = df_con_anio["FECHA_KEY"] // 10000
+    df_con_anio["ANIO_MES_KEY"] = df_con_anio["FECHA_KEY"] // 100
+
     # Filtrar filas con fechas futuras irrazonables
     df_con_anio = df_con_anio[
         (df_con_anio["Anio"].isna()) | (df_con_anio["Anio"] <= año_maximo)
@@ -259,16 +257,13 @@ def main():
     estadisticas_anio.sort(key=lambda x: x["anio"], reverse=True)
 
     # Lista de años-meses únicos para el segmentador (formato "YYYY-MM", etiqueta "Mes Año")
-    MESES_ES = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
-    anios_meses = []
-    for am in df_con_anio["AnioMes"].dropna().unique():
-        try:
-            y, m = am.split("-")
-            label = f"{MESES_ES[int(m) - 1]} {y}"
-            anios_meses.append({"value": am, "label": label})
-        except Exception:
-            continue
-    anios_meses.sort(key=lambda x: x["value"], reverse=True)
+    meses = meses_calendario(cal)
+    meses = meses[meses["ANIO_MES_KEY"].isin(df_con_anio["ANIO_MES_KEY"].dropna())]
+    anios_meses = (
+        meses.rename(columns={"ANIO_MES": "value", "MES_ANIO": "label"})[["value", "label"]]
+        .sort_values("value", ascending=False)
+        .to_dict(orient="records")
+    )
 
     # Construir HTML con un poco de JS para interacción
     data_json = json.dumps(detalle_records, ensure_ascii=False)
@@ -1051,11 +1046,14 @@ def main():
 </html>
 """
 
+    if EN_PREVIEW:
+        html = marcar_html(html, estimaciones)
     OUT_HTML.parent.mkdir(parents=True, exist_ok=True)
     OUT_HTML.write_text(html, encoding="utf-8")
+    registrar_huella([OUT_HTML], huella)
     print(f"Dashboard montos generado: {OUT_HTML}")
 
 
 if __name__ == "__main__":
-    main()
+    main(forzar="--forzar" in sys.argv[1:])
 
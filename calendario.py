@@ -0,0 +1,144 @@
+"""
+Dimensión calendario compartida por los scripts del proyecto.
+
+Se genera una sola vez por ejecución cubriendo el rango de fechas de los datos,
+con todos los atributos derivados (año, mes, día, semana ISO, etiquetas en español).
+Las tablas de hechos solo guardan una clave entera de fecha (FECHA_KEY = AAAAMMDD)
+que se une a esta dimensión; así la lógica de fechas se ejecuta una vez y no por fila.
+
+Uso desde otros scripts:
+    from calendario import construir_calendario, fecha_key, unir_calendario
+
+Salida (al ejecutarlo directamente):
+- odoo/dim_calendario_5_anios.xlsx  (últimos 5 años, de consulta; odoo/dim_calendario.xlsx lo
+  escribe preparar_odoo_comparativo.py con el rango de los datos y no se toca aquí)
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent
+OUT_CALENDARIO_5_ANIOS = BASE_DIR / "odoo" / "dim_calendario_5_anios.xlsx"
+
+MESES_ES = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
+MESES_ES_LARGO = [
+    "Enero",
+    "Febrero",
+    "Marzo",
+    "Abril",
+    "Mayo",
+    "Junio",
+    "Julio",
+    "Agosto",
+    "Septiembre",
+    "Octubre",
+    "Noviembre",
+    "Diciembre",
+]
+DIAS_ES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+def fecha_key(fechas) -> pd.Series:
+    """Convierte fechas a clave entera AAAAMMDD (Int64, <NA> si la fecha no es válida)."""
+    f = pd.to_datetime(pd.Series(fechas), errors="coerce")
+    key = f.dt.year * 10000 + f.dt.month * 100 + f.dt.day
+    return key.astype("Int64")
+
+
+def key_a_fecha(keys) -> pd.Series:
+    """Inversa de fecha_key: AAAAMMDD → Timestamp (NaT si no hay clave)."""
+    k = pd.to_numeric(pd.Series(keys), errors="coerce")
+    return pd.to_datetime(k.astype("Int64").astype(str), format="%Y%m%d", errors="coerce")
+
+
+def construir_calendario(inicio, fin) -> pd.DataFrame:
+    """Genera la dimensión calendario diaria entre inicio y fin (ambos incluidos, meses completos)."""
+    inicio = pd.Timestamp(inicio).to_period("M").to_timestamp()
+    fin = pd.Timestamp(fin).to_period("M").to_timestamp(how="end").normalize()
+    fechas = pd.date_range(inicio, fin, freq="D")
+
+    iso = fechas.isocalendar()
+    anio = fechas.year.to_numpy()
+    mes = fechas.month.to_numpy()
+    mes_idx = mes - 1
+
+    cal = pd.DataFrame(
+        {
+            "FECHA_KEY": anio * 10000 + mes * 100 + fechas.day.to_numpy(),
+            "FECHA": fechas,
+            "ANIO": anio,
+            "TRIMESTRE": fechas.quarter.to_numpy(),
+            "MES": mes,
+            "DIA": fechas.day.to_numpy(),
+            "DIA_SEMANA": fechas.dayofweek.to_numpy() + 1,
+            "ANIO_ISO": iso["year"].to_numpy().astype(int),
+            "SEMANA_ISO": iso["week"].to_numpy().astype(int),
+            "DIAS_MES": fechas.days_in_month.to_numpy(),
+        }
+    )
+    cal["ANIO_MES_KEY"] = cal["ANIO"] * 100 + cal["MES"]
+    cal["SEMANA_KEY"] = cal["ANIO_ISO"] * 100 + cal["SEMANA_ISO"]
+
+    # Etiquetas de texto: se construyen una vez por mes/semana y se difunden con take
+    meses_unicos, inv_mes = np.unique(cal["ANIO_MES_KEY"].to_numpy(), return_inverse=True)
+    anio_mes_txt = np.array([f"{k // 100}-{k % 100:02d}" for k in meses_unicos], dtype=object)
+    mes_anio_txt = np.array([f"{MESES_ES[k % 100 - 1]} {k // 100}" for k in meses_unicos], dtype=object)
+    cal["ANIO_MES"] = anio_mes_txt[inv_mes]
+    cal["MES_ANIO"] = mes_anio_txt[inv_mes]
+    cal["MES_NOMBRE"] = np.array(MESES_ES, dtype=object)[mes_idx]
+    cal["MES_NOMBRE_LARGO"] = np.array(MESES_ES_LARGO, dtype=object)[mes_idx]
+    cal["DIA_NOMBRE"] = np.array(DIAS_ES, dtype=object)[cal["DIA_SEMANA"].to_numpy() - 1]
+
+    semanas_unicas, inv_sem = np.unique(cal["SEMANA_KEY"].to_numpy(), return_inverse=True)
+    semana_txt = np.array([f"{k // 100}-W{k % 100:02d}" for k in semanas_unicas], dtype=object)
+    cal["SEMANA"] = semana_txt[inv_sem]
+
+    cal["FECHA_STR"] = cal["FECHA"].dt.strftime("%Y-%m-%d")
+    cal["FIN_DE_MES"] = cal["DIA"] == cal["DIAS_MES"]
+    return cal
+
+
+def calendario_para(*series) -> pd.DataFrame:
+    """Construye el calendario que cubre el rango de fechas de todas las series dadas."""
+    mins, maxs = [], []
+    for s in series:
+        f = pd.to_datetime(pd.Series(s), errors="coerce").dropna()
+        if not f.empty:
+            mins.append(f.min())
+            maxs.append(f.max())
+    if not mins:
+        hoy = pd.Timestamp.now().normalize()
+        return construir_calendario(hoy, hoy)
+    return construir_calendario(min(mins), max(maxs))
+
+
+def meses_calendario(cal: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por mes del calendario (para segmentadores y selectores de periodo)."""
+    return (
+        cal.loc[cal["DIA"] == 1, ["ANIO_MES_KEY", "ANIO", "MES", "ANIO_MES", "MES_ANIO", "MES_NOMBRE", "DIAS_MES"]]
+        .reset_index(drop=True)
+    )
+
+
+def unir_calendario(df: pd.DataFrame, cal: pd.DataFrame, col_key: str, columnas: list[str], prefijo: str = "") -> pd.DataFrame:
+    """Agrega atributos del calendario a df a partir de su clave entera de fecha."""
+    attrs = cal.set_index("FECHA_KEY")[columnas]
+    keys = pd.to_numeric(df[col_key], errors="coerce")
+    out = df.copy()
+    for c in columnas:
+        out[f"{prefijo}{c}"] = keys.map(attrs[c]).to_numpy()
+    return out
+
+
+def main() -> None:
+    hoy = pd.Timestamp.now()
+    cal = construir_calendario(hoy - pd.DateOffset(years=5), hoy)
+    OUT_CALENDARIO_5_ANIOS.parent.mkdir(parents=True, exist_ok=True)
+    cal.to_excel(OUT_CALENDARIO_5_ANIOS, index=False)
+    print(f"Dimensión calendario guardada en: {OUT_CALENDARIO_5_ANIOS} ({len(cal)} días)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Controles de calidad de datos, vectorizados y con presupuesto de tiempo por regla.
+
+Las comprobaciones del notebook limpieza_cuotas.ipynb (VALOR = suma de rangos, un solo rango
+por fila, como máximo 25 PEN por socio, sin socios irrecuperables, sin negativos y el cotejo
+de montos por socio) pasan a ser reglas declaradas en REGLAS que se evalúan sobre toda la
+población en cada corrida, en lugar de revisar 3 socios al azar. Se agregan reglas del plan
+de cuotas (Monto_total ≈ num_cuotas × monto_cuota) y de Odoo (COMPROBANTE repetido).
+
+Cada regla devuelve una Serie booleana con True en lo que la incumple; su índice identifica
+el caso (código de socio, comprobante). Se mide el tiempo de cada regla contra su presupuesto
+(ms); una regla que lo excede se marca LENTA.
+
+Entradas (las que falten se omiten y sus reglas quedan SIN DATOS):
+- RECUPERACION_DE_MORA.csv
+- BasesDeDatos-CUOTAS.xlsx (por bloques, ver fuentes.py)
+- sep/Reporte_Montos_PowerBI_socios.xlsx (plan de cuotas)
+- odoo/odoo_cuotas_unificado.xlsx (detalle de pagos Odoo)
+- odoo/cuotas_*.xlsx y odoo/compactado/ (exportaciones sin depurar, vía compactar_odoo.leer_historial)
+
+Salida:
+- sep/Calidad_datos.xlsx  (hojas Resumen y Violaciones, hasta MAX_EJEMPLOS casos por regla)
+
+Uso:
+    python calidad.py              # evalúa, guarda el reporte y muestra el resumen
+    python calidad.py --estricto   # además termina con error si alguna regla falla
+    python calidad.py --preview    # sobre la muestra de socios, en preview/ (ver muestra.py)
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import muestra
+from compactar_odoo import leer_historial
+from fuentes import iterar_cuotas, leer_fuente
+from intermedios import leer_intermedio
+from muestra import ruta
+
+BASE_DIR = Path(__file__).parent
+
+CSV_MORA = BASE_DIR / "RECUPERACION_DE_MORA.csv"
+ARCHIVO_CUOTAS = BASE_DIR / "BasesDeDatos-CUOTAS.xlsx"
+PLAN_FILE = ruta(BASE_DIR / "sep" / "Reporte_Montos_PowerBI_socios.xlsx")
+ODOO_DETALLE = ruta(BASE_DIR / "odoo" / "odoo_cuotas_unificado.xlsx")
+OUT_CALIDAD = ruta(BASE_DIR / "sep" / "Calidad_datos.xlsx")
+
+# Mismos criterios que el notebook de limpieza
+MONTOS_PERMITIDOS = [16.95, 33.98, 38.50, 30.76]
+MAX_CUOTAS_PEN = 25
+COLUMNAS_RANGO = ["de 0 a 30", "de 31 a 60", "de 61 a 90", "de 91 a 120", "mas de 121 días"]
+TOLERANCIA = 0.01
+MAX_EJEMPLOS = 50
+
+
+def cargar_tablas() -> dict[str, pd.DataFrame]:
+    """Tablas que usan las reglas; las que no existen quedan fuera del diccionario."""
+    tablas: dict[str, pd.DataFrame] = {}
+    if CSV_MORA.exists():
+        tablas["mora"] = leer_fuente("mora_csv", CSV_MORA)
+    if ARCHIVO_CUOTAS.exists():
+        bloques = list(iterar_cuotas(ARCHIVO_CUOTAS, ["socio_id", "estado", "monto"]))
+        if bloques:
+            tablas["cuotas"] = pd.concat(bloques, ignore_index=True)
+    if PLAN_FILE.exists():
+        tablas["plan"] = leer_intermedio(PLAN_FILE, ["Codigo_socio", "Monto_total", "num_cuotas", "monto_cuota"])
+    if ODOO_DETALLE.exists():
+        tablas["odoo"] = leer_intermedio(ODOO_DETALLE, ["COMPROBANTE", "MONTO", "FECHA COMPROB.", "FECHA REGISTRO", "CONSUMIDOR"])
+    # Las exportaciones tal cual: el detalle unificado ya viene depurado de duplicados
+    try:
+        crudo = leer_historial()
+    except ValueError:
+        crudo = None
+    if crudo is not None:
+        tablas["odoo_crudo"] = muestra.filtrar(crudo, "CONSUMIDOR", por="nombre")
+    return tablas
+
+
+def _por_socio(mora: pd.DataFrame, serie) -> pd.Series:
+    """Alinea una serie fila a fila de la tabla de mora con el código de socio como índice."""
+    return pd.Series(np.asarray(serie), index=mora["Codigo asociado"].to_numpy())
+
+
+def _pen_por_socio(cuotas: pd.DataFrame) -> pd.Series:
+    return cuotas.loc[cuotas["estado"] == "PEN", "socio_id"].value_counts()
+
+
+# --- Reglas: cada una recibe las tablas y devuelve True donde hay incumplimiento ---
+
+
+def valor_igual_suma_rangos(t) -> pd.Series:
+    m = t["mora"]
+    return _por_socio(m, (m["VALOR"] - m[COLUMNAS_RANGO].sum(axis=1)).abs() >= TOLERANCIA)
+
+
+def un_rango_por_fila(t) -> pd.Series:
+    m = t["mora"]
+    return _por_socio(m, (m[COLUMNAS_RANGO] > 0).sum(axis=1) != 1)
+
+
+def sin_negativos(t) -> pd.Series:
+    m = t["mora"]
+    return _por_socio(m, (m[["VALOR"] + COLUMNAS_RANGO] < 0).any(axis=1))
+
+
+def monto_permitido(t) -> pd.Series:
+    m = t["mora"]
+    return _por_socio(m, ~m["VALOR"].round(2).isin(MONTOS_PERMITIDOS))
+
+
+def max_cuotas_por_socio(t) -> pd.Series:
+    return t["mora"]["Codigo asociado"].value_counts() > MAX_CUOTAS_PEN
+
+
+def sin_irrecuperables(t) -> pd.Series:
+    pen = _pen_por_socio(t["cuotas"])
+    socios = pd.Index(t["mora"]["Codigo asociado"].dropna().unique())
+    return pd.Series(socios.isin(pen.index[pen > MAX_CUOTAS_PEN]), index=socios)
+
+
+def monto_por_socio_vs_base(t) -> pd.Series:
+    """Total de VALOR por socio = suma de sus cuotas PEN con monto permitido en la base (todos los socios)."""
+    m, c = t["mora"], t["cuotas"]
+    pen = _pen_por_socio(c)
+    utiles = pen.index[pen <= MAX_CUOTAS_PEN]
+    base = c[(c["estado"] == "PEN") & c["monto"].round(2).isin(MONTOS_PERMITIDOS) & c["socio_id"].isin(utiles)]
+    esperado = base.groupby("socio_id")["monto"].sum()
+    en_mora = m.groupby("Codigo asociado")["VALOR"].sum()
+    esperado, en_mora = esperado.align(en_mora, fill_value=0.0)
+    return (esperado - en_mora).abs() >= TOLERANCIA
+
+
+def plan_total_coherente(t) -> pd.Series:
+    p = t["plan"]
+    n = pd.to_numeric(p.get("num_cuotas"), errors="coerce")
+    cuota = pd.to_numeric(p.get("monto_cuota"), errors="coerce")
+    total = pd.to_numeric(p["Monto_total"], errors="coerce")
+    # Redondeo de centavo por cuota; sin número de cuotas o monto en el texto no hay qué comparar
+    falla = ((total - n * cuota).abs() > TOLERANCIA * n.clip(lower=1)) & n.notna() & cuota.notna()
+    return pd.Series(falla.to_numpy(), index=p["Codigo_socio"].to_numpy())
+
+
+def comprobante_repetido_en_periodo(t) -> pd.Series:
+    """El mismo COMPROBANTE aplicado dos veces al mismo periodo (FECHA COMPROB.)."""
+    o = t["odoo"]
+    falla = o.duplicated(subset=["COMPROBANTE", "FECHA COMPROB."], keep=False) & o["COMPROBANTE"].notna()
+    return pd.Series(falla.to_numpy(), index=o["COMPROBANTE"].to_numpy())
+
+
+def pago_duplicado(t) -> pd.Series:
+    """Filas idénticas (comprobante, periodo, fecha de registro, monto, consumidor) en las exportaciones
+    sin depurar: el pago se cargó dos veces (depurar_detalle lo descarta del detalle unificado)."""
+    o = t["odoo_crudo"]
+    falla = o.duplicated(subset=["COMPROBANTE", "FECHA COMPROB.", "FECHA REGISTRO", "MONTO", "CONSUMIDOR"], keep=False)
+    return pd.Series(falla.to_numpy(), index=o["COMPROBANTE"].to_numpy())
+
+
+# (código, tablas necesarias, descripción, función, presupuesto en ms)
+REGLAS = [
+    ("R01", ("mora",), "VALOR = suma de los rangos de días", valor_igual_suma_rangos, 50),
+    ("R02", ("mora",), "Exactamente un rango con monto por fila", un_rango_por_fila, 50),
+    ("R03", ("mora",), f"Como máximo {MAX_CUOTAS_PEN} cuotas PEN por socio", max_cuotas_por_socio, 50),
+    ("R04", ("mora", "cuotas"), f"Ningún socio irrecuperable ({MAX_CUOTAS_PEN + 1}+ PEN en la base)", sin_irrecuperables, 100),
+    ("R05", ("mora",), "Sin negativos en VALOR ni en los rangos", sin_negativos, 50),
+    ("R06", ("mora",), "VALOR es uno de los montos permitidos", monto_permitido, 50),
+    ("R07", ("mora", "cuotas"), "VALOR por socio = cuotas PEN de la base (todos los socios)", monto_por_socio_vs_base, 150),
+    ("R08", ("plan",), "Monto_total ≈ num_cuotas × monto_cuota", plan_total_coherente, 50),
+    ("R09", ("odoo",), "COMPROBANTE repetido en el mismo periodo", comprobante_repetido_en_periodo, 50),
+    ("R10", ("odoo_crudo",), "Pago duplicado en las exportaciones (misma fila completa)", pago_duplicado, 50),
+]
+
+
+def evaluar(tablas: dict[str, pd.DataFrame], reglas=REGLAS) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(resumen por regla, violaciones) evaluando cada regla con su presupuesto de tiempo."""
+    resumen, violaciones = [], []
+    for codigo, necesita, descripcion, funcion, presupuesto in reglas:
+        fila = {"Regla": codigo, "Descripcion": descripcion, "Presupuesto_ms": presupuesto}
+        if any(n not in tablas for n in necesita):
+            faltan = [n for n in necesita if n not in tablas]
+            resumen.append({**fila, "Revisados": 0, "Violaciones": 0, "Milisegundos": 0.0, "Estado": f"SIN DATOS ({', '.join(faltan)})"})
+            continue
+        t0 = time.perf_counter()
+        falla = funcion(tablas)
+        ms = (time.perf_counter() - t0) * 1000
+        casos = falla.index[falla.to_numpy(dtype=bool)]
+        if len(casos):
+            estado = "REVISAR"
+        elif ms > presupuesto:
+            estado = "LENTA"
+        else:
+            estado = "OK"
+        resumen.append({**fila, "Revisados": len(falla), "Violaciones": len(casos), "Milisegundos": round(ms, 1), "Estado": estado})
+        ejemplos = pd.Series(casos).astype(str).value_counts(sort=False).head(MAX_EJEMPLOS)
+        violaciones += [{"Regla": codigo, "Caso": caso, "Filas": int(n)} for caso, n in ejemplos.items()]
+    return pd.DataFrame(resumen), pd.DataFrame(violaciones, columns=["Regla", "Caso", "Filas"])
+
+
+def revisar(tablas: dict[str, pd.DataFrame] | None = None, salida: Path | None = OUT_CALIDAD) -> pd.DataFrame:
+    """Carga (si hace falta) y evalúa todas las reglas; guarda el reporte y devuelve el resumen."""
+    tablas = cargar_tablas() if tablas is None else tablas
+    resumen, violaciones = evaluar(tablas)
+    if salida is not None:
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        with pd.ExcelWriter(salida, engine="openpyxl") as writer:
+            resumen.to_excel(writer, sheet_name="Resumen", index=False)
+            violaciones.to_excel(writer, sheet_name="Violaciones", index=False)
+    return resumen
+
+
+def linea_resumen(resumen: pd.DataFrame) -> str:
+    estados = resumen["Estado"].str.split().str[0].value_counts()
+    partes = [f"{n} {e}" for e, n in estados.items()]
+    return f"Calidad de datos: {', '.join(partes)} | {resumen['Milisegundos'].sum():.0f} ms en total"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Controles de calidad de datos (vectorizados, población completa).")
+    parser.add_argument("--estricto", action="store_true", help="Terminar con error si alguna regla tiene violaciones")
+    parser.add_argument("--preview", action="store_true", help="Solo la muestra de socios (ver muestra.py)")
+    args = parser.parse_args()
+
+    resumen = revisar()
+    print(resumen.to_string(index=False))
+    print(linea_resumen(resumen))
+    print(f"Reporte guardado en: {OUT_CALIDAD}")
+    if args.estricto and (resumen["Estado"] == "REVISAR").any():
+        raise SystemExit("Hay reglas de calidad con violaciones.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+API de consulta de la cartera para notebooks y scripts (CarteraStore).
+
+Reúne las cargas que hoy se repiten en cada notebook (maestros, mora, cruce, pagos Odoo,
+cuotas pendientes) detrás de una sola clase, usando los cargadores existentes:
+- socios    ← Membership + socios.xlsx + reporte de mora (cruzar_odoo_mora_socios)
+- mora      ← odoo/odoo_vs_mora_socios (Clasificacion, Rango) o, si no existe, el reporte de mora
+- pagos     ← odoo/odoo_cuotas_unificado con el código de socio resuelto por nombre
+- pendientes← cuotas PEN (aging.cargar_cuotas_pendientes) y su MotorAging
+
+Cada tabla se carga la primera vez que una consulta la necesita y se guarda indexada:
+- claves de socio ordenadas (int64) → `searchsorted` da el tramo de filas de un socio;
+- pagos ordenados por FECHA_PAGO (ns) → un rango de fechas son dos `searchsorted`;
+- columnas categóricas (estado, rango, clasificación) → posiciones por valor.
+Los resultados se guardan en una caché LRU por (consulta, argumentos); una consulta repetida
+devuelve una copia del resultado guardado sin volver a filtrar.
+
+Uso:
+    from cartera import CarteraStore
+    c = CarteraStore()
+    c.socio(7572)                                   # dict: datos, pagos, pendientes
+    c.pagos("2026-01-01", "2026-01-31", estado="Aplicado")
+    c.mora(rango="de 31 a 60", clasificacion="Sigue_en_mora")
+    c.aging("2026-02-28")
+    c.recargar()                                    # tras regenerar los intermedios
+    c.recargar("master")                            # y lo que depende de ella (socios, pagos)
+
+    python cartera.py --socio 7572                  # prueba rápida con tiempos
+"""
+
+import argparse
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent
+ODOO_DIR = BASE_DIR / "odoo"
+
+ARCHIVO_DETALLE = ODOO_DIR / "odoo_cuotas_unificado.xlsx"
+ARCHIVO_CRUCE = ODOO_DIR / "odoo_vs_mora_socios.xlsx"
+
+TAM_CACHE = 256
+
+COLUMNAS_PAGOS = [
+    "COMPROBANTE",
+    "CONSUMIDOR",
+    "MONTO",
+    "TIPO DE COMPROBANTE",
+    "TIPO PAGO",
+    "ESTADO",
+    "ESTADO SOCIO",
+    "FECHA_PAGO",
+    "FECHA_PERIODO",
+]
+
+_NULO = np.iinfo("int64").min
+
+# Tablas que se arman a partir de otra: al recargar una se recargan también estas
+DEPENDIENTES = {
+    "master": ["socios", "detalle_pagos"],
+    "mora": ["socios"],
+    "detalle_pagos": ["pagos", "pagos_socio"],
+    "pendientes": ["motor_aging"],
+}
+VISTAS = {"pagos": "detalle_pagos", "pagos_socio": "detalle_pagos"}
+
+
+class _Indice:
+    """Tabla ordenada por una clave numérica (int64) con búsqueda por tramo."""
+
+    def __init__(self, df: pd.DataFrame, clave: str, categorias=()):
+        valores = df[clave]
+        if pd.api.types.is_datetime64_any_dtype(valores):
+            k = valores.astype("datetime64[ns]").to_numpy().view("int64")
+        else:
+            k = pd.to_numeric(valores, errors="coerce").astype("Int64").fillna(_NULO).to_numpy("int64")
+        ok = k != _NULO
+        orden = np.argsort(k[ok], kind="stable")
+        self.df = df[ok].iloc[orden].reset_index(drop=True)
+        self.claves = k[ok][orden]
+        self.sin_clave = int((~ok).sum())
+        # Posiciones por valor de cada columna categórica (ya en el orden de la tabla)
+        self.por_valor = {c: self.df.groupby(c, sort=False, dropna=True).indices for c in categorias}
+
+    def tramo(self, desde=None, hasta=None) -> tuple[int, int]:
+        """Filas con desde <= clave <= hasta (extremos opcionales)."""
+        lo = 0 if desde is None else int(np.searchsorted(self.claves, desde, side="left"))
+        hi = len(self.claves) if hasta is None else int(np.searchsorted(self.claves, hasta, side="right"))
+        return lo, max(lo, hi)
+
+    def posiciones(self, columna: str, valor) -> np.ndarray:
+        return self.por_valor[columna].get(valor, np.array([], dtype="int64"))
+
+
+def _ns(fecha) -> int | None:
+    return None if fecha is None else pd.Timestamp(fecha).as_unit("ns").value
+
+
+def _fin_del_dia(fecha) -> int | None:
+    """Último ns del día: `hasta` incluye todo el día aunque los pagos tengan hora."""
+    if fecha is None:
+        return None
+    return (pd.Timestamp(fecha).normalize() + pd.Timedelta(days=1)).as_unit("ns").value - 1
+
+
+class CarteraStore:
+    """Consultas de cartera sobre tablas cargadas bajo demanda e indexadas en memoria."""
+
+    def __init__(self, tam_cache: int = TAM_CACHE):
+        self.tam_cache = tam_cache
+        self._tablas: dict = {}
+        self._cache: OrderedDict = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    # ---- carga perezosa -------------------------------------------------------------------
+
+    def _tabla(self, nombre: str):
+        if nombre not in self._tablas:
+            self._tablas[nombre] = getattr(self, f"_cargar_{nombre}")()
+        return self._tablas[nombre]
+
+    def _cargar_master(self) -> pd.DataFrame:
+        from cruzar_odoo_mora_socios import cargar_membership
+
+        return cargar_membership()
+
+    def _cargar_socios(self) -> _Indice:
+        from cruzar_odoo_mora_socios import cargar_socios
+
+        master = self._tabla("master").reindex(
+            columns=["Codigo_socio", "Nombre_socio", "Nombre_norm", "Estado_membresia_odoo"]
+        )
+        socios = cargar_socios()[["Codigo_socio", "Estado_membresia", "Precio_membresia"]]
+        # El cruce puede repetir un código (dos homónimos en Odoo): una fila por socio
+        mora = self._tabla("mora").df[["Codigo_socio", "Monto_mora", "Rango_dias_por_cuotas"]].drop_duplicates("Codigo_socio")
+        datos = master.merge(socios, on="Codigo_socio", how="left").merge(mora, on="Codigo_socio", how="left")
+        return _Indice(datos, "Codigo_socio")
+
+    def _cargar_mora(self) -> _Indice:
+        if ARCHIVO_CRUCE.exists():
+            from intermedios import leer_intermedio
+
+            mora = leer_intermedio(ARCHIVO_CRUCE)
+        else:
+            from cruzar_odoo_mora_socios import cargar_mora
+
+            print(f"Aviso: no encontré {ARCHIVO_CRUCE.name}; mora sin clasificación (ejecute el cruce).")
+            mora = cargar_mora()
+            mora["Clasificacion"] = pd.NA
+        return _Indice(mora, "Codigo_socio", categorias=["Rango_dias_por_cuotas", "Clasificacion"])
+
+    def _cargar_detalle_pagos(self) -> pd.DataFrame:
+        from intermedios import leer_intermedio
+        from plan_cuotas import codigo_socio_por_nombre
+
+        if not ARCHIVO_DETALLE.exists():
+            print(f"Aviso: no encontré {ARCHIVO_DETALLE.name}; ejecute antes preparar_odoo_comparativo.py.")
+            det = pd.DataFrame(columns=COLUMNAS_PAGOS)
+        else:
+            det = leer_intermedio(ARCHIVO_DETALLE, COLUMNAS_PAGOS)
+        det["FECHA_PAGO"] = pd.to_datetime(det["FECHA_PAGO"], errors="coerce")
+        det.insert(0, "Codigo_socio", codigo_socio_por_nombre(det, self._tabla("master")).astype("Int64"))
+        # Por fecha y los sin FECHA_PAGO al final: así quedan también dentro de cada socio
+        return det.sort_values("FECHA_PAGO", kind="stable", na_position="last").reset_index(drop=True)
+
+    def _cargar_pagos(self) -> _Indice:
+        # Por FECHA_PAGO: los pagos sin fecha no entran en ningún rango de fechas (ver sin_clave)
+        return _Indice(self._tabla("detalle_pagos"), "FECHA_PAGO", categorias=["ESTADO"])
+
+    def _cargar_pagos_socio(self) -> _Indice:
+        # Mismos pagos, ordenados por socio; incluye los que no tienen FECHA_PAGO
+        return _Indice(self._tabla("detalle_pagos"), "Codigo_socio")
+
+    def _cargar_pendientes(self) -> _Indice:
+        from aging import cargar_cuotas_pendientes
+
+        return _Indice(cargar_cuotas_pendientes().sort_values("Fecha", kind="stable"), "Codigo_socio")
+
+    def _cargar_motor_aging(self):
+        from aging import MotorAging
+
+        return MotorAging.desde_tabla(self._tabla("pendientes").df, "Fecha", "Monto", "Codigo_socio")
+
+    def tabla(self, nombre: str) -> pd.DataFrame:
+        """Tabla completa ya ordenada por su clave (socios, mora, pagos, pagos_socio, pendientes)."""
+        return self._tabla(nombre).df
+
+    def recargar(self, *tablas: str) -> None:
+        """Olvida las tablas indicadas (todas si no se indica ninguna), las que se arman a partir
+        de ellas (DEPENDIENTES) y vacía la caché."""
+        # pagos y pagos_socio son dos órdenes del mismo detalle: recargarlas es recargar el detalle
+        pendientes = [VISTAS.get(t, t) for t in (tablas or self._tablas)]
+        olvidar = set()
+        while pendientes:
+            t = pendientes.pop()
+            if t not in olvidar:
+                olvidar.add(t)
+                pendientes.extend(DEPENDIENTES.get(t, ()))
+        for t in olvidar:
+            self._tablas.pop(t, None)
+        self._cache.clear()
+
+    # ---- caché LRU ------------------------------------------------------------------------
+
+    def _consulta(self, clave: tuple, calcular):
+        if clave in self._cache:
+            self._cache.move_to_end(clave)
+            self.aciertos += 1
+            res = self._cache[clave]
+        else:
+            self.fallos += 1
+            res = calcular()
+            self._cache[clave] = res
+            if len(self._cache) > self.tam_cache:
+                self._cache.popitem(last=False)
+        # Copia: quien modifica el resultado no altera lo guardado
+        if isinstance(res, dict):
+            return {k: v.copy() for k, v in res.items()}
+        return res.copy()
+
+    # ---- consultas ------------------------------------------------------------------------
+
+    def socio(self, codigo: int) -> dict:
+        """Datos del socio (maestros + mora), sus pagos Odoo y sus cuotas pendientes."""
+        codigo = int(codigo)
+
+        def calcular():
+            out = {}
+            for nombre, tabla in [("datos", "socios"), ("pagos", "pagos_socio"), ("pendientes", "pendientes")]:
+                idx = self._tabla(tabla)
+                lo, hi = idx.tramo(codigo, codigo)
+                out[nombre] = idx.df.iloc[lo:hi].reset_index(drop=True)
+            return out
+
+        return self._consulta(("socio", codigo), calcular)
+
+    def pagos(self, desde=None, hasta=None, estado: str | None = None) -> pd.DataFrame:
+        """Pagos Odoo con FECHA_PAGO entre desde y hasta (días incluidos), opcionalmente por ESTADO."""
+
+        def calcular():
+            idx = self._tabla("pagos")
+            lo, hi = idx.tramo(_ns(desde), _fin_del_dia(hasta))
+            if estado is None:
+                return idx.df.iloc[lo:hi].reset_index(drop=True)
+            pos = idx.posiciones("ESTADO", estado)
+            pos = pos[(pos >= lo) & (pos < hi)]
+            return idx.df.iloc[pos].reset_index(drop=True)
+
+        return self._consulta(("pagos", _ns(desde), _fin_del_dia(hasta), estado), calcular)
+
+    def mora(self, rango: str | None = None, clasificacion: str | None = None) -> pd.DataFrame:
+        """Socios del cruce de mora filtrados por rango de días y/o clasificación."""
+
+        def calcular():
+            idx = self._tabla("mora")
+            pos = np.arange(len(idx.df))
+            if rango is not None:
+                pos = np.intersect1d(pos, idx.posiciones("Rango_dias_por_cuotas", rango), assume_unique=True)
+            if clasificacion is not None:
+                pos = np.intersect1d(pos, idx.posiciones("Clasificacion", clasificacion), assume_unique=True)
+            return idx.df.iloc[pos].reset_index(drop=True)
+
+        return self._consulta(("mora", rango, clasificacion), calcular)
+
+    def aging(self, as_of=None, por_socio: bool = False) -> pd.DataFrame:
+        """Aging de las cuotas pendientes a la fecha de corte (hoy si no se indica)."""
+        corte = pd.Timestamp(as_of if as_of is not None else pd.Timestamp.now()).normalize()
+
+        def calcular():
+            motor = self._tabla("motor_aging")
+            return motor.por_socio(corte) if por_socio else motor.al_corte(corte)
+
+        return self._consulta(("aging", corte.value, por_socio), calcular)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prueba rápida de CarteraStore (primera consulta vs repetida).")
+    parser.add_argument("--socio", type=int, help="Código de socio a consultar")
+    parser.add_argument("--corte", help="Fecha de corte del aging (AAAA-MM-DD)")
+    args = parser.parse_args()
+
+    c = CarteraStore()
+    consultas = [
+        ("aging", lambda: c.aging(args.corte)),
+        ("mora Sigue_en_mora", lambda: c.mora(clasificacion="Sigue_en_mora")),
+        ("pagos Aplicado", lambda: c.pagos(estado="Aplicado")),
+    ]
+    if args.socio is not None:
+        consultas.append((f"socio {args.socio}", lambda: c.socio(args.socio)))
+
+    for nombre, f in consultas:
+        t0 = time.perf_counter()
+        res = f()
+        t1 = time.perf_counter()
+        f()
+        t2 = time.perf_counter()
+        filas = sum(len(v) for v in res.values()) if isinstance(res, dict) else len(res)
+        print(f"{nombre:<24} {filas:>6} filas | primera {1000 * (t1 - t0):9.1f} ms | repetida {1000 * (t2 - t1):7.3f} ms")
+
+    if args.socio is not None:
+        for nombre, df in c.socio(args.socio).items():
+            print(f"--- {nombre} ({len(df)})")
+            print(df.to_string(index=False) if len(df) else "(sin filas)")
+
+
+if __name__ == "__main__":
+    main()
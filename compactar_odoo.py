@@ -0,0 +1,347 @@
+"""
+Compactación y retención de los archivos mensuales de cuotas Odoo (odoo/cuotas_AAAA_MM.xlsx).
+
+Con los años, cada lectura de la historia completa abre e interpreta decenas de libros Excel
+pequeños. Este trabajo junta los meses cerrados (anteriores al mes en curso, o hasta --hasta)
+en una partición Parquet por año:
+- las filas se ordenan por CONSUMIDOR y FECHA REGISTRO y se escriben en grupos de FILAS_GRUPO
+  filas, así el min/max que Parquet guarda por grupo permite saltar socios o fechas;
+- en _manifest.json queda, por año, cada mes compactado (archivo, huella sha1, filas) y las
+  estadísticas del año (filas, min/max de FECHA REGISTRO y CONSUMIDOR, monto total), con las
+  que un lector descarta años enteros sin abrirlos;
+- un año solo se reescribe si cambió alguno de sus meses (huella distinta o mes nuevo).
+
+Retención (--retener N): los años anteriores a los últimos N años calendario dejan de guardar
+el detalle y conservan solo los pagos por mes de archivo (monto, pagos, socios únicos con su
+sketch, como odoo_pagos_mensuales), que preparar_odoo_comparativo.py vuelve a sumar a su
+resumen mensual. Los socios únicos de esos meses se cuentan dentro de su año. Es definitivo:
+para recuperar el detalle hay que borrar odoo/compactado/ y compactar de nuevo desde los .xlsx.
+Todo lo que se calcula desde el detalle deja de incluir esos años (SALIDAS_SIN_RETENIDOS: resumen
+por socio, pagos por día, agregados multigrano, y aguas abajo el cruce con mora y la
+conciliación FIFO); por eso --retener se niega a reducir años nuevos sin --confirmar, y
+preparar_odoo_comparativo.py avisa en cada corrida qué años faltan en esas salidas.
+
+Lectura (leer_historial, usada por preparar_odoo_comparativo.cargar_y_unir_archivos): cada
+archivo mensual cuya huella coincide con la del manifiesto, o que ya no está en odoo/ (movido
+con --archivar), se toma de su año compactado; los demás (meses abiertos, archivos editados
+después de compactar) se leen del .xlsx como siempre. El resultado tiene las mismas filas en el
+mismo orden que la concatenación de los .xlsx (se guarda la fila de origen, __fila).
+
+Entradas:
+- odoo/cuotas_AAAA_MM.xlsx
+
+Salida (odoo/compactado/):
+- cuotas_AAAA.parquet       detalle del año ordenado por socio y fecha
+- agregados_AAAA.parquet    pagos por mes de los años retenidos (sin detalle)
+- _manifest.json            meses, huellas y estadísticas por año
+- con --archivar, los .xlsx compactados se mueven a odoo/archivo_mensual/
+
+Uso:
+    python compactar_odoo.py                   # compacta los meses cerrados
+    python compactar_odoo.py --hasta 2025_12   # solo hasta ese mes (inclusive)
+    python compactar_odoo.py --retener 3 --confirmar   # detalle solo de los últimos 3 años
+    python compactar_odoo.py --archivar        # además mueve los .xlsx compactados
+
+    from compactar_odoo import leer_historial
+    df = leer_historial(desde="2025-01-01", socios=["ROSA JEANNETTE MORALES  HERNANDEZ"])
+"""
+
+import argparse
+import json
+import re
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import muestra
+from fuentes import leer_fuente
+from huellas import hash_archivo
+from particiones import _para_parquet, parquet_disponible
+
+BASE_DIR = Path(__file__).parent
+ODOO_DIR = BASE_DIR / "odoo"
+COMPACTADO_DIR = ODOO_DIR / "compactado"
+ARCHIVO_DIR = ODOO_DIR / "archivo_mensual"
+MANIFEST = COMPACTADO_DIR / "_manifest.json"
+
+FILAS_GRUPO = 50_000
+
+# Salidas que salen del detalle: no incluyen los años retenidos (solo odoo_pagos_mensuales los suma)
+SALIDAS_SIN_RETENIDOS = [
+    "odoo_cuotas_unificado y particiones/cuotas_detalle",
+    "odoo_resumen_socios",
+    "odoo_pagos_por_dia y odoo_pagos_agregados",
+    "odoo_vs_mora_socios (cruzar_odoo_mora_socios.py)",
+    "conciliación FIFO",
+]
+PATRON = re.compile(r"cuotas_(\d{4})_(\d{2})\.xlsx$")
+
+
+def periodo_archivo(path: Path) -> int | None:
+    """AAAAMM del nombre cuotas_AAAA_MM.xlsx (None si no sigue el patrón)."""
+    m = PATRON.search(Path(path).name)
+    return int(m[1]) * 100 + int(m[2]) if m else None
+
+
+def leer_manifest() -> dict:
+    if not MANIFEST.exists():
+        return {}
+    try:
+        return json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+
+
+def _ruta_anio(anio: str | int) -> Path:
+    return COMPACTADO_DIR / f"cuotas_{anio}.parquet"
+
+
+def _ruta_agregados(anio: str | int) -> Path:
+    return COMPACTADO_DIR / f"agregados_{anio}.parquet"
+
+
+def _leer_mes(path: Path) -> pd.DataFrame:
+    df = leer_fuente("odoo_cuotas", path)
+    df["__archivo"] = path.name
+    df["__fila"] = np.arange(len(df), dtype="int64")
+    return df
+
+
+def _estadisticas(df: pd.DataFrame) -> dict:
+    fechas = df["FECHA REGISTRO"].dropna().astype(str)
+    socios = df["CONSUMIDOR"].dropna().astype(str)
+    return {
+        "filas": int(len(df)),
+        "fecha_min": fechas.min() if len(fechas) else None,
+        "fecha_max": fechas.max() if len(fechas) else None,
+        "socio_min": socios.min() if len(socios) else None,
+        "socio_max": socios.max() if len(socios) else None,
+        "monto_total": round(float(pd.to_numeric(df["MONTO"], errors="coerce").sum()), 2),
+    }
+
+
+def _pagos_por_mes(df: pd.DataFrame) -> pd.DataFrame:
+    """Resumen mensual (como odoo_pagos_mensuales) de un año, para guardar en lugar del detalle."""
+    from preparar_odoo_comparativo import depurar_detalle, preparar_detalle, preparar_pagos_mensuales
+
+    det = depurar_detalle(preparar_detalle(df.sort_values(["__archivo", "__fila"]).drop(columns="__fila")))
+    return preparar_pagos_mensuales(det)
+
+
+def _meses_cerrados(hasta: int) -> dict[str, list[Path]]:
+    cerrados: dict[str, list[Path]] = {}
+    for path in sorted(ODOO_DIR.glob("cuotas_*.xlsx")):
+        per = periodo_archivo(path)
+        if per is not None and per <= hasta:
+            cerrados.setdefault(str(per // 100), []).append(path)
+    return cerrados
+
+
+def _hasta_por_defecto() -> int:
+    anterior = pd.Timestamp.today().to_period("M") - 1
+    return anterior.year * 100 + anterior.month
+
+
+def anios_retenidos() -> list[str]:
+    """Años que ya quedaron solo como agregados (sin detalle)."""
+    return [a for a, e in sorted(leer_manifest().items()) if e.get("estado") == "agregados"]
+
+
+def anios_a_retener(retener: int, hasta: int | None = None) -> list[str]:
+    """Años con detalle que `compactar(..., retener)` reduciría a agregados."""
+    limite = pd.Timestamp.today().year - retener
+    manifest = leer_manifest()
+    candidatos = set(manifest) | set(_meses_cerrados(hasta or _hasta_por_defecto()))
+    return sorted(a for a in candidatos if int(a) <= limite and manifest.get(a, {}).get("estado") != "agregados")
+
+
+def compactar(hasta: int | None = None, retener: int | None = None, archivar: bool = False) -> dict:
+    """Compacta los meses cerrados por año y aplica la retención. Devuelve el resumen por año."""
+    hasta = hasta or _hasta_por_defecto()
+    limite_detalle = pd.Timestamp.today().year - retener if retener else None
+    cerrados = _meses_cerrados(hasta)
+
+    manifest = leer_manifest()
+    COMPACTADO_DIR.mkdir(parents=True, exist_ok=True)
+    resumen: dict[str, str] = {}
+    for anio in sorted(set(manifest) | set(cerrados)):
+        previo = manifest.get(anio, {})
+        meses_previos = {m["archivo"]: m for m in previo.get("meses", [])}
+        presentes = {p.name: p for p in cerrados.get(anio, [])}
+        huellas = {n: hash_archivo(p) for n, p in presentes.items()}
+        cambiados = [n for n, h in huellas.items() if meses_previos.get(n, {}).get("huella") != h]
+        retenido = previo.get("estado") == "agregados"
+        a_retener = limite_detalle is not None and int(anio) <= limite_detalle
+
+        if retenido:
+            # Sin detalle: un archivo editado después de retener se vuelve a leer del .xlsx
+            resumen[anio] = "solo agregados" + (f" ({len(cambiados)} archivos cambiados se leen aparte)" if cambiados else "")
+            continue
+        if not cambiados and not (a_retener and previo):
+            resumen[anio] = "sin cambios"
+            if archivar:
+                _archivar(presentes.values())
+            continue
+
+        # Meses que no cambiaron (o cuyo .xlsx ya se archivó) se toman del año compactado
+        partes = []
+        reutilizar = [n for n in meses_previos if n not in cambiados]
+        if reutilizar and _ruta_anio(anio).exists():
+            anterior = pd.read_parquet(_ruta_anio(anio), filters=[("__archivo", "in", reutilizar)])
+            partes.append(anterior)
+        partes += [_leer_mes(presentes[n]) for n in cambiados]
+        df = pd.concat(partes, ignore_index=True)
+        df = df.sort_values(["CONSUMIDOR", "FECHA REGISTRO", "__archivo", "__fila"], kind="stable", ignore_index=True)
+
+        meses = sorted(
+            (
+                {
+                    "archivo": n,
+                    "huella": huellas.get(n) or meses_previos[n]["huella"],
+                    "filas": int((df["__archivo"] == n).sum()),
+                }
+                for n in set(reutilizar) | set(cambiados)
+            ),
+            key=lambda m: m["archivo"],
+        )
+        entrada = {"meses": meses, **_estadisticas(df)}
+        if a_retener:
+            _para_parquet(_pagos_por_mes(df)).to_parquet(_ruta_agregados(anio), index=False)
+            _ruta_anio(anio).unlink(missing_ok=True)
+            entrada["estado"] = "agregados"
+            resumen[anio] = f"retenido: {len(meses)} meses reducidos a agregados"
+        else:
+            tmp = _ruta_anio(anio).with_suffix(".parquet.tmp")
+            _para_parquet(df).to_parquet(tmp, index=False, row_group_size=FILAS_GRUPO)
+            tmp.replace(_ruta_anio(anio))
+            entrada["estado"] = "detalle"
+            resumen[anio] = f"{len(cambiados)} meses nuevos o cambiados, {len(meses)} en total ({len(df)} filas)"
+        manifest[anio] = entrada
+        MANIFEST.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+        if archivar:
+            _archivar(presentes.values())
+    return resumen
+
+
+def _archivar(paths) -> None:
+    ARCHIVO_DIR.mkdir(parents=True, exist_ok=True)
+    for p in paths:
+        shutil.move(str(p), str(ARCHIVO_DIR / p.name))
+
+
+def huellas_compactadas() -> dict[str, str]:
+    """archivo → huella de los meses compactados (también de los ya archivados)."""
+    return {m["archivo"]: m["huella"] for e in leer_manifest().values() for m in e.get("meses", [])}
+
+
+def _descartar_anio(entrada: dict, desde: str | None, hasta: str | None, socios: list[str] | None) -> bool:
+    """True si las estadísticas del año muestran que no tiene filas del filtro."""
+    if desde and entrada.get("fecha_max") and entrada["fecha_max"] < desde:
+        return True
+    if hasta and entrada.get("fecha_min") and entrada["fecha_min"] > hasta:
+        return True
+    if socios and entrada.get("socio_min") is not None:
+        return not any(entrada["socio_min"] <= s <= entrada["socio_max"] for s in socios)
+    return False
+
+
+def leer_historial(
+    desde: str | None = None, hasta: str | None = None, socios: list[str] | None = None
+) -> pd.DataFrame | None:
+    """Cuotas Odoo de todos los meses (compactados + .xlsx sueltos) en el orden de los archivos.
+
+    `desde`/`hasta` (AAAA-MM-DD, sobre FECHA REGISTRO) y `socios` (CONSUMIDOR) filtran filas; con
+    ellos se saltan los años y grupos de filas que por su min/max no pueden tener coincidencias.
+    Devuelve None si no hay ningún mes. Lanza ValueError si a un .xlsx le faltan columnas.
+    """
+    manifest = leer_manifest() if parquet_disponible() else {}
+    if MANIFEST.exists() and not manifest:
+        print("  Aviso: hay cuotas compactadas pero falta pyarrow/fastparquet; se leen solo los .xlsx.")
+    paths = sorted(ODOO_DIR.glob("cuotas_*.xlsx"))
+    huellas = {p.name: hash_archivo(p) for p in paths}
+
+    partes: list[pd.DataFrame] = []
+    cubiertos: set[str] = set()
+    for anio, entrada in sorted(manifest.items()):
+        # Un mes está cubierto si su .xlsx no cambió desde la compactación o ya no está en odoo/
+        vigentes = [m["archivo"] for m in entrada["meses"] if huellas.get(m["archivo"], m["huella"]) == m["huella"]]
+        cubiertos.update(vigentes)
+        if entrada.get("estado") != "detalle" or not vigentes or _descartar_anio(entrada, desde, hasta, socios):
+            continue
+        filtros = [("__archivo", "in", vigentes)]
+        if desde:
+            filtros.append(("FECHA REGISTRO", ">=", desde))
+        if hasta:
+            filtros.append(("FECHA REGISTRO", "<=", hasta))
+        if socios:
+            filtros.append(("CONSUMIDOR", "in", list(socios)))
+        partes.append(muestra.filtrar(pd.read_parquet(_ruta_anio(anio), filters=filtros), "CONSUMIDOR", por="nombre"))
+
+    for path in paths:
+        if path.name in cubiertos:
+            continue
+        df = _leer_mes(path)
+        if desde:
+            df = df[df["FECHA REGISTRO"].fillna("") >= desde]
+        if hasta:
+            df = df[df["FECHA REGISTRO"].fillna("") <= hasta]
+        if socios:
+            df = df[df["CONSUMIDOR"].isin(socios)]
+        partes.append(df)
+
+    if not partes:
+        return None
+    unido = pd.concat(partes, ignore_index=True)
+    unido = unido.sort_values(["__archivo", "__fila"], kind="stable", ignore_index=True)
+    return unido.drop(columns="__fila")
+
+
+def pagos_mensuales_retenidos() -> pd.DataFrame | None:
+    """Pagos por mes de los años retenidos (solo agregados), con las columnas de odoo_pagos_mensuales."""
+    partes = [pd.read_parquet(_ruta_agregados(a)) for a in anios_retenidos() if _ruta_agregados(a).exists()]
+    return pd.concat(partes, ignore_index=True) if partes else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compacta los meses cerrados de cuotas Odoo en particiones anuales.")
+    parser.add_argument("--hasta", help="Último mes a compactar (AAAA_MM); por defecto, el mes anterior al actual")
+    parser.add_argument("--retener", type=int, help="Años calendario con detalle; los anteriores quedan solo como agregados")
+    parser.add_argument("--confirmar", action="store_true", help="Aceptar que --retener saque años del detalle")
+    parser.add_argument("--archivar", action="store_true", help=f"Mover los .xlsx compactados a {ARCHIVO_DIR.name}/")
+    args = parser.parse_args()
+
+    if not parquet_disponible():
+        raise SystemExit("La compactación requiere pyarrow (o fastparquet).")
+    hasta = None
+    if args.hasta:
+        m = re.fullmatch(r"(\d{4})_(\d{2})", args.hasta)
+        if not m:
+            raise SystemExit(f"--hasta debe tener la forma AAAA_MM: {args.hasta}")
+        hasta = int(m[1]) * 100 + int(m[2])
+    if args.retener is not None and args.retener < 1:
+        raise SystemExit("--retener debe ser al menos 1 (el año en curso)")
+
+    if args.retener is not None:
+        nuevos = anios_a_retener(args.retener, hasta)
+        if nuevos and not args.confirmar:
+            salidas = "\n".join(f"  - {s}" for s in SALIDAS_SIN_RETENIDOS)
+            raise SystemExit(
+                f"--retener {args.retener} reduciría a agregados los años {', '.join(nuevos)} y es definitivo.\n"
+                f"Solo odoo_pagos_mensuales los seguirá sumando; dejarían de incluirlos:\n{salidas}\n"
+                f"Repetir con --confirmar para aplicarlo."
+            )
+    try:
+        resumen = compactar(hasta, args.retener, args.archivar)
+    except ValueError as e:
+        raise SystemExit(f"Faltan columnas en los archivos de Odoo: {e}")
+    if not resumen:
+        print(f"No hay meses cerrados para compactar en {ODOO_DIR}")
+    for anio, texto in resumen.items():
+        print(f"  {anio}: {texto}")
+    print(f"Particiones anuales en: {COMPACTADO_DIR}")
+
+
+if __name__ == "__main__":
+    main()
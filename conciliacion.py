@@ -0,0 +1,195 @@
+"""
+Conciliación FIFO de pagos Odoo contra las cuotas pendientes de cada socio.
+
+Los pagos de cada socio, en orden de FECHA_PAGO, se aplican a sus cuotas pendientes de la
+más antigua a la más nueva. Todo se resuelve a la vez para todos los socios:
+
+- cuotas ordenadas por (socio, vencimiento) y pagos por (socio, fecha de pago);
+- acumulados por socio en centavos (enteros, sin error de redondeo);
+- lo aplicado a cada cuota = min(monto, max(0, pagado_socio - acumulado_anterior));
+- la fecha en que se canceló cada cuota sale de un `searchsorted` sobre la clave compuesta
+  socio * K + acumulado_pagado (búsqueda por segmento sin recorrer socios).
+
+Resultado: saldo restante exacto por cuota y por socio, con su antigüedad (rangos de aging)
+a la fecha de corte. El cruce lo agrega como Monto_mora_restante_fifo (acotado a Monto_mora),
+junto a la aproximación Monto_mora_restante = Monto_mora - Monto_pagado_total.
+
+Entradas:
+- BasesDeDatos-CUOTAS.xlsx (PEN) o RECUPERACION_DE_MORA.csv  (cuotas pendientes, vía aging.py)
+- odoo/odoo_cuotas_unificado.xlsx  (pagos Odoo, salida de preparar_odoo_comparativo.py)
+- odoo/Membership (res.membership).xlsx (nombre → código de socio)
+
+Salida (al ejecutarlo directamente):
+- odoo/conciliacion_fifo.xlsx  (hojas Por_socio y Por_cuota)
+
+Con --preview lee y escribe en preview/ (muestra de socios, ver muestra.py).
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aging import BORDES, a_dias, cargar_cuotas_pendientes, etiquetas_rangos
+from intermedios import leer_intermedio
+from muestra import ruta
+
+BASE_DIR = Path(__file__).parent
+ODOO_DIR = BASE_DIR / "odoo"
+
+ARCHIVO_DETALLE = ruta(ODOO_DIR / "odoo_cuotas_unificado.xlsx")
+OUT_CONCILIACION = ruta(ODOO_DIR / "conciliacion_fifo.xlsx")
+
+
+def _centavos(montos) -> np.ndarray:
+    return np.round(np.asarray(montos, dtype="float64") * 100).astype("int64")
+
+
+def _acumulado_por_segmento(valores: np.ndarray, segmento: np.ndarray) -> np.ndarray:
+    """Suma acumulada que se reinicia en cada segmento (segmento ya ordenado)."""
+    acum = np.cumsum(valores)
+    if len(valores) == 0:
+        return acum
+    inicio = np.r_[True, segmento[1:] != segmento[:-1]]
+    base = np.where(inicio, acum - valores, 0)
+    return acum - np.maximum.accumulate(base)
+
+
+def asignar_fifo(cuotas: pd.DataFrame, pagos: pd.DataFrame) -> pd.DataFrame:
+    """Aplica pagos a cuotas por socio, de la cuota más antigua a la más nueva.
+
+    cuotas: Codigo_socio, Fecha (vencimiento), Monto
+    pagos:  Codigo_socio, FECHA_PAGO, MONTO
+    Devuelve las cuotas (ordenadas por socio y vencimiento) con Monto_aplicado, Saldo y Fecha_cancelacion.
+    """
+    c = cuotas.copy()
+    c["Codigo_socio"] = pd.to_numeric(c["Codigo_socio"], errors="coerce")
+    c = c.dropna(subset=["Codigo_socio"]).astype({"Codigo_socio": "int64"})
+    c["Fecha"] = pd.to_datetime(c["Fecha"], errors="coerce")
+    c = c.sort_values(["Codigo_socio", "Fecha"], kind="stable", na_position="last").reset_index(drop=True)
+
+    p = pagos.copy()
+    p["Codigo_socio"] = pd.to_numeric(p["Codigo_socio"], errors="coerce")
+    p = p.dropna(subset=["Codigo_socio"]).astype({"Codigo_socio": "int64"})
+    p["FECHA_PAGO"] = pd.to_datetime(p["FECHA_PAGO"], errors="coerce")
+    p = p[p["Codigo_socio"].isin(c["Codigo_socio"].unique())]
+    p = p.sort_values(["Codigo_socio", "FECHA_PAGO"], kind="stable", na_position="last").reset_index(drop=True)
+
+    # Códigos de socio compactos y comunes a ambas tablas
+    socios = np.unique(c["Codigo_socio"].to_numpy())
+    sc = np.searchsorted(socios, c["Codigo_socio"].to_numpy())
+    sp = np.searchsorted(socios, p["Codigo_socio"].to_numpy())
+
+    monto_c = _centavos(c["Monto"].fillna(0.0).clip(lower=0.0))
+    acum_c = _acumulado_por_segmento(monto_c, sc)
+    previo_c = acum_c - monto_c
+
+    monto_p = _centavos(p["MONTO"].fillna(0.0).clip(lower=0.0))
+    acum_p = _acumulado_por_segmento(monto_p, sp)
+    pagado_socio = np.bincount(sp, weights=monto_p, minlength=len(socios)).astype("int64")
+
+    aplicado = np.clip(pagado_socio[sc] - previo_c, 0, monto_c)
+    saldo = monto_c - aplicado
+
+    # Pago con el que se completa cada cuota cancelada: primer pago del socio cuyo acumulado >= acum_c
+    k = int(max(acum_p.max(initial=0), acum_c.max(initial=0))) + 1
+    clave_p = sp.astype("int64") * k + acum_p
+    pos = np.searchsorted(clave_p, sc.astype("int64") * k + acum_c, side="left")
+    cancelada = (saldo == 0) & (monto_c > 0)
+    fechas_p = p["FECHA_PAGO"].to_numpy()
+    fecha_cancel = np.full(len(c), np.datetime64("NaT"), dtype="datetime64[ns]")
+    ok = cancelada & (pos < len(p))
+    fecha_cancel[ok] = fechas_p[pos[ok]]
+
+    c["Monto_aplicado"] = aplicado / 100
+    c["Saldo"] = saldo / 100
+    c["Fecha_cancelacion"] = fecha_cancel
+    return c
+
+
+def resumen_por_socio(asignado: pd.DataFrame, pagos: pd.DataFrame, corte=None, bordes=BORDES) -> pd.DataFrame:
+    """Saldo restante exacto y su antigüedad (rangos de aging a la fecha de corte) por socio."""
+    corte = pd.Timestamp(corte) if corte is not None else pd.Timestamp.now().normalize()
+    etiquetas = etiquetas_rangos(bordes)
+    dias_mora = a_dias([corte])[0] - a_dias(asignado["Fecha"])
+    rango = np.searchsorted(np.asarray(bordes), dias_mora, side="right") - 1
+    rango = np.where(asignado["Fecha"].isna().to_numpy() | (dias_mora < 0), 0, rango)
+
+    socios, sc = np.unique(asignado["Codigo_socio"].to_numpy(), return_inverse=True)
+    saldo = asignado["Saldo"].to_numpy()
+    pendiente = saldo > 0
+    res = pd.DataFrame(
+        {
+            "Codigo_socio": socios,
+            "Monto_cuotas": np.bincount(sc, weights=asignado["Monto"].fillna(0.0).to_numpy(), minlength=len(socios)).round(2),
+            "Monto_aplicado_fifo": np.bincount(sc, weights=asignado["Monto_aplicado"].to_numpy(), minlength=len(socios)).round(2),
+            "Monto_mora_restante": np.bincount(sc, weights=saldo, minlength=len(socios)).round(2),
+            "Cuotas_pendientes": np.bincount(sc, weights=pendiente, minlength=len(socios)).astype("int64"),
+            "Cuotas_canceladas": np.bincount(sc, weights=~pendiente, minlength=len(socios)).astype("int64"),
+        }
+    )
+    tabla = np.bincount(sc * len(etiquetas) + rango, weights=saldo, minlength=len(socios) * len(etiquetas))
+    for i, etiq in enumerate(etiquetas):
+        res[f"Restante {etiq}"] = tabla.reshape(len(socios), len(etiquetas))[:, i].round(2)
+
+    # Cuota pendiente más antigua (las cuotas están ordenadas por socio y fecha: primera pendiente del segmento)
+    idx_pend = np.flatnonzero(pendiente)
+    primera = np.unique(sc[idx_pend], return_index=True)
+    mas_antigua = pd.Series(pd.NaT, index=range(len(socios)), dtype="datetime64[ns]")
+    mas_antigua.iloc[primera[0]] = asignado["Fecha"].to_numpy()[idx_pend[primera[1]]]
+    res["Cuota_pendiente_mas_antigua"] = mas_antigua.to_numpy()
+
+    # Pagos que exceden el total de cuotas (saldo a favor)
+    pagado = pagos.groupby(pd.to_numeric(pagos["Codigo_socio"], errors="coerce"))["MONTO"].sum()
+    res["Saldo_a_favor"] = (res["Codigo_socio"].map(pagado).fillna(0.0) - res["Monto_aplicado_fifo"]).clip(lower=0.0).round(2)
+    return res
+
+
+def pagos_por_codigo(det: pd.DataFrame, master: pd.DataFrame) -> pd.DataFrame:
+    """Pagos Odoo (Codigo_socio, FECHA_PAGO, MONTO); el código se resuelve por nombre normalizado como en el cruce."""
+    from plan_cuotas import codigo_socio_por_nombre
+
+    fecha = det["FECHA_PAGO"] if "FECHA_PAGO" in det.columns else det.get("FECHA REGISTRO")
+    return pd.DataFrame(
+        {
+            "Codigo_socio": codigo_socio_por_nombre(det, master).to_numpy(),
+            "FECHA_PAGO": pd.to_datetime(fecha, errors="coerce").to_numpy(),
+            "MONTO": pd.to_numeric(det["MONTO"], errors="coerce").fillna(0.0).to_numpy(),
+        }
+    )
+
+
+def cargar_pagos_odoo() -> pd.DataFrame:
+    """Detalle unificado de pagos Odoo (vacío si aún no se ejecutó preparar_odoo_comparativo.py)."""
+    if not ARCHIVO_DETALLE.exists():
+        print(f"Aviso: no encontré {ARCHIVO_DETALLE.name}; ejecute antes preparar_odoo_comparativo.py.")
+        return pd.DataFrame(columns=["CONSUMIDOR", "FECHA_PAGO", "MONTO"])
+    return leer_intermedio(ARCHIVO_DETALLE, ["CONSUMIDOR", "FECHA_PAGO", "FECHA REGISTRO", "MONTO"])
+
+
+def conciliar(master: pd.DataFrame, corte=None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(por socio, por cuota) con la asignación FIFO de todos los pagos Odoo."""
+    cuotas = cargar_cuotas_pendientes()
+    pagos = pagos_por_codigo(cargar_pagos_odoo(), master)
+    asignado = asignar_fifo(cuotas, pagos)
+    return resumen_por_socio(asignado, pagos, corte), asignado
+
+
+def main() -> None:
+    from cruzar_odoo_mora_socios import cargar_membership
+
+    por_socio, por_cuota = conciliar(cargar_membership())
+    ODOO_DIR.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(OUT_CONCILIACION, engine="openpyxl") as writer:
+        por_socio.to_excel(writer, sheet_name="Por_socio", index=False)
+        por_cuota.to_excel(writer, sheet_name="Por_cuota", index=False)
+
+    print(f"Conciliación FIFO guardada en: {OUT_CONCILIACION}")
+    print(
+        f"  {len(por_cuota)} cuotas de {len(por_socio)} socios | aplicado: {por_socio['Monto_aplicado_fifo'].sum():,.2f}"
+        f" | restante: {por_socio['Monto_mora_restante'].sum():,.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,21 @@ from pathlib import Path
 
 import pandas as pd
 
+from aging import ARCHIVO_CUOTAS as ARCHIVO_CUOTAS_PEN, CSV_MORA as CSV_MORA_PEN
+from conciliacion import ARCHIVO_DETALLE as ARCHIVO_DETALLE_ODOO, conciliar
+from fuentes import leer_fuente, normalizar_nombres
+from intermedios import guardar_intermedio, leer_intermedio
+from muestra import EN_PREVIEW, informar, ruta
 
 BASE_DIR = Path(__file__).parent
 ODOO_DIR = BASE_DIR / "odoo"
 
 ARCHIVO_MORA = BASE_DIR / "Reporte_act_cuotas_completas.xlsx"
 ARCHIVO_MEMBERSHIP = ODOO_DIR / "Membership (res.membership).xlsx"
-ARCHIVO_RESUMEN_ODOO = ODOO_DIR / "odoo_resumen_socios.xlsx"
+ARCHIVO_RESUMEN_ODOO = ruta(ODOO_DIR / "odoo_resumen_socios.xlsx")
 ARCHIVO_SOCIOS = BASE_DIR / "socios.xlsx"
 
-OUT_CRUCE = ODOO_DIR / "odoo_vs_mora_socios.xlsx"
+OUT_CRUCE = ruta(ODOO_DIR / "odoo_vs_mora_socios.xlsx")
 
 
 def _parse_cuotas(texto: str) -> int | None:
@@ -48,42 +53,21 @@ def _rango_por_cuotas(n: int | None) -> str:
     return "mas de 121 días"
 
 
-def _normalizar_nombre(texto: str) -> str:
-    if not isinstance(texto, str):
-        return ""
-    t = texto.strip().upper()
-    # Quitar dobles espacios
-    while "  " in t:
-        t = t.replace("  ", " ")
-    return t
-
-
 def cargar_mora() -> pd.DataFrame:
     """Carga el reporte de mora con código de socio, monto total y rango de días (según cuotas)."""
     if not ARCHIVO_MORA.exists():
         raise SystemExit(f"No encuentro el archivo de mora: {ARCHIVO_MORA}")
 
-    df = pd.read_excel(ARCHIVO_MORA, sheet_name="Montos por socio", header=3)
-    df.columns = [str(c).strip() for c in df.columns]
-
-    # El archivo viene con acentos rotos: 'C�digo socio'
-    col_codigo = next((c for c in df.columns if "c" in c.lower() and "socio" in c.lower()), None)
-    col_monto = next((c for c in df.columns if "monto total" in c.lower()), None)
-    # Columna de texto de cuotas (suele ser Unnamed: 3)
-    col_texto = next((c for c in df.columns if "unnamed" in c.lower()), None)
-
-    if not col_codigo or not col_monto:
-        raise SystemExit(f"No encontré columnas de código/monto en {ARCHIVO_MORA}: {df.columns}")
-
-    mora = df[[col_codigo, col_monto]].copy()
-    mora.rename(columns={col_codigo: "Codigo_socio", col_monto: "Monto_mora"}, inplace=True)
-    mora["Codigo_socio"] = pd.to_numeric(mora["Codigo_socio"], errors="coerce").astype("Int64")
-    mora["Monto_mora"] = pd.to_numeric(mora["Monto_mora"], errors="coerce").fillna(0.0)
+    # Solo código, monto y texto de cuotas (acentos rotos incluidos, ver FUENTES en fuentes.py)
+    try:
+        mora = leer_fuente("reporte_mora", ARCHIVO_MORA)
+    except ValueError as e:
+        raise SystemExit(f"No encontré columnas de código/monto en {ARCHIVO_MORA}: {e}")
+    mora["Monto_mora"] = mora["Monto_mora"].fillna(0.0)
 
     # Rango de días según texto de cuotas (si existe)
-    if col_texto and col_texto in df.columns:
-        texto_series = df[col_texto].astype(str)
-        num_cuotas = [ _parse_cuotas(t) for t in texto_series ]
+    if "texto_cuotas" in mora.columns:
+        num_cuotas = [_parse_cuotas(t) for t in mora.pop("texto_cuotas")]
         mora["num_cuotas_calc"] = pd.Series(num_cuotas, index=mora.index)
         mora["Rango_dias_por_cuotas"] = [
             _rango_por_cuotas(n if pd.notna(n) else None) for n in mora["num_cuotas_calc"]
@@ -106,24 +90,22 @@ def cargar_mora() -> pd.DataFrame:
 
 
 def cargar_membership() -> pd.DataFrame:
-    """Carga el maestro de socios con código + nombre desde Odoo Membership."""
-    if not ARCHIVO_MEMBERSHIP.exists():
-        raise SystemExit(f"No encuentro el archivo de membership: {ARCHIVO_MEMBERSHIP}")
-
-    df = pd.read_excel(ARCHIVO_MEMBERSHIP)
-    df.columns = [str(c).strip() for c in df.columns]
-
-    col_codigo = next((c for c in df.columns if "código de socio" in c.lower() or "codigo de socio" in c.lower()), None)
-    col_nombre = next((c for c in df.columns if "miembro/nombre" in c.lower() or "nombre" in c.lower()), None)
-
-    if not col_codigo or not col_nombre:
-        raise SystemExit(f"No encontré columnas de código/nombre en {ARCHIVO_MEMBERSHIP}: {df.columns}")
-
-    master = df[[col_codigo, col_nombre]].copy()
-    master.rename(columns={col_codigo: "Codigo_socio", col_nombre: "Nombre_socio"}, inplace=True)
-    master["Codigo_socio"] = pd.to_numeric(master["Codigo_socio"], errors="coerce").astype("Int64")
-    master["Nombre_socio"] = master["Nombre_socio"].astype(str).str.strip()
-    master["Nombre_norm"] = master["Nombre_socio"].map(_normalizar_nombre)
+    """Carga el maestro de socios con código + nombre desde Odoo Membership.
+
+    Si odoo_rpc.py ya trajo la membresía al almacén, se usa esa en lugar del xlsx, salvo que
+    el xlsx sea más nuevo que la última sincronización.
+    """
+    from odoo_rpc import membership_desde_almacen
+
+    master = membership_desde_almacen([ARCHIVO_MEMBERSHIP])
+    if master is None:
+        if not ARCHIVO_MEMBERSHIP.exists():
+            raise SystemExit(f"No encuentro el archivo de membership: {ARCHIVO_MEMBERSHIP}")
+        try:
+            master = leer_fuente("membership", ARCHIVO_MEMBERSHIP)
+        except ValueError as e:
+            raise SystemExit(f"No encontré columnas de código/nombre en {ARCHIVO_MEMBERSHIP}: {e}")
+    master["Nombre_norm"] = normalizar_nombres(master["Nombre_socio"])
     master = master[master["Codigo_socio"].notna()].copy()
     # Depuración: un código puede repetirse → quedarse con la primera fila
     antes = len(master)
@@ -139,37 +121,12 @@ def cargar_socios() -> pd.DataFrame:
         print(f"Aviso: no encontré socios.xlsx en {ARCHIVO_SOCIOS}, se omite este maestro.")
         return pd.DataFrame(columns=["Codigo_socio", "Estado_membresia", "Precio_membresia"])
 
-    df = pd.read_excel(ARCHIVO_SOCIOS)
-    df.columns = [str(c).strip() for c in df.columns]
-
-    col_codigo = next(
-        (c for c in df.columns if "código de socio" in c.lower() or "codigo de socio" in c.lower()),
-        None,
-    )
-    col_estado = next(
-        (c for c in df.columns if "estado de la membres" in c.lower()),
-        None,
-    )
-    col_precio = next(
-        (c for c in df.columns if "precio de membres" in c.lower()),
-        None,
-    )
-
-    if not col_codigo or not col_estado:
-        print(f"Aviso: no pude identificar columnas de código/estado en socios.xlsx: {df.columns}")
+    try:
+        socios = leer_fuente("socios", ARCHIVO_SOCIOS)
+    except ValueError as e:
+        print(f"Aviso: no pude identificar columnas de código/estado en socios.xlsx: {e}")
         return pd.DataFrame(columns=["Codigo_socio", "Estado_membresia", "Precio_membresia"])
 
-    cols = [col_codigo, col_estado] + ([col_precio] if col_precio else [])
-    socios = df[cols].copy()
-    rename_map = {col_codigo: "Codigo_socio", col_estado: "Estado_membresia"}
-    if col_precio:
-        rename_map[col_precio] = "Precio_membresia"
-    socios.rename(columns=rename_map, inplace=True)
-
-    socios["Codigo_socio"] = pd.to_numeric(socios["Codigo_socio"], errors="coerce").astype("Int64")
-    if "Precio_membresia" in socios.columns:
-        socios["Precio_membresia"] = pd.to_numeric(socios["Precio_membresia"], errors="coerce")
-    socios["Estado_membresia"] = socios["Estado_membresia"].astype(str).str.strip()
     socios = socios[socios["Codigo_socio"].notna()].copy()
     socios = socios.drop_duplicates(subset=["Codigo_socio"], keep="first").copy()
     return socios
@@ -180,7 +137,7 @@ def cargar_resumen_odoo() -> pd.DataFrame:
     if not ARCHIVO_RESUMEN_ODOO.exists():
         raise SystemExit(f"No encuentro el archivo de resumen Odoo: {ARCHIVO_RESUMEN_ODOO}")
 
-    df = pd.read_excel(ARCHIVO_RESUMEN_ODOO)
+    df = leer_intermedio(ARCHIVO_RESUMEN_ODOO)
     df.columns = [str(c).strip() for c in df.columns]
 
     if "CONSUMIDOR" not in df.columns:
@@ -188,7 +145,7 @@ def cargar_resumen_odoo() -> pd.DataFrame:
 
     od = df.copy()
     od["CONSUMIDOR"] = od["CONSUMIDOR"].astype(str).str.strip()
-    od["Nombre_norm"] = od["CONSUMIDOR"].map(_normalizar_nombre)
+    od["Nombre_norm"] = normalizar_nombres(od["CONSUMIDOR"])
 
     # Nos quedamos con columnas relevantes
     cols = [
@@ -261,6 +218,20 @@ def main() -> None:
 
     # Monto de mora restante ≈ mora - pagado (no negativo)
     cruce["Monto_mora_restante"] = (cruce["Monto_mora"] - cruce["Monto_pagado_total"]).clip(lower=0.0)
+    # Aparte, el saldo FIFO de conciliacion.py: sale de otra base de cuotas (BasesDeDatos-CUOTAS o
+    # RECUPERACION_DE_MORA.csv), así que va en su propia columna y acotado a Monto_mora
+    hay_cuotas = ARCHIVO_CUOTAS_PEN.exists() or CSV_MORA_PEN.exists()
+    if ARCHIVO_DETALLE_ODOO.exists() and hay_cuotas:
+        print("Conciliando pagos Odoo contra cuotas (FIFO)...")
+        por_socio, _ = conciliar(master)
+        fifo = por_socio.set_index("Codigo_socio")
+        codigos = cruce["Codigo_socio"].astype("float").astype("Int64")
+        restante = codigos.map(fifo["Monto_mora_restante"]).astype("float64")
+        cruce["Monto_mora_restante_fifo"] = restante.clip(upper=cruce["Monto_mora"].fillna(0.0)).to_numpy()
+        cruce["Cuota_pendiente_mas_antigua"] = codigos.map(fifo["Cuota_pendiente_mas_antigua"]).to_numpy()
+        print(f"  Saldo restante FIFO para {int(restante.notna().sum())} de {len(cruce)} socios")
+    elif ARCHIVO_DETALLE_ODOO.exists():
+        print(f"Aviso: sin {ARCHIVO_CUOTAS_PEN.name} ni {CSV_MORA_PEN.name}, se omite la conciliación FIFO.")
 
     # Clasificación
     cruce["Clasificacion"] = cruce.apply(clasificar_fila, axis=1)
@@ -278,14 +249,15 @@ def main() -> None:
     cruce = cruce.drop(columns=["__orden"])
 
     # Guardar resultado
-    ODOO_DIR.mkdir(parents=True, exist_ok=True)
-    cruce.to_excel(OUT_CRUCE, index=False)
+    guardar_intermedio(cruce, OUT_CRUCE)
     print(f"Cruce Odoo vs mora guardado en: {OUT_CRUCE}")
 
     # Pequeño resumen por clasificación
     resumen_clasif = cruce.groupby("Clasificacion")["Codigo_socio"].nunique().reset_index(name="Socios_unicos")
     print("\nSocios por clasificación:")
     print(resumen_clasif.to_string(index=False))
+    if EN_PREVIEW:
+        informar("cruce", cruce, "Codigo_socio", ["Monto_mora", "Monto_pagado_total", "Monto_mora_restante"])
 
 
 if __name__ == "__main__":
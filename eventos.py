@@ -0,0 +1,378 @@
+"""
+Libro de eventos (append-only) de cuotas y pagos, con materialización incremental por socio.
+
+En lugar de reconstruir el estado desde las fotos completas en cada corrida, cada fuente nueva
+se reduce a eventos y solo se agregan al libro:
+- CUOTA_EMITIDA    cuota que aparece por primera vez en la base de cuotas
+- CAMBIO_ESTADO    la cuota cambió de estado (PEN → PGD/APL/CON/DEV/MI), de monto o de vencimiento
+- CUOTA_BAJA       la cuota ya no está en la base
+- PAGO_REGISTRADO  pago de Odoo no visto antes (clave hash de la fila, sin importar el archivo)
+
+Las cuotas se identifican con la misma clave que las fotos de roll-rate (rollrates.claves_cuota),
+así que ambos históricos hablan de las mismas cuotas.
+
+Libro: historico/eventos/eventos_<seq inicial>_<seq final>.(parquet|csv). Cada registro escribe
+un segmento nuevo con números de secuencia (SEQ) consecutivos; los segmentos no se reescriben.
+
+Materialización: el estado (cuotas vigentes, pagos acumulados por socio, claves de pago vistas)
+se obtiene plegando los eventos en orden de SEQ. Cada CADA_EVENTOS eventos se guarda un
+checkpoint en historico/eventos/checkpoints/; el estado actual parte del último checkpoint y
+aplica solo los segmentos posteriores, sin volver a leer la historia.
+
+Entradas:
+- BasesDeDatos-CUOTAS.xlsx (hoja BD CuotasPendientes, foto actual)
+- odoo/odoo_cuotas_unificado (pagos Odoo, salida de preparar_odoo_comparativo.py)
+- odoo/Membership (res.membership).xlsx (nombre → código de socio)
+
+Salida:
+- sep/Estado_socios_eventos.xlsx  (estado actual por socio)
+
+Ejecutar:
+    python eventos.py                        # registra la foto y los pagos nuevos, materializa
+    python eventos.py --fecha 2026-01-31     # fecha de la foto (por defecto: modificación del archivo)
+    python eventos.py --sin-registrar        # solo materializa
+    python eventos.py --checkpoint           # fuerza un checkpoint al terminar
+    python eventos.py --verificar            # compara el estado incremental con el plegado desde cero
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from particiones import _para_parquet, parquet_disponible
+
+BASE_DIR = Path(__file__).parent
+
+ARCHIVO_CUOTAS = BASE_DIR / "BasesDeDatos-CUOTAS.xlsx"
+ARCHIVO_DETALLE = BASE_DIR / "odoo" / "odoo_cuotas_unificado.xlsx"
+EVENTOS_DIR = BASE_DIR / "historico" / "eventos"
+CHECKPOINT_DIR = EVENTOS_DIR / "checkpoints"
+OUT_ESTADO = BASE_DIR / "sep" / "Estado_socios_eventos.xlsx"
+
+CADA_EVENTOS = 50_000
+CHECKPOINTS_A_GUARDAR = 3
+
+EMITIDA, CAMBIO, BAJA, PAGO = "CUOTA_EMITIDA", "CAMBIO_ESTADO", "CUOTA_BAJA", "PAGO_REGISTRADO"
+COLUMNAS = ["SEQ", "TIPO", "FECHA", "SOCIO", "CLAVE", "ESTADO_ANTES", "ESTADO_NUEVO", "MONTO", "VENC_DIA", "REF"]
+COLUMNAS_CUOTA = ["CLAVE", "SOCIO", "ESTADO", "MONTO", "VENC_DIA"]
+# SOCIO de los pagos cuyo nombre no resuelve a un código (y de las cuotas sin socio_id)
+SIN_SOCIO = -1
+COLUMNAS_PAGO_SOCIO = ["SOCIO", "Pagos", "Monto_pagado", "Ultimo_pago"]
+_EPOCA = np.datetime64("1970-01-01", "D")
+
+
+# ---- almacenamiento ---------------------------------------------------------------------
+
+
+def _guardar(df: pd.DataFrame, sin_extension: Path) -> Path:
+    sin_extension.parent.mkdir(parents=True, exist_ok=True)
+    if parquet_disponible():
+        destino = sin_extension.with_suffix(".parquet")
+        _para_parquet(df).to_parquet(destino, index=False)
+    else:
+        destino = sin_extension.with_suffix(".csv")
+        df.to_csv(destino, index=False)
+    return destino
+
+
+def _leer(path: Path) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, dtype={"CLAVE": "uint64"})
+    if "CLAVE" in df.columns:
+        df["CLAVE"] = df["CLAVE"].astype("uint64")
+    for c in ("FECHA", "Ultimo_pago"):
+        if c in df.columns:
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+    return df
+
+
+def listar_segmentos() -> list[tuple[int, int, Path]]:
+    """Segmentos del libro (seq inicial, seq final, ruta) en orden."""
+    segs = []
+    for p in EVENTOS_DIR.glob("eventos_*_*.*"):
+        if p.suffix not in (".parquet", ".csv"):
+            continue
+        _, ini, fin = p.stem.split("_")
+        segs.append((int(ini), int(fin), p))
+    return sorted(segs)
+
+
+def ultimo_seq() -> int:
+    segs = listar_segmentos()
+    return segs[-1][1] if segs else 0
+
+
+def leer_eventos(desde_seq: int = 0) -> pd.DataFrame:
+    """Eventos con SEQ > desde_seq (solo se abren los segmentos que los contienen)."""
+    partes = [_leer(p) for _ini, fin, p in listar_segmentos() if fin > desde_seq]
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS)
+    ev = pd.concat(partes, ignore_index=True)
+    return ev[ev["SEQ"] > desde_seq].sort_values("SEQ").reset_index(drop=True)
+
+
+def agregar_eventos(ev: pd.DataFrame) -> pd.DataFrame:
+    """Numera los eventos a continuación del libro y los escribe en un segmento nuevo."""
+    if ev.empty:
+        return ev
+    inicio = ultimo_seq() + 1
+    ev = ev.reset_index(drop=True)
+    ev.insert(0, "SEQ", np.arange(inicio, inicio + len(ev), dtype="int64"))
+    ev = ev[COLUMNAS]
+    _guardar(ev, EVENTOS_DIR / f"eventos_{inicio:012d}_{inicio + len(ev) - 1:012d}")
+    return ev
+
+
+# ---- estado y plegado -------------------------------------------------------------------
+
+
+def estado_vacio() -> dict:
+    return {
+        "seq": 0,
+        "cuotas": pd.DataFrame({c: pd.Series(dtype=t) for c, t in zip(COLUMNAS_CUOTA, ["uint64", "int64", object, "float64", "int32"])}),
+        "pagos_socio": pd.DataFrame(
+            {c: pd.Series(dtype=t) for c, t in zip(COLUMNAS_PAGO_SOCIO, ["int64", "int64", "float64", "datetime64[ns]"])}
+        ),
+        "claves_pago": np.array([], dtype="uint64"),
+    }
+
+
+def aplicar(estado: dict, ev: pd.DataFrame) -> dict:
+    """Pliega los eventos (ya ordenados por SEQ) sobre el estado y devuelve el estado nuevo."""
+    if ev.empty:
+        return estado
+    de_cuota = ev[ev["TIPO"].isin([EMITIDA, CAMBIO, BAJA])]
+    ultimo = de_cuota.drop_duplicates("CLAVE", keep="last")
+    vigentes = ultimo[ultimo["TIPO"] != BAJA].rename(columns={"ESTADO_NUEVO": "ESTADO"})[COLUMNAS_CUOTA]
+    previas = estado["cuotas"]
+    cuotas = pd.concat([previas[~previas["CLAVE"].isin(ultimo["CLAVE"])], vigentes], ignore_index=True)
+
+    pagos = ev[ev["TIPO"] == PAGO]
+    nuevos = pagos.groupby("SOCIO", as_index=False).agg(
+        Pagos=("CLAVE", "size"), Monto_pagado=("MONTO", "sum"), Ultimo_pago=("FECHA", "max")
+    )
+    pagos_socio = (
+        pd.concat([estado["pagos_socio"], nuevos], ignore_index=True)
+        .groupby("SOCIO", as_index=False)
+        .agg(Pagos=("Pagos", "sum"), Monto_pagado=("Monto_pagado", "sum"), Ultimo_pago=("Ultimo_pago", "max"))
+    )
+    return {
+        "seq": int(ev["SEQ"].max()),
+        "cuotas": cuotas.astype({"CLAVE": "uint64", "SOCIO": "int64", "VENC_DIA": "int32"}),
+        "pagos_socio": pagos_socio,
+        "claves_pago": np.union1d(estado["claves_pago"], pagos["CLAVE"].to_numpy(dtype="uint64")),
+    }
+
+
+def listar_checkpoints() -> list[tuple[int, Path]]:
+    chk = []
+    for p in CHECKPOINT_DIR.glob("chk_*.json"):
+        chk.append((int(p.stem.split("_")[1]), p))
+    return sorted(chk)
+
+
+def guardar_checkpoint(estado: dict) -> Path:
+    """Guarda el estado plegado hasta estado['seq'] y conserva solo los últimos checkpoints."""
+    base = CHECKPOINT_DIR / f"chk_{estado['seq']:012d}"
+    archivos = {
+        "cuotas": _guardar(estado["cuotas"], base.with_name(base.name + "_cuotas")).name,
+        "pagos_socio": _guardar(estado["pagos_socio"], base.with_name(base.name + "_pagos")).name,
+        "claves_pago": _guardar(pd.DataFrame({"CLAVE": estado["claves_pago"]}), base.with_name(base.name + "_claves")).name,
+    }
+    meta = base.with_suffix(".json")
+    # El .json se escribe al final: un checkpoint sin .json no se usa
+    meta.write_text(json.dumps({"seq": estado["seq"], "archivos": archivos}, indent=2), encoding="utf-8")
+    for _seq, viejo in listar_checkpoints()[:-CHECKPOINTS_A_GUARDAR]:
+        for nombre in json.loads(viejo.read_text(encoding="utf-8"))["archivos"].values():
+            (CHECKPOINT_DIR / nombre).unlink(missing_ok=True)
+        viejo.unlink()
+    return meta
+
+
+def cargar_checkpoint() -> dict:
+    """Último checkpoint (o el estado vacío si no hay)."""
+    chk = listar_checkpoints()
+    if not chk:
+        return estado_vacio()
+    meta = json.loads(chk[-1][1].read_text(encoding="utf-8"))
+    arch = meta["archivos"]
+    return {
+        "seq": int(meta["seq"]),
+        "cuotas": _leer(CHECKPOINT_DIR / arch["cuotas"]),
+        "pagos_socio": _leer(CHECKPOINT_DIR / arch["pagos_socio"]),
+        "claves_pago": _leer(CHECKPOINT_DIR / arch["claves_pago"])["CLAVE"].to_numpy(dtype="uint64"),
+    }
+
+
+def materializar(checkpoint: bool = False) -> dict:
+    """Estado actual: último checkpoint + eventos posteriores (checkpoint nuevo si toca)."""
+    estado = cargar_checkpoint()
+    base = estado["seq"]
+    estado = aplicar(estado, leer_eventos(base))
+    if estado["seq"] > base and (checkpoint or estado["seq"] - base >= CADA_EVENTOS):
+        guardar_checkpoint(estado)
+    return estado
+
+
+def estado_por_socio(estado: dict) -> pd.DataFrame:
+    """Una fila por socio: cuotas y monto por estado, PEN más antigua y pagos acumulados.
+
+    Lo que no tiene socio (SIN_SOCIO) sigue en el libro pero no aparece aquí (ver sin_socio).
+    """
+    cuotas = estado["cuotas"][estado["cuotas"]["SOCIO"] != SIN_SOCIO]
+    pagos_socio = estado["pagos_socio"][estado["pagos_socio"]["SOCIO"] != SIN_SOCIO]
+    conteo = cuotas.pivot_table(index="SOCIO", columns="ESTADO", values="CLAVE", aggfunc="size", fill_value=0)
+    conteo.columns = [f"Cuotas_{c}" for c in conteo.columns]
+    pen = cuotas[cuotas["ESTADO"] == "PEN"]
+    venc = pen[pen["VENC_DIA"] >= 0].groupby("SOCIO")["VENC_DIA"].min()
+    out = conteo.join(pen.groupby("SOCIO")["MONTO"].sum().round(2).rename("Monto_PEN"), how="outer")
+    mas_antigua = pd.Series(
+        (_EPOCA + venc.to_numpy().astype("timedelta64[D]")).astype("datetime64[ns]"), index=venc.index, name="PEN_mas_antigua"
+    )
+    out = out.join(mas_antigua, how="left")
+    out = out.join(pagos_socio.set_index("SOCIO"), how="outer")
+    out.index.name = "Codigo_socio"
+    cuenta = [c for c in out.columns if c.startswith("Cuotas_")] + ["Pagos"]
+    out[cuenta] = out[cuenta].fillna(0).astype("int64")
+    out[["Monto_PEN", "Monto_pagado"]] = out[["Monto_PEN", "Monto_pagado"]].fillna(0.0).round(2)
+    return out.reset_index().sort_values("Codigo_socio").reset_index(drop=True)
+
+
+def sin_socio(estado: dict) -> dict:
+    """Pagos y cuotas acumulados sin código de socio (para informarlos en una línea aparte)."""
+    pagos = estado["pagos_socio"][estado["pagos_socio"]["SOCIO"] == SIN_SOCIO]
+    cuotas = estado["cuotas"][estado["cuotas"]["SOCIO"] == SIN_SOCIO]
+    return {
+        "Pagos": int(pagos["Pagos"].sum()),
+        "Monto_pagado": round(float(pagos["Monto_pagado"].sum()), 2),
+        "Cuotas": int(len(cuotas)),
+    }
+
+
+# ---- fuentes → eventos ------------------------------------------------------------------
+
+
+def eventos_cuotas(estado: dict, foto: pd.DataFrame, fecha) -> pd.DataFrame:
+    """Diferencia entre las cuotas vigentes y una foto nueva (rollrates.foto_desde_excel)."""
+    nueva = foto.rename(columns={"CUOTA_KEY": "CLAVE"})
+    t = estado["cuotas"].merge(nueva, on="CLAVE", how="outer", suffixes=("_previo", ""), indicator=True)
+    emitidas = t["_merge"] == "right_only"
+    bajas = t["_merge"] == "left_only"
+    ambas = t["_merge"] == "both"
+    cambio = ambas & (
+        (t["ESTADO_previo"] != t["ESTADO"]) | (t["MONTO_previo"] != t["MONTO"]) | (t["VENC_DIA_previo"] != t["VENC_DIA"])
+    )
+    t = t[emitidas | bajas | cambio].copy()
+    tipo = np.select([emitidas[t.index], bajas[t.index]], [EMITIDA, BAJA], default=CAMBIO)
+    de_baja = tipo == BAJA
+    return pd.DataFrame(
+        {
+            "TIPO": tipo,
+            "FECHA": pd.Timestamp(fecha).normalize(),
+            "SOCIO": np.where(de_baja, t["SOCIO_previo"], t["SOCIO"]).astype("int64"),
+            "CLAVE": t["CLAVE"].to_numpy(dtype="uint64"),
+            "ESTADO_ANTES": t["ESTADO_previo"].to_numpy(dtype=object),
+            "ESTADO_NUEVO": np.where(de_baja, None, t["ESTADO"].to_numpy(dtype=object)),
+            "MONTO": np.where(de_baja, t["MONTO_previo"], t["MONTO"]).astype("float64"),
+            "VENC_DIA": np.where(de_baja, t["VENC_DIA_previo"], t["VENC_DIA"]).astype("int32"),
+            "REF": "",
+        }
+    ).sort_values(["SOCIO", "CLAVE"], kind="stable")
+
+
+def claves_pago(det: pd.DataFrame) -> np.ndarray:
+    """Clave uint64 por pago: hash de la fila (sin el archivo) + n° de repetición."""
+    cols = [c for c in ["COMPROBANTE", "CONSUMIDOR", "MONTO", "TIPO PAGO", "FECHA_PAGO"] if c in det.columns]
+    base = det[cols].astype(str).copy()
+    base["_rep"] = base.groupby(cols, sort=False).cumcount().astype(str)
+    return pd.util.hash_pandas_object(base, index=False).to_numpy(dtype="uint64")
+
+
+def eventos_pagos(estado: dict, det: pd.DataFrame, master: pd.DataFrame) -> pd.DataFrame:
+    """PAGO_REGISTRADO para cada pago Odoo cuya clave aún no está en el libro."""
+    from plan_cuotas import codigo_socio_por_nombre
+
+    claves = claves_pago(det)
+    nuevo = ~np.isin(claves, estado["claves_pago"])
+    det = det[nuevo]
+    return pd.DataFrame(
+        {
+            "TIPO": PAGO,
+            "FECHA": pd.to_datetime(det["FECHA_PAGO"], errors="coerce").to_numpy(),
+            "SOCIO": codigo_socio_por_nombre(det, master).fillna(SIN_SOCIO).astype("int64").to_numpy(),
+            "CLAVE": claves[nuevo],
+            "ESTADO_ANTES": None,
+            "ESTADO_NUEVO": det["ESTADO"].astype(str).to_numpy(),
+            "MONTO": pd.to_numeric(det["MONTO"], errors="coerce").fillna(0.0).round(2).to_numpy(),
+            "VENC_DIA": np.int32(-1),
+            "REF": det["COMPROBANTE"].astype(str).to_numpy(),
+        }
+    ).sort_values("FECHA", kind="stable")
+
+
+def registrar(archivo: Path = ARCHIVO_CUOTAS, fecha=None) -> pd.DataFrame:
+    """Agrega al libro los eventos de la foto actual de cuotas y de los pagos Odoo nuevos."""
+    from cruzar_odoo_mora_socios import cargar_membership
+    from intermedios import leer_intermedio
+    from rollrates import foto_desde_excel
+
+    estado = materializar()
+    partes = []
+    if archivo.exists():
+        fecha = pd.Timestamp(fecha) if fecha else pd.Timestamp(archivo.stat().st_mtime, unit="s")
+        partes.append(eventos_cuotas(estado, foto_desde_excel(archivo), fecha))
+    else:
+        print(f"Aviso: no encontré {archivo.name}; no se registran eventos de cuotas.")
+    if ARCHIVO_DETALLE.exists():
+        partes.append(eventos_pagos(estado, leer_intermedio(ARCHIVO_DETALLE), cargar_membership()))
+    else:
+        print(f"Aviso: no encontré {ARCHIVO_DETALLE.name}; ejecute antes preparar_odoo_comparativo.py.")
+    partes = [p for p in partes if not p.empty]
+    ev = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    return agregar_eventos(ev)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Libro de eventos de cuotas y pagos con estado por socio")
+    parser.add_argument("--archivo", type=Path, default=ARCHIVO_CUOTAS)
+    parser.add_argument("--fecha", help="Fecha de la foto de cuotas AAAA-MM-DD (por defecto: modificación del archivo)")
+    parser.add_argument("--sin-registrar", action="store_true", help="No agrega eventos, solo materializa")
+    parser.add_argument("--checkpoint", action="store_true", help="Guardar un checkpoint al terminar")
+    parser.add_argument("--verificar", action="store_true", help="Comparar con el estado plegado desde cero")
+    args = parser.parse_args(argv)
+
+    if not args.sin_registrar:
+        ev = registrar(args.archivo, args.fecha)
+        if ev.empty:
+            print("Sin eventos nuevos.")
+        else:
+            print(f"Eventos agregados: {len(ev)} (SEQ {ev['SEQ'].min()}–{ev['SEQ'].max()})")
+            print(ev["TIPO"].value_counts().to_string())
+
+    estado = materializar(checkpoint=args.checkpoint)
+    por_socio = estado_por_socio(estado)
+    OUT_ESTADO.parent.mkdir(parents=True, exist_ok=True)
+    por_socio.to_excel(OUT_ESTADO, index=False)
+    print(f"Estado al evento {estado['seq']}: {len(estado['cuotas'])} cuotas vigentes, {len(por_socio)} socios → {OUT_ESTADO}")
+    sin = sin_socio(estado)
+    if sin["Pagos"] or sin["Cuotas"]:
+        print(
+            f"  Sin socio (quedan en el libro, fuera del estado por socio): {sin['Pagos']} pagos por "
+            f"{sin['Monto_pagado']:,.2f} y {sin['Cuotas']} cuotas"
+        )
+
+    if args.verificar:
+        desde_cero = estado_por_socio(aplicar(estado_vacio(), leer_eventos(0)))
+        iguales = desde_cero.equals(por_socio)
+        print(f"Verificación (incremental vs desde cero): {'OK' if iguales else 'DIFERENTE'}")
+        if not iguales:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,29 @@
 """
 Genera un Excel listo para Power BI con los datos del dashboard de cuotas por rango de días.
 Ejecutar: python exportar_para_powerbi.py
-Salida: sep/Dashboard_Cuotas_PowerBI.xlsx
+Salida: sep/Dashboard_Cuotas_PowerBI.xlsx (y el reporte de calidad sep/Calidad_datos.xlsx, ver calidad.py,
+que se regenera en cada corrida aunque la exportación no cambie)
+
+Modo esquema estrella: python exportar_para_powerbi.py --estrella
+Salida: sep/Modelo_Estrella_PowerBI.xlsx (ver modelo_estrella.py)
+
+Si el CSV y el código no cambiaron desde la última exportación, no se reescribe el Excel
+(ver huellas.py). Para regenerarlo igual: python exportar_para_powerbi.py --forzar
 
 Moneda: USD (dólares estadounidenses).
 """
+import sys
+
 import pandas as pd
 from pathlib import Path
 
+from calendario import calendario_para, fecha_key
+from huellas import calcular_huella, cambios, registrar_huella, salida_vigente
+from particiones import escribir_particiones, resumen_particiones
+
 CSV_MORA = Path(__file__).parent / "RECUPERACION_DE_MORA.csv"
 OUT_EXCEL = Path(__file__).parent / "sep" / "Dashboard_Cuotas_PowerBI.xlsx"
+OUT_PARTICIONES = Path(__file__).parent / "sep" / "powerbi_particiones" / "detalle_mora"
 
 
 def get_col_mapping(df):
@@ -24,7 +38,25 @@ def get_col_mapping(df):
     return out
 
 
-def main():
+def controles_calidad() -> None:
+    """Controles de calidad sobre toda la población (ver calidad.py); no detienen la exportación."""
+    from calidad import OUT_CALIDAD, linea_resumen, revisar
+
+    print(f"{linea_resumen(revisar())} (detalle en {OUT_CALIDAD.name})")
+
+
+def main(forzar: bool = False):
+    # Antes de la huella: calidad.py revisa también la base de cuotas, el plan y el detalle Odoo,
+    # que pueden cambiar aunque el CSV de mora (lo único que mira la huella) siga igual
+    controles_calidad()
+
+    salidas = [OUT_EXCEL, OUT_PARTICIONES]
+    huella = calcular_huella([CSV_MORA])
+    if not forzar and salida_vigente(salidas, huella):
+        print(f"Sin cambios en {CSV_MORA.name} ni en el código: se conserva {OUT_EXCEL} (use --forzar para regenerar)")
+        return OUT_EXCEL
+    print(f"Regenerando exportación ({'; '.join(cambios(salidas, huella)) or 'forzado'})")
+
     df = pd.read_csv(CSV_MORA, encoding="utf-8-sig")
     df.columns = [str(c).strip() for c in df.columns]
     cod = "Codigo asociado"
@@ -55,17 +87,40 @@ def main():
     # Orden para gráficos: 1-30, 31-60, 61-90, 91-120, Más 121
     tabla["Orden"] = range(1, len(tabla) + 1)
 
+    # Clave de fecha AAAAMMDD para relacionar el detalle con la hoja Dim_Calendario
+    col_fecha = next((c for c in df.columns if "fecha" in str(c).lower()), None)
+    if col_fecha is not None:
+        fechas = pd.to_datetime(df[col_fecha], errors="coerce")
+        df["FECHA_KEY"] = fecha_key(fechas).array
+        cal = calendario_para(fechas)
+    else:
+        cal = None
+
     OUT_EXCEL.parent.mkdir(parents=True, exist_ok=True)
     with pd.ExcelWriter(OUT_EXCEL, engine="openpyxl") as writer:
         tabla.to_excel(writer, sheet_name="Resumen_por_rango", index=False)
+        if cal is not None:
+            cal.to_excel(writer, sheet_name="Dim_Calendario", index=False)
         # Opcional: datos detalle para drill-down (socios por rango)
         df.to_excel(writer, sheet_name="Detalle_mora", index=False)
 
+    # Detalle particionado por mes de la cuota (Parquet/CSV) para actualización incremental
+    if "FECHA_KEY" in df.columns:
+        res = escribir_particiones(df, OUT_PARTICIONES, df["FECHA_KEY"], nombres=("ANIO_CUOTA", "MES_CUOTA"))
+        print(resumen_particiones(OUT_PARTICIONES, res))
+    registrar_huella(salidas, huella)
+
     print(f"Archivo para Power BI generado: {OUT_EXCEL}")
     print("Hoja 'Resumen_por_rango': Rango_dias, Cantidad_socios, Monto_USD, Orden")
+    print("Hoja 'Dim_Calendario': una fila por día, relacionada por FECHA_KEY")
     print("Hoja 'Detalle_mora': datos crudos de RECUPERACION_DE_MORA.csv")
     return OUT_EXCEL
 
 
 if __name__ == "__main__":
-    main()
+    if "--estrella" in sys.argv[1:]:
+        from modelo_estrella import exportar_modelo_estrella
+
+        exportar_modelo_estrella()
+    else:
+        main(forzar="--forzar" in sys.argv[1:])
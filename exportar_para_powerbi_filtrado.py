@@ -12,11 +12,15 @@ Salida:
 import pandas as pd
 from pathlib import Path
 
+from calendario import calendario_para, fecha_key
+from particiones import escribir_particiones, resumen_particiones
+
 BASE_DIR = Path(__file__).parent
 
 CSV_MORA = BASE_DIR / "RECUPERACION_DE_MORA.csv"
 REPORTE_FILTRADO = BASE_DIR / "sep" / "Reporte_Montos_PEN_lt24_sin_MI.xlsx"
 OUT_EXCEL = BASE_DIR / "sep" / "Dashboard_Cuotas_PowerBI_filtrado.xlsx"
+OUT_PARTICIONES = BASE_DIR / "sep" / "powerbi_particiones" / "detalle_mora_filtrado"
 
 
 def get_col_mapping(df):
@@ -77,13 +81,30 @@ def main():
     tabla["Orden"] = range(1, len(tabla) + 1)
 
     # 5) Guardar Excel para Power BI
+    # Clave de fecha AAAAMMDD para relacionar el detalle con la hoja Dim_Calendario
+    col_fecha = next((c for c in df_filtrado.columns if "fecha" in str(c).lower()), None)
+    if col_fecha is not None:
+        fechas = pd.to_datetime(df_filtrado[col_fecha], errors="coerce")
+        df_filtrado["FECHA_KEY"] = fecha_key(fechas).array
+        cal = calendario_para(fechas)
+    else:
+        cal = None
+
     OUT_EXCEL.parent.mkdir(parents=True, exist_ok=True)
     with pd.ExcelWriter(OUT_EXCEL, engine="openpyxl") as writer:
         tabla.to_excel(writer, sheet_name="Resumen_por_rango", index=False)
+        if cal is not None:
+            cal.to_excel(writer, sheet_name="Dim_Calendario", index=False)
         df_filtrado.to_excel(writer, sheet_name="Detalle_mora_filtrado", index=False)
 
+    # Detalle particionado por mes de la cuota (Parquet/CSV) para actualización incremental
+    if "FECHA_KEY" in df_filtrado.columns:
+        res = escribir_particiones(df_filtrado, OUT_PARTICIONES, df_filtrado["FECHA_KEY"], nombres=("ANIO_CUOTA", "MES_CUOTA"))
+        print(resumen_particiones(OUT_PARTICIONES, res))
+
     print(f"Archivo para Power BI (filtrado) generado: {OUT_EXCEL}")
     print("Hoja 'Resumen_por_rango': Rango_dias, Cantidad_socios, Monto_USD, Orden")
+    print("Hoja 'Dim_Calendario': una fila por día, relacionada por FECHA_KEY")
     print("Hoja 'Detalle_mora_filtrado': detalle de RECUPERACION_DE_MORA solo para esos socios")
     return OUT_EXCEL
 
@@ -16,6 +16,8 @@ from pathlib import Path
 import pandas as pd
 from openpyxl import Workbook, load_workbook
 
+from fuentes import resumen_cuotas_por_socio
+
 BASE_DIR = Path(__file__).parent
 PATH_REPORTE = BASE_DIR / "sep" / "Reporte_Montos-act_cuotas_completas.xlsx"
 PATH_CUOTAS = BASE_DIR / "BasesDeDatos-CUOTAS.xlsx"
@@ -43,41 +45,30 @@ def cargar_reporte():
     return df, col_socio, col_monto, col_fecha, col_cuotas
 
 
-def cargar_cuotas():
-    df = pd.read_excel(PATH_CUOTAS)
-    df.columns = [str(c).strip() for c in df.columns]
-    # Columnas esperadas: socio_id, fecha_liquidacion, estado, anio, mes, monto, fecha_creacion, descripcion, ...
-    col_socio = next((c for c in df.columns if c.lower() in ("socio_id", "codigo_socio", "codigo")), None)
-    if col_socio is None:
-        raise ValueError("No se encontró columna de socio en BasesDeDatos-CUOTAS.xlsx")
-    col_estado = next((c for c in df.columns if "estado" in c.lower()), None)
-    if col_estado is None:
-        raise ValueError("No se encontró columna de estado en BasesDeDatos-CUOTAS.xlsx")
-    col_monto = next((c for c in df.columns if c.lower() == "monto"), None)
-
-    return df, col_socio, col_estado, col_monto
+def cargar_cuotas_por_socio() -> pd.DataFrame:
+    """Resumen por socio de la base de cuotas (lectura por bloques, ver fuentes.py)."""
+    return resumen_cuotas_por_socio(PATH_CUOTAS)
 
 
 def main():
     # Cargar reporte de montos
     reporte, col_socio_rep, col_monto_rep, col_fecha_rep, col_cuotas_rep = cargar_reporte()
 
-    # Cargar base de cuotas (con estados)
-    cuotas, col_socio_cuotas, col_estado_cuotas, col_monto_cuotas = cargar_cuotas()
+    # Resumen por socio de la base de cuotas (con estados)
+    por_socio = cargar_cuotas_por_socio()
 
     # Normalizar tipos de socio a entero
     reporte[col_socio_rep] = pd.to_numeric(reporte[col_socio_rep], errors="coerce").astype("Int64")
-    cuotas[col_socio_cuotas] = pd.to_numeric(cuotas[col_socio_cuotas], errors="coerce").astype("Int64")
 
-    # Socios con estado MI (mora irrecuperable)
-    mi_mask = cuotas[col_estado_cuotas].astype(str).str.upper().str.strip() == "MI"
-    socios_mi = cuotas.loc[mi_mask, col_socio_cuotas].dropna().unique()
-    socios_mi_set = set(int(x) for x in socios_mi)
+    # Socios con registros MI (mora irrecuperable) y su monto
+    resumen_mi = por_socio.loc[por_socio["cuotas_MI"] > 0, ["cuotas_MI", "monto_MI"]].rename(
+        columns={"cuotas_MI": "registros_MI", "monto_MI": "monto_total_MI"}
+    )
 
-    print(f"Socios con estado MI en BasesDeDatos-CUOTAS: {len(socios_mi_set)}")
+    print(f"Socios con estado MI en BasesDeDatos-CUOTAS: {len(resumen_mi)}")
 
     # Marcar cuáles socios del reporte están en MI
-    reporte["es_MI"] = reporte[col_socio_rep].apply(lambda x: int(x) in socios_mi_set if pd.notna(x) else False)
+    reporte["es_MI"] = reporte[col_socio_rep].isin(resumen_mi.index).fillna(False).astype(bool)
 
     # DataFrame de socios MI presentes en el reporte (para revisar)
     socios_mi_en_reporte = (
@@ -88,17 +79,7 @@ def main():
 
     # Resumen adicional: cuántos registros MI y monto total de MI en la base de cuotas
     if len(socios_mi_en_reporte) > 0:
-        resumen_mi = (
-            cuotas.loc[mi_mask & cuotas[col_socio_cuotas].isin(socios_mi_set)]
-            .groupby(col_socio_cuotas)
-            .agg(
-                registros_MI=("estado", "count"),
-                monto_total_MI=(col_monto_cuotas, "sum") if col_monto_cuotas else ("estado", "count"),
-            )
-            .reset_index()
-            .rename(columns={col_socio_cuotas: "socio_id"})
-        )
-        socios_mi_en_reporte = socios_mi_en_reporte.merge(resumen_mi, on="socio_id", how="left")
+        socios_mi_en_reporte = socios_mi_en_reporte.merge(resumen_mi.reset_index(), on="socio_id", how="left")
 
     # Guardar lista de socios MI detectados
     OUT_SOCIOS_MI.parent.mkdir(parents=True, exist_ok=True)
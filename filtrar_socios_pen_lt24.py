@@ -15,6 +15,8 @@ from pathlib import Path
 
 import pandas as pd
 
+from fuentes import resumen_cuotas_por_socio
+
 BASE_DIR = Path(__file__).parent
 
 PATH_REPORTE = BASE_DIR / "sep" / "Reporte_Montos-act_cuotas_completas.xlsx"
@@ -33,53 +35,27 @@ def cargar_reporte():
     return df, col_socio
 
 
-def cargar_cuotas():
-    df = pd.read_excel(PATH_CUOTAS)
-    df.columns = [str(c).strip() for c in df.columns]
-
-    col_socio = next((c for c in df.columns if c.lower() in ("socio_id", "codigo_socio", "codigo")), None)
-    if col_socio is None:
-        raise ValueError("No se encontró columna de socio en BasesDeDatos-CUOTAS.xlsx")
-
-    col_estado = next((c for c in df.columns if "estado" in c.lower()), None)
-    if col_estado is None:
-        raise ValueError("No se encontró columna de estado en BasesDeDatos-CUOTAS.xlsx")
-
-    return df, col_socio, col_estado
+def cargar_cuotas_por_socio() -> pd.DataFrame:
+    """Resumen por socio de la base de cuotas (lectura por bloques, ver fuentes.py)."""
+    return resumen_cuotas_por_socio(PATH_CUOTAS)
 
 
 def main():
     # Cargar datos
     reporte, col_socio_rep = cargar_reporte()
-    cuotas, col_socio_cuotas, col_estado = cargar_cuotas()
+    por_socio = cargar_cuotas_por_socio()
 
     # Normalizar socio a entero
     reporte[col_socio_rep] = pd.to_numeric(reporte[col_socio_rep], errors="coerce").astype("Int64")
-    cuotas[col_socio_cuotas] = pd.to_numeric(cuotas[col_socio_cuotas], errors="coerce").astype("Int64")
-
-    # Normalizar estado a mayúsculas
-    cuotas[col_estado] = cuotas[col_estado].astype(str).str.upper().str.strip()
-
-    # Socios con al menos una cuota MI (mora irrecuperable)
-    socios_mi = cuotas.loc[cuotas[col_estado] == "MI", col_socio_cuotas].dropna().unique()
-    socios_mi_set = set(int(x) for x in socios_mi)
-    print(f"Socios con MI en la base de cuotas: {len(socios_mi_set)}")
-
-    # Contar cuotas PEN por socio
-    pen_mask = cuotas[col_estado] == "PEN"
-    pen_por_socio = (
-        cuotas.loc[pen_mask, [col_socio_cuotas]]
-        .groupby(col_socio_cuotas)
-        .size()
-        .rename("cuotas_PEN")
-        .reset_index()
-    )
+
+    # Por socio: cuotas PEN y si tiene alguna cuota MI (mora irrecuperable)
+    por_socio["tiene_MI"] = por_socio["cuotas_MI"] > 0
+    print(f"Socios con MI en la base de cuotas: {int(por_socio['tiene_MI'].sum())}")
 
     # Construir tabla auxiliar: por socio → cuotas_PEN, tiene_MI
     socios = pd.DataFrame({"socio_id": reporte[col_socio_rep].dropna().unique().astype("Int64")})
-    socios = socios.merge(pen_por_socio, left_on="socio_id", right_on=col_socio_cuotas, how="left")
-    socios["cuotas_PEN"] = socios["cuotas_PEN"].fillna(0).astype(int)
-    socios["tiene_MI"] = socios["socio_id"].apply(lambda x: int(x) in socios_mi_set)
+    socios["cuotas_PEN"] = socios["socio_id"].map(por_socio["cuotas_PEN"]).fillna(0).astype(int)
+    socios["tiene_MI"] = socios["socio_id"].map(por_socio["tiene_MI"]).fillna(False).astype(bool)
 
     # Condición de inclusión:
     # - menos de 24 cuotas PENDIENTES
@@ -90,7 +66,7 @@ def main():
     print(f"Socios que pasan el filtro (PEN < 24 y sin MI): {len(socios_incluir)}")
 
     # Aplicar filtro al reporte
-    filtrado = reporte[reporte[col_socio_rep].apply(lambda x: int(x) in socios_incluir if pd.notna(x) else False)]
+    filtrado = reporte[reporte[col_socio_rep].isin(socios_incluir).fillna(False).astype(bool)]
     print(f"Filas reporte original: {len(reporte)}")
     print(f"Filas después del filtro: {len(filtrado)}")
 
@@ -0,0 +1,552 @@
+"""
+Lectura de las fuentes de datos: solo las columnas necesarias, con sus tipos, y la base de
+cuotas (BasesDeDatos-CUOTAS.xlsx) por bloques con memoria acotada.
+
+Fuentes declarativas (FUENTES): para cada archivo se declaran las columnas que usan los
+scripts, los patrones con que se reconoce su encabezado (acentos rotos incluidos, p. ej.
+'C�digo socio') y el tipo al que se convierten. El encabezado se lee una sola vez, los
+patrones se resuelven contra él y luego se leen y convierten únicamente esas columnas
+(`usecols`), en vez de leer la hoja completa y buscar las columnas después.
+
+Motores de lectura: si está instalado python-calamine, los Excel se leen con calamine, y
+los CSV con el lector multihilo de Arrow (pyarrow); si no están o fallan con un archivo,
+se usa openpyxl / el lector de pandas. `python fuentes.py --verificar-motores` comprueba
+que todos los motores instalados den el mismo DataFrame para cada fuente.
+
+La base guarda todas las cuotas históricas de todos los socios, pero los scripts solo usan
+unas pocas columnas y casi siempre un resumen por socio. Aquí el Excel se recorre fila a fila
+con openpyxl en modo solo lectura, se arman bloques de tamaño fijo (TAM_BLOQUE filas) con las
+columnas necesarias, y cada bloque se reduce a parciales por socio que se van acumulando.
+La memoria máxima depende del tamaño del bloque y del número de socios, no de la historia.
+
+Opcionalmente se guarda una copia columnar (Parquet, si hay pyarrow) de las columnas usadas
+en .cache/; mientras el Excel no cambie (tamaño + fecha de modificación) las siguientes
+lecturas salen de ahí, también por bloques.
+
+En vista previa (--preview, ver muestra.py) las fuentes con clave de socio ("socio" en FUENTES)
+y los bloques de cuotas se devuelven ya filtrados a los socios de la muestra.
+
+Uso:
+    from fuentes import leer_fuente, resumen_cuotas_por_socio, iterar_cuotas
+    master = leer_fuente("membership")              # Codigo_socio (Int64), Nombre_socio
+    por_socio = resumen_cuotas_por_socio()          # índice socio_id
+    for bloque in iterar_cuotas(tam_bloque=20_000): ...
+"""
+
+import argparse
+import importlib.util
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import muestra
+from particiones import parquet_disponible
+from segmentos import Segmentos
+
+BASE_DIR = Path(__file__).parent
+ODOO_DIR = BASE_DIR / "odoo"
+
+ARCHIVO_CUOTAS = BASE_DIR / "BasesDeDatos-CUOTAS.xlsx"
+HOJA_CUOTAS = "BD CuotasPendientes"
+CACHE_DIR = BASE_DIR / ".cache"
+
+TAM_BLOQUE = 50_000
+
+# Motores de lectura, del más rápido al de respaldo: calamine (Rust, python-calamine) para
+# Excel y el lector multihilo de Arrow para CSV; si no están instalados o fallan con un
+# archivo, se usa openpyxl / el lector C de pandas.
+MOTORES_EXCEL = ["calamine", "openpyxl"]
+MOTORES_CSV = ["pyarrow", "c"]
+MODULO_MOTOR = {"calamine": "python_calamine", "openpyxl": "openpyxl", "pyarrow": "pyarrow", "c": None}
+COLUMNAS_CUOTAS = ["socio_id", "estado", "monto", "fecha_liquidacion", "fecha_creacion", "anio", "mes"]
+
+# Parciales por socio: columna → cómo se combinan dos parciales
+SUMAS = ["cuotas_total", "cuotas_PEN", "cuotas_MI", "monto_PEN", "monto_MI"]
+MAXIMOS = ["ultima_fecha_creacion", "ultima_fecha_liquidacion_PEN"]
+
+
+# Fuentes declaradas. Cada columna: (nombre en el DataFrame, patrones, tipo, obligatoria).
+# Un patrón es un texto que debe aparecer en el encabezado (en minúsculas), "=texto" si debe
+# ser igual, o una tupla de textos que deben aparecer todos. Gana la primera columna del
+# archivo (de izquierda a derecha) que cumpla algún patrón, como en los scripts originales.
+# Tipos: "entero" (Int64), "decimal", "texto" (str sin espacios), "fecha" o None (tal cual).
+FUENTES = {
+    "reporte_mora": {
+        "archivo": BASE_DIR / "Reporte_act_cuotas_completas.xlsx",
+        "hoja": "Montos por socio",
+        "encabezado": 3,
+        "socio": ("Codigo_socio", "codigo"),
+        "columnas": [
+            # El archivo viene con acentos rotos: 'C�digo socio'
+            ("Codigo_socio", [("c", "socio")], "entero", True),
+            ("Monto_mora", ["monto total"], "decimal", True),
+            # Texto de cuotas sin encabezado (suele ser Unnamed: 3)
+            ("texto_cuotas", ["unnamed"], "texto", False),
+        ],
+    },
+    "membership": {
+        "archivo": ODOO_DIR / "Membership (res.membership).xlsx",
+        "socio": ("Codigo_socio", "codigo"),
+        "columnas": [
+            ("Codigo_socio", ["código de socio", "codigo de socio"], "entero", True),
+            ("Nombre_socio", ["miembro/nombre", "nombre"], "texto", True),
+            ("Estado_membresia_odoo", ["estado de la membres"], "texto", False),
+        ],
+    },
+    "socios": {
+        "archivo": BASE_DIR / "socios.xlsx",
+        "socio": ("Codigo_socio", "codigo"),
+        "columnas": [
+            ("Codigo_socio", ["código de socio", "codigo de socio"], "entero", True),
+            ("Estado_membresia", ["estado de la membres"], "texto", True),
+            ("Precio_membresia", ["precio de membres"], "decimal", False),
+        ],
+    },
+    "odoo_cuotas": {
+        # Un archivo por exportación: odoo/cuotas_*.xlsx (se pasa `path`)
+        "archivo": None,
+        "socio": ("CONSUMIDOR", "nombre"),
+        "columnas": [
+            (c, ["=" + c.lower()], None, True)
+            for c in [
+                "COMPROBANTE",
+                "MONTO",
+                "TIPO DE COMPROBANTE",
+                "TIPO PAGO",
+                "FECHA COMPROB.",
+                "FECHA REGISTRO",
+                "FECHA APLICACION",
+                "ESTADO",
+                "CONSUMIDOR",
+                "ESTADO SOCIO",
+            ]
+        ],
+    },
+    "mora_csv": {
+        "archivo": BASE_DIR / "RECUPERACION_DE_MORA.csv",
+        "socio": ("Codigo asociado", "codigo"),
+        "columnas": [
+            ("Fecha de cuota", ["fecha"], "fecha", True),
+            ("Codigo asociado", ["codigo asociado", "código asociado"], "entero", True),
+            ("VALOR", ["=valor"], "decimal", False),
+            ("de 0 a 30", ["0 a 30"], "decimal", False),
+            ("de 31 a 60", ["31 a 60"], "decimal", False),
+            ("de 61 a 90", ["61 a 90"], "decimal", False),
+            ("de 91 a 120", ["91 a 120"], "decimal", False),
+            ("mas de 121 días", ["121"], "decimal", False),
+        ],
+    },
+}
+
+
+# ---- textos compartidos por los scripts --------------------------------------------------
+
+
+def parse_cuotas(texto: str):
+    """'25 CUOTAS 38.50' -> (25, 38.50).
+    Toma los números que aparezcan en el texto: el primero es el # de cuotas (entero), el
+    segundo el monto de la cuota (puede ser decimal). (None, None) si no hay números.
+    """
+    if not isinstance(texto, str):
+        return None, None
+    t = texto.strip().upper()
+    if not t:
+        return None, None
+    try:
+        nums = re.findall(r"(\d+(?:[.,]\d+)?)", t)
+        if not nums:
+            return None, None
+        num = int(float(nums[0].replace(",", ".")))
+        monto = float(nums[1].replace(",", ".")) if len(nums) > 1 else None
+        return num, monto
+    except Exception:
+        return None, None
+
+
+def normalizar_nombres(s: pd.Series) -> pd.Series:
+    """Nombre para cruzar pagos Odoo con socios: mayúsculas, sin espacios de más; lo que no es
+    texto (nulos, números) queda vacío."""
+    s = pd.Series(s)
+    es_texto = s.map(lambda v: isinstance(v, str)).astype(bool)
+    return s.where(es_texto, "").astype(str).str.strip().str.upper().str.replace(r" {2,}", " ", regex=True)
+
+
+def _coincide(encabezado: str, patron) -> bool:
+    e = encabezado.lower()
+    if isinstance(patron, tuple):
+        return all(p in e for p in patron)
+    if patron.startswith("="):
+        return e == patron[1:]
+    return patron in e
+
+
+def resolver_columnas(encabezado: list[str], columnas: list[tuple], origen: str = "") -> dict[str, int]:
+    """Posición en el archivo de cada columna declarada; ValueError si falta una obligatoria."""
+    limpio = [str(c).strip() for c in encabezado]
+    posiciones: dict[str, int] = {}
+    faltan = []
+    for nombre, patrones, _tipo, obligatoria in columnas:
+        pos = next((i for i, e in enumerate(limpio) if any(_coincide(e, p) for p in patrones)), None)
+        if pos is not None:
+            posiciones[nombre] = pos
+        elif obligatoria:
+            faltan.append(nombre)
+    if faltan:
+        raise ValueError(f"Faltan columnas {faltan} en {origen}: {limpio}")
+    return posiciones
+
+
+def _convertir(s: pd.Series, tipo: str | None) -> pd.Series:
+    if tipo == "entero":
+        return pd.to_numeric(s, errors="coerce").astype("Int64")
+    if tipo == "decimal":
+        return pd.to_numeric(s, errors="coerce")
+    if tipo == "texto":
+        return s.astype(str).str.strip()
+    if tipo == "fecha":
+        # Unidad fija: cada motor entrega las fechas con distinta resolución
+        return pd.to_datetime(s, errors="coerce").astype("datetime64[ns]")
+    return s
+
+
+def leer_encabezado(path: Path, hoja=None, fila: int = 0) -> list[str]:
+    """Nombres de columna como los vería pandas (columnas sin título → 'Unnamed: n'), sin leer los datos.
+
+    En Excel el ancho sale de la dimensión de la hoja: una columna sin título pero con datos
+    (el texto de cuotas del reporte de mora) también cuenta.
+    """
+    if path.suffix.lower() == ".csv":
+        return list(pd.read_csv(path, encoding="utf-8-sig", nrows=0).columns)
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[hoja] if hoja else wb.worksheets[0]
+        valores: tuple = ()
+        for i, fila_valores in enumerate(ws.iter_rows(values_only=True)):
+            if i == fila:
+                valores = fila_valores
+                break
+        ancho = max(ws.max_column or 0, len(valores))
+    finally:
+        wb.close()
+    valores = tuple(valores) + (None,) * (ancho - len(valores))
+    return [f"Unnamed: {i}" if v is None or str(v).strip() == "" else str(v) for i, v in enumerate(valores)]
+
+
+def motor_disponible(motor: str) -> bool:
+    modulo = MODULO_MOTOR.get(motor)
+    return modulo is None or importlib.util.find_spec(modulo) is not None
+
+
+def motores_para(path: Path) -> list[str]:
+    """Motores instalados para el tipo de archivo, del más rápido al de respaldo."""
+    motores = MOTORES_CSV if path.suffix.lower() == ".csv" else MOTORES_EXCEL
+    return [m for m in motores if motor_disponible(m)]
+
+
+def _leer_con(motor: str, path: Path, hoja, fila: int, encabezado: list[str], posiciones: list[int]) -> pd.DataFrame:
+    if path.suffix.lower() == ".csv":
+        # El lector de Arrow solo acepta usecols por nombre
+        return pd.read_csv(path, encoding="utf-8-sig", usecols=[encabezado[i] for i in posiciones], engine=motor)
+    return pd.read_excel(path, sheet_name=hoja or 0, header=fila, usecols=posiciones, engine=motor)
+
+
+def _leer_tabla(path: Path, hoja, fila: int, encabezado: list[str], posiciones: list[int], motor: str | None = None) -> pd.DataFrame:
+    """Lee las columnas pedidas con el primer motor que funcione (o solo con `motor`, si se indica)."""
+    motores = [motor] if motor else motores_para(path)
+    error: Exception | None = None
+    for m in motores:
+        try:
+            return _leer_con(m, path, hoja, fila, encabezado, posiciones)
+        except Exception as e:
+            if motor:
+                raise
+            print(f"Aviso: el motor {m} no pudo leer {path.name} ({e}); se prueba el siguiente.")
+            error = e
+    raise error if error else ValueError(f"No hay motor de lectura para {path.name}")
+
+
+def leer_fuente(
+    fuente: str | dict, path: Path | None = None, columnas: list[str] | None = None, motor: str | None = None
+) -> pd.DataFrame:
+    """Lee una fuente declarada en FUENTES con solo sus columnas (o el subconjunto `columnas`), ya tipadas.
+
+    Las columnas opcionales que no están en el archivo no aparecen en el resultado. Sin `motor`
+    se usa el más rápido instalado (MOTORES_EXCEL / MOTORES_CSV) con respaldo automático.
+    Lanza FileNotFoundError si falta el archivo y ValueError si falta una columna obligatoria.
+    """
+    spec = FUENTES[fuente] if isinstance(fuente, str) else fuente
+    path = Path(path or spec["archivo"])
+    if not path.exists():
+        raise FileNotFoundError(f"No encuentro el archivo: {path}")
+    decl = [c for c in spec["columnas"] if columnas is None or c[0] in columnas]
+    hoja, fila = spec.get("hoja"), spec.get("encabezado", 0)
+
+    encabezado = leer_encabezado(path, hoja, fila)
+    posiciones = resolver_columnas(encabezado, decl, path.name)
+    usadas = sorted(set(posiciones.values()))
+    df = _leer_tabla(path, hoja, fila, encabezado, usadas, motor)
+    por_posicion = dict(zip(usadas, range(df.shape[1])))
+    tipos = {nombre: tipo for nombre, _p, tipo, _o in decl}
+    out = pd.DataFrame(
+        {nombre: _convertir(df.iloc[:, por_posicion[pos]], tipos[nombre]) for nombre, pos in posiciones.items()}
+    )
+    if "socio" in spec:
+        out = muestra.filtrar(out, *spec["socio"])
+    return out
+
+
+def _normalizar_bloque(df: pd.DataFrame) -> pd.DataFrame:
+    """Tipos de las columnas de cuotas (socio entero, estado en mayúsculas, fechas)."""
+    out = df.copy()
+    if "socio_id" in out.columns:
+        out["socio_id"] = pd.to_numeric(out["socio_id"], errors="coerce").astype("Int64")
+    if "estado" in out.columns:
+        out["estado"] = out["estado"].astype(str).str.upper().str.strip()
+    if "monto" in out.columns:
+        out["monto"] = pd.to_numeric(out["monto"], errors="coerce")
+    for c in ("fecha_liquidacion", "fecha_creacion"):
+        if c in out.columns:
+            out[c] = pd.to_datetime(out[c], errors="coerce")
+    for c in ("anio", "mes"):
+        if c in out.columns:
+            out[c] = pd.to_numeric(out[c], errors="coerce").astype("Int64")
+    return out
+
+
+def _huella_archivo(path: Path) -> dict:
+    st = path.stat()
+    return {"archivo": path.name, "tamano": st.st_size, "modificado": st.st_mtime_ns}
+
+
+def _iterar_excel(path: Path, hoja: str | None, columnas: list[str], tam_bloque: int):
+    """Bloques de DataFrame leídos con openpyxl (read_only): nunca se carga la hoja completa."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[hoja] if hoja and hoja in wb.sheetnames else wb.worksheets[0]
+        filas = ws.iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        nombres = {str(c).strip().lower(): i for i, c in enumerate(encabezado) if c is not None}
+        faltan = [c for c in columnas if c.lower() not in nombres]
+        if faltan:
+            raise ValueError(f"Faltan columnas en {path.name}: {faltan}")
+        idx = [nombres[c.lower()] for c in columnas]
+
+        bloque: list[tuple] = []
+        for fila in filas:
+            bloque.append(tuple(fila[i] if i < len(fila) else None for i in idx))
+            if len(bloque) >= tam_bloque:
+                yield pd.DataFrame.from_records(bloque, columns=columnas)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame.from_records(bloque, columns=columnas)
+    finally:
+        wb.close()
+
+
+def _ruta_cache(path: Path) -> Path:
+    return CACHE_DIR / f"{path.stem}.parquet"
+
+
+def _cache_vigente(path: Path, columnas: list[str]) -> bool:
+    cache = _ruta_cache(path)
+    meta = cache.with_suffix(".json")
+    if not (cache.exists() and meta.exists()):
+        return False
+    try:
+        info = json.loads(meta.read_text(encoding="utf-8"))
+    except Exception:
+        return False
+    return info.get("fuente") == _huella_archivo(path) and set(columnas) <= set(info.get("columnas", []))
+
+
+def _iterar_cache(path: Path, columnas: list[str], tam_bloque: int):
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(_ruta_cache(path))
+    for lote in pf.iter_batches(batch_size=tam_bloque, columns=columnas):
+        yield lote.to_pandas()
+
+
+def _escribir_cache(path: Path, hoja: str | None, columnas: list[str], tam_bloque: int):
+    """Recorre el Excel por bloques, los escribe en Parquet y los devuelve tal como se leen."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    destino = _ruta_cache(path)
+    tmp = destino.with_suffix(".parquet.tmp")
+    writer = None
+    try:
+        for bloque in _iterar_excel(path, hoja, columnas, tam_bloque):
+            bloque = _normalizar_bloque(bloque)
+            tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, tabla.schema)
+            writer.write_table(tabla.cast(writer.schema))
+            yield bloque
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        tmp.replace(destino)
+        destino.with_suffix(".json").write_text(
+            json.dumps({"fuente": _huella_archivo(path), "columnas": columnas}, indent=2), encoding="utf-8"
+        )
+
+
+def iterar_cuotas(
+    path: Path = ARCHIVO_CUOTAS,
+    columnas: list[str] | None = None,
+    tam_bloque: int = TAM_BLOQUE,
+    hoja: str | None = HOJA_CUOTAS,
+    usar_cache: bool = True,
+):
+    """Genera bloques normalizados de la base de cuotas con solo las columnas pedidas."""
+    for bloque in _bloques_cuotas(Path(path), columnas, tam_bloque, hoja, usar_cache):
+        # En vista previa, solo los socios de la muestra (la caché guarda siempre la base completa)
+        yield muestra.filtrar(bloque, "socio_id")
+
+
+def _bloques_cuotas(path: Path, columnas: list[str] | None, tam_bloque: int, hoja: str | None, usar_cache: bool):
+    if not path.exists():
+        raise FileNotFoundError(f"No encuentro la base de cuotas: {path}")
+    columnas = list(columnas or COLUMNAS_CUOTAS)
+    if usar_cache and parquet_disponible() and _cache_vigente(path, columnas):
+        yield from _iterar_cache(path, columnas, tam_bloque)
+        return
+    if usar_cache and parquet_disponible():
+        # La caché guarda todas las columnas habituales para que sirva a cualquier script
+        todas = list(dict.fromkeys(COLUMNAS_CUOTAS + columnas))
+        for bloque in _escribir_cache(path, hoja, todas, tam_bloque):
+            yield bloque[columnas]
+        return
+    for bloque in _iterar_excel(path, hoja, columnas, tam_bloque):
+        yield _normalizar_bloque(bloque)
+
+
+def parciales_por_socio(bloque: pd.DataFrame) -> pd.DataFrame:
+    """Reduce un bloque de cuotas a una fila por socio (conteos, montos y fechas máximas)."""
+    pen = (bloque["estado"] == "PEN").to_numpy()
+    mi = (bloque["estado"] == "MI").to_numpy()
+    monto = bloque["monto"].fillna(0.0).to_numpy(dtype="float64")
+    fecha_liq = bloque["fecha_liquidacion"].where(pen)
+    seg = Segmentos(bloque["socio_id"])
+    return seg.tabla(
+        "socio_id",
+        cuotas_total=seg.contar(),
+        cuotas_PEN=seg.contar(pen),
+        cuotas_MI=seg.contar(mi),
+        monto_PEN=seg.suma(np.where(pen, monto, 0.0)),
+        monto_MI=seg.suma(np.where(mi, monto, 0.0)),
+        ultima_fecha_creacion=seg.maximo(bloque["fecha_creacion"]),
+        ultima_fecha_liquidacion_PEN=seg.maximo(fecha_liq),
+    )
+
+
+def combinar_parciales(a: pd.DataFrame | None, b: pd.DataFrame) -> pd.DataFrame:
+    """Suma/máximo de dos tablas de parciales por socio."""
+    if a is None or a.empty:
+        return b
+    unidos = pd.concat([a, b])
+    seg = Segmentos(unidos.index.to_series())
+    cols = {c: seg.suma(unidos[c]) for c in SUMAS}
+    cols.update({c: seg.maximo(unidos[c]) for c in MAXIMOS})
+    out = seg.tabla("socio_id", **cols)
+    for c in SUMAS:
+        if c.startswith("cuotas"):
+            out[c] = out[c].astype("int64")
+    return out
+
+
+def resumen_cuotas_por_socio(path: Path = ARCHIVO_CUOTAS, tam_bloque: int = TAM_BLOQUE, usar_cache: bool = True) -> pd.DataFrame:
+    """Resumen por socio de toda la base de cuotas, procesada por bloques."""
+    acumulado = None
+    for bloque in iterar_cuotas(path, COLUMNAS_CUOTAS, tam_bloque=tam_bloque, usar_cache=usar_cache):
+        acumulado = combinar_parciales(acumulado, parciales_por_socio(bloque))
+    if acumulado is None:
+        return parciales_por_socio(_normalizar_bloque(pd.DataFrame(columns=COLUMNAS_CUOTAS)))
+    return acumulado
+
+
+def verificar_motores(fuentes: list[str] | None = None) -> pd.DataFrame:
+    """Lee cada fuente con todos los motores instalados y compara contra el de respaldo.
+
+    Devuelve una fila por (fuente, motor) con Filas, Segundos e Igual (DataFrame idéntico,
+    mismos tipos incluidos). Las fuentes cuyo archivo no existe se omiten.
+    """
+    import time
+
+    filas = []
+    for nombre in fuentes or list(FUENTES):
+        spec = FUENTES[nombre]
+        if nombre == "odoo_cuotas":
+            paths = sorted(ODOO_DIR.glob("cuotas_*.xlsx"))[:1]
+        else:
+            paths = [spec["archivo"]]
+        for path in paths:
+            if not path.exists():
+                continue
+            motores = motores_para(path)
+            referencia = leer_fuente(nombre, path, motor=motores[-1])
+            for m in motores:
+                t0 = time.perf_counter()
+                df = None
+                try:
+                    df = leer_fuente(nombre, path, motor=m)
+                    pd.testing.assert_frame_equal(df, referencia)
+                    igual, detalle = True, ""
+                except Exception as e:  # diferencia (AssertionError) o el motor no pudo leer
+                    igual, detalle = False, (str(e).splitlines() or [type(e).__name__])[0]
+                filas.append(
+                    {
+                        "Fuente": nombre,
+                        "Archivo": path.name,
+                        "Motor": m,
+                        "Filas": len(df) if df is not None else 0,
+                        "Segundos": round(time.perf_counter() - t0, 3),
+                        "Igual": igual,
+                        "Detalle": detalle,
+                    }
+                )
+    return pd.DataFrame(filas)
+
+
+def main() -> None:
+    import time
+
+    parser = argparse.ArgumentParser(description="Resumen por socio de la base de cuotas y verificación de motores de lectura.")
+    parser.add_argument(
+        "--verificar-motores",
+        action="store_true",
+        help="Lee cada fuente con todos los motores instalados y comprueba que den el mismo DataFrame",
+    )
+    args = parser.parse_args()
+
+    if args.verificar_motores:
+        no_instalados = [m for m in MOTORES_EXCEL + MOTORES_CSV if not motor_disponible(m)]
+        if no_instalados:
+            print(f"Motores no instalados (se omiten): {', '.join(no_instalados)}")
+        res = verificar_motores()
+        print(res.to_string(index=False))
+        if not res["Igual"].all():
+            raise SystemExit("Hay motores que no dan el mismo resultado.")
+        return
+
+    t0 = time.perf_counter()
+    res = resumen_cuotas_por_socio()
+    print(f"Resumen por socio de {ARCHIVO_CUOTAS.name}: {len(res)} socios, {int(res['cuotas_total'].sum())} cuotas")
+    print(f"  PEN: {int(res['cuotas_PEN'].sum())} cuotas, {res['monto_PEN'].sum():,.2f} | MI: {int(res['cuotas_MI'].sum())} cuotas")
+    print(f"  Tiempo: {time.perf_counter() - t0:.1f} s (bloques de {TAM_BLOQUE} filas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Huellas de generación: no rehacer una salida cuyas entradas, parámetros y código no cambiaron.
+
+Cada generador calcula una huella (sha1) de:
+- el contenido de sus archivos de entrada (un archivo ausente también cuenta),
+- sus parámetros (p. ej. el año en curso, si la salida depende de él),
+- el código fuente del script y de los módulos del repositorio que tiene cargados,
+- las versiones de Python, pandas y numpy.
+
+La huella se guarda junto con el tamaño y la fecha de la salida (de cada archivo, si la salida
+es una carpeta) en .cache/huellas/. En la siguiente ejecución, si la huella coincide y la
+salida sigue ahí sin tocar, el script termina enseguida: una corrida horaria sin cambios
+cuesta leer y hashear las entradas, no reconstruir el HTML/Excel. Con --forzar se regenera
+siempre.
+
+Uso:
+    huella = calcular_huella([IN_FILE], parametros={"anio": 2026})
+    if not forzar and salida_vigente([OUT_HTML], huella):
+        print("Sin cambios ..."); return
+    ... generar ...
+    registrar_huella([OUT_HTML], huella)
+"""
+
+import hashlib
+import json
+import platform
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent
+HUELLAS_DIR = BASE_DIR / ".cache" / "huellas"
+
+TAM_LECTURA = 1 << 20
+
+
+def hash_archivo(path: Path) -> str | None:
+    """sha1 del contenido (None si no existe)."""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        for trozo in iter(lambda: f.read(TAM_LECTURA), b""):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def _relativa(path: Path) -> str:
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(BASE_DIR.resolve()).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def codigo_cargado() -> list[Path]:
+    """Archivos .py del repositorio cargados en este proceso (el script y sus módulos locales)."""
+    raiz = BASE_DIR.resolve()
+    archivos = set()
+    for modulo in list(sys.modules.values()):
+        f = getattr(modulo, "__file__", None)
+        if not f or not f.endswith(".py"):
+            continue
+        p = Path(f).resolve()
+        if raiz in p.parents and "site-packages" not in p.parts:
+            archivos.add(p)
+    return sorted(archivos)
+
+
+def calcular_huella(entradas, parametros: dict | None = None, codigo=None, con_muestra: bool = True) -> dict:
+    """Huella de entradas + parámetros + código (por defecto, el código local cargado).
+
+    En vista previa (--preview) la muestra de socios es una entrada más: si se vuelve a sortear,
+    las salidas de preview/ dejan de estar vigentes (muestra.py la calcula con con_muestra=False).
+    """
+    entradas = list(entradas)
+    if con_muestra:
+        import muestra
+
+        if muestra.EN_PREVIEW:
+            muestra.muestra()
+            entradas.append(muestra.ARCHIVO_MUESTRA)
+    detalle = {
+        "entradas": {_relativa(p): hash_archivo(p) for p in entradas},
+        "parametros": {k: str(v) for k, v in sorted((parametros or {}).items())},
+        "codigo": {_relativa(p): hash_archivo(p) for p in (codigo if codigo is not None else codigo_cargado())},
+        "versiones": {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__},
+    }
+    clave = hashlib.sha1(json.dumps(detalle, sort_keys=True).encode("utf-8")).hexdigest()
+    return {"clave": clave, **detalle}
+
+
+def _ruta_huella(salidas) -> Path:
+    nombre = "__".join(_relativa(s).replace("/", "_") for s in salidas)
+    return HUELLAS_DIR / f"{nombre}.json"
+
+
+def _estado_salida(path: Path) -> dict | None:
+    path = Path(path)
+    if not path.exists():
+        return None
+    if path.is_dir():
+        # Carpeta (p. ej. particiones): nombre, tamaño y fecha de cada archivo que contiene
+        archivos = sorted(p for p in path.rglob("*") if p.is_file())
+        firma = hashlib.sha1()
+        for p in archivos:
+            st = p.stat()
+            firma.update(f"{p.relative_to(path).as_posix()}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+        return {"archivos": len(archivos), "firma": firma.hexdigest()}
+    st = path.stat()
+    return {"tamano": st.st_size, "modificado": st.st_mtime_ns}
+
+
+def salida_vigente(salidas, huella: dict) -> bool:
+    """True si las salidas existen, no se modificaron y se generaron con la misma huella."""
+    ruta = _ruta_huella(salidas)
+    if not ruta.exists():
+        return False
+    try:
+        guardada = json.loads(ruta.read_text(encoding="utf-8"))
+    except Exception:
+        return False
+    if guardada.get("clave") != huella["clave"]:
+        return False
+    estados = guardada.get("salidas", {})
+    return all(
+        (actual := _estado_salida(s)) is not None and estados.get(_relativa(s)) == actual for s in salidas
+    )
+
+
+def registrar_huella(salidas, huella: dict) -> Path:
+    """Guarda la huella con el estado actual de las salidas recién generadas."""
+    HUELLAS_DIR.mkdir(parents=True, exist_ok=True)
+    ruta = _ruta_huella(salidas)
+    datos = {**huella, "salidas": {_relativa(s): _estado_salida(s) for s in salidas}}
+    tmp = ruta.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(datos, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(ruta)
+    return ruta
+
+
+def cambios(salidas, huella: dict) -> list[str]:
+    """Qué cambió respecto de la última generación (para el mensaje de los scripts)."""
+    ruta = _ruta_huella(salidas)
+    if not ruta.exists():
+        return ["sin generación previa registrada"]
+    try:
+        guardada = json.loads(ruta.read_text(encoding="utf-8"))
+    except Exception:
+        return ["huella guardada ilegible"]
+    out = []
+    for grupo in ("entradas", "parametros", "codigo", "versiones"):
+        antes, ahora = guardada.get(grupo, {}), huella[grupo]
+        out += [f"{grupo}: {k}" for k in sorted(set(antes) | set(ahora)) if antes.get(k) != ahora.get(k)]
+    estados = guardada.get("salidas", {})
+    out += [f"salida: {_relativa(s)}" for s in salidas if estados.get(_relativa(s)) != _estado_salida(s)]
+    return out
@@ -0,0 +1,213 @@
+"""
+Índice persistente de claves de depuración: cada registro se reduce a un hash de 64 bits y los
+ya vistos se guardan en un arreglo ordenado en disco.
+
+depurar_detalle (preparar_odoo_comparativo.py) eliminaba duplicados con drop_duplicates sobre
+cuatro columnas de texto de toda la historia concatenada. Aquí la clave (COMPROBANTE, MONTO,
+FECHA REGISTRO, CONSUMIDOR) se normaliza y se convierte en un uint64; la historia se procesa
+por partes (un archivo mensual = una parte, en el orden de la concatenación):
+- Las partes que no cambiaron desde la última corrida (misma huella, en la misma posición)
+  reutilizan la máscara de filas conservadas guardada en disco, sin calcular sus claves si la
+  huella viene de fuera (el sha1 del archivo mensual).
+- Las partes nuevas o cambiadas se depuran con `searchsorted` contra el índice ordenado de
+  las claves conservadas de todas las partes anteriores, y sus claves se insertan en él.
+La huella de la definición de la clave (columnas y código de este módulo y de los que se pasan
+en `codigo`, p. ej. la normalización previa) se guarda en el manifest: si cambia, se descartan
+todas las máscaras guardadas y se depura de cero.
+El resultado es el de drop_duplicates(keep="first") sobre la concatenación, pero el trabajo
+de depuración depende de las filas nuevas (en el caso habitual, un mes más al final) y en
+memoria solo hay enteros de 8 bytes por fila en lugar de tuplas de texto.
+
+Archivos (por índice, en .cache/dedup/<nombre>/):
+- manifest.json        definición de la clave y partes en orden: nombre, huella, filas, conservadas
+- indice.npy           claves conservadas de todas las partes, ordenadas
+- parte_<hash>.npz     máscara de filas conservadas (packbits) y claves conservadas de la parte
+
+Uso:
+    from indice_dedup import IndiceDedup, claves_dedup
+    conservar = IndiceDedup("odoo_detalle", codigo=[Path(__file__)]).depurar(det, huellas={"cuotas_2026_01.xlsx": sha1})
+    det = det[conservar]
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from huellas import hash_archivo
+from muestra import ruta
+
+BASE_DIR = Path(__file__).parent
+INDICE_DIR = ruta(BASE_DIR / ".cache" / "dedup")
+
+CLAVE = ["COMPROBANTE", "MONTO", "FECHA REGISTRO", "CONSUMIDOR"]
+
+
+def _hash_texto(s: pd.Series) -> np.ndarray:
+    """uint64 por fila del texto sin espacios; se hashean los valores distintos, no cada fila."""
+    codigos, unicos = pd.factorize(s.astype(str).str.strip())
+    return pd.util.hash_array(np.asarray(unicos, dtype=object), categorize=False)[codigos]
+
+
+def claves_dedup(df: pd.DataFrame, columnas: list[str] = CLAVE) -> np.ndarray:
+    """uint64 por fila a partir de la clave normalizada (texto sin espacios, monto a 2 decimales, fecha).
+
+    La normalización hace que un mismo pago leído de xlsx, csv o del detalle dé la misma clave.
+    """
+    base = {}
+    for c in columnas:
+        s = df[c]
+        if c == "MONTO":
+            base[c] = (pd.to_numeric(s, errors="coerce").round(2).to_numpy(dtype="float64") + 0.0).view("uint64")
+        elif c.startswith("FECHA"):
+            # Fecha como entero (día); lo que no es fecha se compara como texto
+            fecha = pd.to_datetime(s, errors="coerce", format="ISO8601").dt.normalize()
+            h = fecha.to_numpy(dtype="datetime64[ns]").view("int64").astype("uint64")
+            nulas = fecha.isna().to_numpy()
+            if nulas.any():
+                h[nulas] = _hash_texto(s[nulas])
+            base[c] = h
+        else:
+            base[c] = _hash_texto(s)
+    return pd.util.hash_pandas_object(pd.DataFrame(base), index=False).to_numpy(dtype="uint64")
+
+
+def primeras(claves: np.ndarray) -> np.ndarray:
+    """Máscara de la primera aparición de cada clave (como drop_duplicates keep='first')."""
+    conservar = np.zeros(len(claves), dtype=bool)
+    if len(claves):
+        _u, primeras_pos = np.unique(claves, return_index=True)
+        conservar[primeras_pos] = True
+    return conservar
+
+
+def contiene(indice: np.ndarray, claves: np.ndarray) -> np.ndarray:
+    """claves ∈ indice (ordenado), con búsqueda binaria vectorizada."""
+    if len(indice) == 0:
+        return np.zeros(len(claves), dtype=bool)
+    pos = np.searchsorted(indice, claves)
+    return indice[np.minimum(pos, len(indice) - 1)] == claves
+
+
+def insertar(indice: np.ndarray, claves: np.ndarray) -> np.ndarray:
+    """Inserta claves (no presentes) manteniendo el orden: una mezcla lineal, sin reordenar todo."""
+    claves = np.sort(claves)
+    return np.insert(indice, np.searchsorted(indice, claves), claves)
+
+
+def _huella(claves: np.ndarray) -> str:
+    return hashlib.sha1(np.ascontiguousarray(claves, dtype="<u8").tobytes()).hexdigest()
+
+
+class IndiceDedup:
+    """Depuración incremental por partes contra un índice ordenado de claves uint64."""
+
+    def __init__(self, nombre: str, directorio: Path = INDICE_DIR, codigo: list[Path] = ()):
+        self.dir = Path(directorio) / nombre
+        self.codigo = [Path(__file__), *map(Path, codigo)]
+        self.manifest_path = self.dir / "manifest.json"
+        self.indice_path = self.dir / "indice.npy"
+        self.ultima: dict[str, int] = {}
+
+    def _archivo_parte(self, parte: str) -> Path:
+        return self.dir / f"parte_{hashlib.sha1(parte.encode('utf-8')).hexdigest()[:16]}.npz"
+
+    def _manifest(self) -> dict:
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except ValueError:
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def _definicion(self, columnas: list[str]) -> str:
+        """Huella de la definición de la clave: columnas y código que la calcula."""
+        base = {"columnas": list(columnas), "codigo": [hash_archivo(p) for p in self.codigo]}
+        return hashlib.sha1(json.dumps(base, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def claves(self) -> np.ndarray:
+        """Claves conservadas (ordenadas) de la última depuración."""
+        return np.load(self.indice_path) if self.indice_path.exists() else np.array([], dtype="uint64")
+
+    def depurar(
+        self, df: pd.DataFrame, col_parte: str = "__archivo", columnas: list[str] = CLAVE, huellas: dict[str, str] | None = None
+    ) -> np.ndarray:
+        """Máscara de filas a conservar (primera aparición de cada clave en el orden de df).
+
+        `huellas` (parte → huella, p. ej. el sha1 del archivo de origen) evita calcular las claves
+        de las partes sin cambios; sin ella, la huella de una parte es la de sus claves.
+        Las filas de cada parte deben estar juntas (como en la concatenación por archivo); si no,
+        se depura todo en memoria sin usar ni actualizar el índice.
+        """
+        huellas = huellas or {}
+        partes = df[col_parte].astype(str).to_numpy()
+        cortes = np.flatnonzero(partes[1:] != partes[:-1]) + 1
+        inicios = np.r_[0, cortes] if len(partes) else np.array([], dtype="int64")
+        finales = np.r_[cortes, len(partes)] if len(partes) else np.array([], dtype="int64")
+        nombres = partes[inicios].tolist()
+        if len(set(nombres)) != len(nombres):
+            self.ultima = {"partes": len(set(nombres)), "reutilizadas": 0, "filas_nuevas": len(df)}
+            return primeras(claves_dedup(df, columnas))
+
+        definicion = self._definicion(columnas)
+        manifest = self._manifest()
+        guardadas = manifest.get("partes", [])
+        # Con otra definición de la clave ninguna máscara guardada sirve
+        previas = guardadas if manifest.get("definicion") == definicion else []
+        conservar = np.zeros(len(df), dtype=bool)
+        nuevas: list[dict] = []
+        indice = None
+        reutilizadas = filas_nuevas = 0
+        for i, (nombre, a, b) in enumerate(zip(nombres, inicios, finales)):
+            k = None if nombre in huellas else claves_dedup(df.iloc[a:b], columnas)
+            huella = huellas.get(nombre) or _huella(k)
+            previa = previas[i] if i < len(previas) else None
+            if indice is None and previa and previa["parte"] == nombre and previa["huella"] == huella and previa["filas"] == b - a:
+                # Prefijo sin cambios: se reutiliza la máscara guardada
+                with np.load(self._archivo_parte(nombre)) as z:
+                    conservar[a:b] = np.unpackbits(z["mascara"], count=b - a).astype(bool)
+                nuevas.append(previa)
+                reutilizadas += 1
+                continue
+            if indice is None:
+                indice = self._indice_hasta(nuevas, todas=bool(nuevas) and len(nuevas) == len(previas))
+            if k is None:
+                k = claves_dedup(df.iloc[a:b], columnas)
+            mascara = primeras(k)
+            mascara &= ~contiene(indice, k)
+            conservadas = k[mascara]
+            indice = insertar(indice, conservadas)
+            conservar[a:b] = mascara
+            self.dir.mkdir(parents=True, exist_ok=True)
+            np.savez(self._archivo_parte(nombre), mascara=np.packbits(mascara), claves=conservadas)
+            nuevas.append({"parte": nombre, "huella": huella, "filas": int(b - a), "conservadas": int(mascara.sum())})
+            filas_nuevas += b - a
+
+        if indice is not None or len(nuevas) != len(previas):
+            indice = indice if indice is not None else self._indice_hasta(nuevas, todas=False)
+            self._guardar(nuevas, indice, guardadas, definicion)
+        self.ultima = {"partes": len(nombres), "reutilizadas": reutilizadas, "filas_nuevas": int(filas_nuevas)}
+        return conservar
+
+    def _indice_hasta(self, partes: list[dict], todas: bool) -> np.ndarray:
+        """Índice de las partes dadas: el guardado si son todas las de la última vez, si no se arma."""
+        if todas and self.indice_path.exists():
+            return np.load(self.indice_path)
+        trozos = []
+        for p in partes:
+            with np.load(self._archivo_parte(p["parte"])) as z:
+                trozos.append(z["claves"])
+        return np.sort(np.concatenate(trozos)) if trozos else np.array([], dtype="uint64")
+
+    def _guardar(self, partes: list[dict], indice: np.ndarray, previas: list[dict], definicion: str) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        np.save(self.indice_path, indice.astype("uint64"))
+        manifest = {"definicion": definicion, "partes": partes}
+        self.manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+        vigentes = {p["parte"] for p in partes}
+        for p in previas:
+            if p["parte"] not in vigentes:
+                self._archivo_parte(p["parte"]).unlink(missing_ok=True)
@@ -0,0 +1,328 @@
+"""
+Ingesta diaria de pagos Odoo desde una carpeta de entrada, con actualización incremental de
+los agregados (sin rehacer preparar_odoo_comparativo.py).
+
+Los extractos diarios (csv o xlsx, mismas columnas que odoo/cuotas_*.xlsx) se dejan en
+odoo/entrada_diaria/. Cada corrida (o cada vuelta con --vigilar):
+1. Lee los archivos nuevos y descarta los pagos ya conocidos: la clave es la de la depuración
+   del detalle (COMPROBANTE + MONTO + FECHA REGISTRO + CONSUMIDOR; un comprobante solo se
+   repite en varios pagos), comparada contra el conjunto de claves del detalle unificado más
+   lo ya ingerido.
+2. Reduce solo esos pagos a agregados (mismas funciones que la corrida completa) y los suma a
+   los existentes: día/semana/mes/año (fusionar_agregados, socios únicos por sketch),
+   odoo_pagos_por_dia, odoo_pagos_mensuales y el resumen por socio.
+3. Mueve cada archivo a procesados/ (o a rechazados/ si le faltan columnas).
+
+Los pagos ingeridos se guardan también en .cache/ingesta_diaria/. Cuando la corrida completa
+reescribe los agregados (llegó la exportación mensual), la siguiente ingesta lo detecta por la
+huella de odoo_pagos_agregados.xlsx, reconstruye el conjunto de claves desde el detalle nuevo
+y vuelve a aplicar solo los pagos diarios que la exportación todavía no incluye.
+
+El detalle por pago (odoo_cuotas_unificado) y el cruce con la mora se actualizan con la corrida
+completa; esta ingesta solo toca los agregados que leen los dashboards.
+
+Entradas:
+- odoo/entrada_diaria/*.csv, *.xlsx
+- salidas previas de preparar_odoo_comparativo.py (detalle, resumen, agregados, calendario)
+
+Salida (actualizadas en su lugar):
+- odoo/odoo_pagos_agregados.xlsx, odoo/odoo_pagos_por_dia.xlsx, odoo/odoo_pagos_mensuales.xlsx
+- odoo/odoo_resumen_socios.arrow (el .xlsx con --excel), odoo/dim_calendario.xlsx si hay fechas nuevas
+
+Uso:
+    python ingesta_diaria.py               # procesa lo que haya en la carpeta y termina
+    python ingesta_diaria.py --vigilar     # revisa la carpeta cada INTERVALO segundos
+    python ingesta_diaria.py --excel       # también reescribe odoo_resumen_socios.xlsx
+"""
+
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agregados import GRANOS, agregar_multigrano, cargar_agregados, fusionar_agregados, guardar_agregados
+from calendario import calendario_para
+from fuentes import leer_fuente
+from huellas import hash_archivo
+from indice_dedup import CLAVE, claves_dedup
+from intermedios import escribir_arrow, guardar_intermedio, leer_intermedio
+from muestra import ruta
+from particiones import _para_parquet, parquet_disponible
+from preparar_odoo_comparativo import (
+    OUT_AGREGADOS,
+    OUT_CALENDARIO,
+    OUT_DETALLE,
+    OUT_PAGOS_DIA,
+    OUT_PAGOS_MES,
+    OUT_RESUMEN,
+    depurar_detalle,
+    preparar_detalle,
+    preparar_pagos_mensuales,
+    preparar_pagos_por_dia,
+    preparar_resumen_por_socio,
+)
+from sketches import ConteoDistinto, fusionar_serializados
+
+BASE_DIR = Path(__file__).parent
+ENTRADA_DIR = BASE_DIR / "odoo" / "entrada_diaria"
+PROCESADOS_DIR = ENTRADA_DIR / "procesados"
+RECHAZADOS_DIR = ENTRADA_DIR / "rechazados"
+ESTADO_DIR = ruta(BASE_DIR / ".cache" / "ingesta_diaria")
+
+EXTENSIONES = (".csv", ".xlsx")
+INTERVALO = 60
+COLUMNAS_CRUDAS = [
+    "COMPROBANTE",
+    "MONTO",
+    "TIPO DE COMPROBANTE",
+    "TIPO PAGO",
+    "FECHA COMPROB.",
+    "FECHA REGISTRO",
+    "FECHA APLICACION",
+    "ESTADO",
+    "CONSUMIDOR",
+    "ESTADO SOCIO",
+    "__archivo",
+]
+
+
+# ---- estado -----------------------------------------------------------------------------
+
+
+def _ruta_diario() -> Path:
+    return ESTADO_DIR / ("diario.parquet" if parquet_disponible() else "diario.csv")
+
+
+def cargar_estado() -> dict:
+    meta = ESTADO_DIR / "estado.json"
+    claves = ESTADO_DIR / "claves.npy"
+    diario = _ruta_diario()
+    estado = json.loads(meta.read_text(encoding="utf-8")) if meta.exists() else {}
+    estado["claves"] = np.load(claves) if claves.exists() else None
+    if diario.exists():
+        estado["diario"] = pd.read_parquet(diario) if diario.suffix == ".parquet" else pd.read_csv(diario, dtype=str)
+    else:
+        estado["diario"] = pd.DataFrame(columns=COLUMNAS_CRUDAS)
+    return estado
+
+
+def guardar_estado(estado: dict) -> None:
+    ESTADO_DIR.mkdir(parents=True, exist_ok=True)
+    np.save(ESTADO_DIR / "claves.npy", estado["claves"])
+    diario = estado["diario"][COLUMNAS_CRUDAS].astype(str)
+    if parquet_disponible():
+        _para_parquet(diario).to_parquet(_ruta_diario(), index=False)
+    else:
+        diario.to_csv(_ruta_diario(), index=False)
+    meta = {k: v for k, v in estado.items() if k not in ("claves", "diario")}
+    (ESTADO_DIR / "estado.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+
+# ---- entrada ----------------------------------------------------------------------------
+
+
+def archivos_pendientes() -> list[Path]:
+    if not ENTRADA_DIR.exists():
+        return []
+    return sorted((p for p in ENTRADA_DIR.iterdir() if p.is_file() and p.suffix.lower() in EXTENSIONES), key=lambda p: (p.stat().st_mtime, p.name))
+
+
+def leer_extracto(path: Path) -> pd.DataFrame:
+    """Extracto diario con las columnas de la exportación; __archivo agrupa por mes de registro."""
+    df = leer_fuente("odoo_cuotas", path)
+    mes = pd.to_datetime(df["FECHA REGISTRO"], errors="coerce").dt.strftime("%Y_%m").fillna("sin_fecha")
+    # Mismo patrón que los archivos mensuales (cuotas_AAAA_MM): el pago suma a su mes
+    df["__archivo"] = "entrada_diaria/cuotas_" + mes + "/" + path.name
+    return df
+
+
+def _mover(path: Path, carpeta: Path) -> None:
+    carpeta.mkdir(parents=True, exist_ok=True)
+    destino = carpeta / path.name
+    if destino.exists():
+        destino = carpeta / f"{path.stem}_{time.strftime('%Y%m%d%H%M%S')}{path.suffix}"
+    shutil.move(str(path), destino)
+
+
+# ---- agregados --------------------------------------------------------------------------
+
+
+def fusionar_mensuales(previo: pd.DataFrame, nuevo: pd.DataFrame) -> pd.DataFrame:
+    """Suma pagos mensuales por (ANIO, MES) fusionando los sketches de socios."""
+    unido = pd.concat([previo, nuevo], ignore_index=True)
+    unido[["ANIO", "MES"]] = unido[["ANIO", "MES"]].astype("int64")
+    g = unido.groupby(["ANIO", "MES"], sort=True)
+    out = g[["Monto_pagado_mes", "Numero_pagos_mes"]].sum()
+    out["Sketch_socios"] = g["Sketch_socios"].agg(fusionar_serializados)
+    out["Socios_unicos_mes"] = [ConteoDistinto.deserializar(t).estimar() for t in out["Sketch_socios"]]
+    out["Numero_pagos_mes"] = out["Numero_pagos_mes"].astype("int64")
+    return out.reset_index()[nuevo.columns]
+
+
+def fusionar_resumen(previo: pd.DataFrame, nuevo: pd.DataFrame) -> pd.DataFrame:
+    """Resumen por CONSUMIDOR: suma montos y pagos; los 'último' salen del pago más reciente."""
+    unido = pd.concat([previo, nuevo.reset_index()], ignore_index=True)
+    unido = unido.sort_values("Ultimo_pago", kind="stable", na_position="first")
+    g = unido.groupby("CONSUMIDOR", sort=False)
+    res = pd.DataFrame(
+        {
+            "Monto_pagado_total": g["Monto_pagado_total"].sum(),
+            "Numero_pagos": g["Numero_pagos"].sum().astype("int64"),
+            "Primer_pago": g["Primer_pago"].min(),
+            "Ultimo_pago": g["Ultimo_pago"].max(),
+            "Estado_socio_odoo_ultimo": g["Estado_socio_odoo_ultimo"].last(),
+            "Tipo_pago_ultimo": g["Tipo_pago_ultimo"].last(),
+            "Estado_comprobante_ultimo": g["Estado_comprobante_ultimo"].last(),
+        }
+    )
+    res["Anio_ultimo_pago"] = res["Ultimo_pago"].dt.year
+    res["Mes_ultimo_pago"] = res["Ultimo_pago"].dt.month
+    return res.sort_values("Monto_pagado_total", ascending=False)
+
+
+def _calendario_ampliado(det: pd.DataFrame, estado: dict) -> pd.DataFrame | None:
+    """Calendario que también cubre las fechas del lote (None si el actual ya las cubre).
+
+    El rango del calendario guardado queda en el estado para no abrir el Excel en cada lote.
+    """
+    fechas = pd.concat([det["FECHA_PAGO"], det["FECHA_PERIODO"]]).dropna()
+    if "calendario" not in estado and OUT_CALENDARIO.exists():
+        dias = pd.read_excel(OUT_CALENDARIO, usecols=["FECHA"])["FECHA"]
+        estado["calendario"] = [str(dias.min().date()), str(dias.max().date())]
+    rango = estado.get("calendario")
+    if rango and (fechas.empty or (fechas.min() >= pd.Timestamp(rango[0]) and fechas.max() <= pd.Timestamp(rango[1]))):
+        return None
+    cal = calendario_para(pd.to_datetime(rango or []), det["FECHA_PAGO"], det["FECHA_PERIODO"])
+    estado["calendario"] = [str(cal["FECHA"].min().date()), str(cal["FECHA"].max().date())]
+    return cal
+
+
+def _agregados_previos(estado: dict) -> dict[str, pd.DataFrame]:
+    """Agregados vigentes: copia Parquet del estado si el Excel es el que se escribió aquí."""
+    copia = {g: ESTADO_DIR / f"agregados_{g}.parquet" for g in GRANOS}
+    if estado.get("base") == hash_archivo(OUT_AGREGADOS) and all(p.exists() for p in copia.values()):
+        return {g: pd.read_parquet(p) for g, p in copia.items()}
+    return cargar_agregados(OUT_AGREGADOS)
+
+
+def _guardar_agregados(agregados: dict[str, pd.DataFrame]) -> None:
+    guardar_agregados(agregados, OUT_AGREGADOS)
+    if parquet_disponible():
+        ESTADO_DIR.mkdir(parents=True, exist_ok=True)
+        for grano, tabla in agregados.items():
+            _para_parquet(tabla).to_parquet(ESTADO_DIR / f"agregados_{grano}.parquet", index=False)
+
+
+def aplicar_lote(crudo: pd.DataFrame, estado: dict, excel: bool = False) -> dict[str, int]:
+    """Suma un lote de pagos nuevos a los agregados guardados y reescribe esas salidas.
+
+    Del resumen por socio solo se reescribe el .arrow (es lo que leen los scripts, ver
+    intermedios.py); con `excel` también el .xlsx, que si no queda para la corrida completa.
+    """
+    det = depurar_detalle(preparar_detalle(crudo[COLUMNAS_CRUDAS]))
+
+    cal_nuevo = _calendario_ampliado(det, estado)
+    if cal_nuevo is not None:
+        cal_nuevo.to_excel(OUT_CALENDARIO, index=False)
+    cal = cal_nuevo if cal_nuevo is not None else calendario_para(det["FECHA_PAGO"], det["FECHA_PERIODO"])
+
+    agregados = fusionar_agregados(_agregados_previos(estado), agregar_multigrano(det, cal, col_fecha_key="FECHA_PAGO_KEY"))
+    _guardar_agregados(agregados)
+    preparar_pagos_por_dia(agregados["Dia"]).to_excel(OUT_PAGOS_DIA, index=False)
+
+    previo_mes = pd.read_excel(OUT_PAGOS_MES) if OUT_PAGOS_MES.exists() else None
+    pagos_mes = preparar_pagos_mensuales(det)
+    if previo_mes is not None:
+        pagos_mes = fusionar_mensuales(previo_mes, pagos_mes)
+    pagos_mes.to_excel(OUT_PAGOS_MES, index=False)
+
+    resumen = preparar_resumen_por_socio(det)
+    if OUT_RESUMEN.exists():
+        resumen = fusionar_resumen(leer_intermedio(OUT_RESUMEN), resumen)
+    if excel or escribir_arrow(resumen.reset_index(), OUT_RESUMEN) is None:
+        guardar_intermedio(resumen, OUT_RESUMEN, index=True)
+    return {"pagos": len(det), "monto": round(float(det["MONTO"].sum()), 2), "dias": int(det["FECHA_PAGO_KEY"].nunique())}
+
+
+def procesar(excel: bool = False) -> dict | None:
+    """Una pasada por la carpeta de entrada (None si no había nada que hacer)."""
+    if not OUT_AGREGADOS.exists():
+        raise SystemExit(f"No encontré {OUT_AGREGADOS.name}; ejecute antes preparar_odoo_comparativo.py.")
+    archivos = archivos_pendientes()
+    estado = cargar_estado()
+    base_nueva = estado.get("base") != hash_archivo(OUT_AGREGADOS)
+    if not archivos and not base_nueva:
+        return None
+
+    reaplicar = estado["diario"].iloc[0:0]
+    if base_nueva or estado["claves"] is None:
+        # La corrida completa rehízo los agregados: claves desde el detalle nuevo y se vuelven a
+        # aplicar los pagos diarios que la exportación todavía no trae
+        claves = np.unique(claves_dedup(leer_intermedio(OUT_DETALLE, columnas=CLAVE)))
+        estado.pop("calendario", None)
+        diario = estado["diario"]
+        if len(diario):
+            reaplicar = diario[~np.isin(claves_dedup(diario), claves)]
+        claves = np.union1d(claves, claves_dedup(reaplicar))
+    else:
+        claves = estado["claves"]
+
+    leidos, rechazados = [], []
+    for path in archivos:
+        try:
+            leidos.append((path, leer_extracto(path)))
+        except (ValueError, OSError) as e:
+            print(f"Aviso: {path.name} rechazado ({e})")
+            rechazados.append(path)
+    nuevos = pd.concat([df for _p, df in leidos], ignore_index=True) if leidos else reaplicar.iloc[0:0]
+    if len(nuevos):
+        k = claves_dedup(nuevos)
+        # Ni pagos ya conocidos ni repetidos dentro del mismo lote
+        nuevos = nuevos[~np.isin(k, claves) & ~pd.Series(k).duplicated().to_numpy()]
+    lote = pd.concat([reaplicar, nuevos], ignore_index=True)
+
+    res = {"archivos": len(leidos), "rechazados": len(rechazados), "reaplicados": len(reaplicar), "pagos": 0}
+    if len(lote):
+        res.update(aplicar_lote(lote, estado, excel))
+
+    estado["claves"] = np.union1d(claves, claves_dedup(nuevos)) if len(nuevos) else claves
+    estado["diario"] = pd.concat([reaplicar, nuevos], ignore_index=True) if base_nueva else pd.concat([estado["diario"], nuevos], ignore_index=True)
+    estado["base"] = hash_archivo(OUT_AGREGADOS)
+    guardar_estado(estado)
+    for path, _df in leidos:
+        _mover(path, PROCESADOS_DIR)
+    for path in rechazados:
+        _mover(path, RECHAZADOS_DIR)
+    return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingesta incremental de extractos diarios de pagos Odoo.")
+    parser.add_argument("--vigilar", action="store_true", help=f"Revisar la carpeta cada {INTERVALO} s hasta Ctrl+C")
+    parser.add_argument("--intervalo", type=int, default=INTERVALO)
+    parser.add_argument("--excel", action="store_true", help="Reescribir también odoo_resumen_socios.xlsx (más lento)")
+    args = parser.parse_args()
+
+    ENTRADA_DIR.mkdir(parents=True, exist_ok=True)
+    while True:
+        t0 = time.perf_counter()
+        res = procesar(args.excel)
+        if res is not None:
+            print(
+                f"{time.strftime('%H:%M:%S')} {res['archivos']} archivos ({res['rechazados']} rechazados), "
+                f"{res['pagos']} pagos aplicados ({res['reaplicados']} reaplicados) "
+                f"en {time.perf_counter() - t0:.2f} s"
+            )
+        elif not args.vigilar:
+            print(f"Sin archivos nuevos en {ENTRADA_DIR}")
+        if not args.vigilar:
+            break
+        time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Tablas intermedias en Arrow IPC (mapeadas en memoria) además del Excel.
+
+Los intermedios que un script escribe y otro lee (odoo_resumen_socios, odoo_cuotas_unificado,
+odoo_vs_mora_socios, Reporte_Montos_PowerBI_socios) se siguen guardando en .xlsx para abrirlos
+a mano, y junto a cada uno se escribe <nombre>.arrow: formato de archivo Arrow IPC sin
+compresión, con un esquema estable (nombres de columna como texto, columnas de texto como
+string aunque vengan vacías o mezcladas, fechas en ns, columnas numéricas con el tipo declarado
+en TIPOS). leer_intermedio devuelve esos mismos tipos también cuando lee del Excel.
+
+Los lectores abren el .arrow con `pyarrow.memory_map`: no hay que interpretar XML ni copiar
+los datos al leerlos, y varios scripts o sesiones de notebook que abren el mismo intermedio
+comparten las páginas a través de la caché del sistema operativo. Si no hay pyarrow, o el
+.xlsx es más reciente que el .arrow (alguien lo editó a mano), se lee el Excel como antes.
+
+Uso:
+    guardar_intermedio(cruce, OUT_CRUCE)          # .xlsx + .arrow
+    df = leer_intermedio(OUT_CRUCE)               # desde .arrow si está vigente
+    tabla = abrir_arrow(OUT_CRUCE)                # pyarrow.Table sin copia (notebooks)
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pandas as pd
+
+
+# Tipos de las columnas numéricas de cada intermedio: sin declararlos, una columna entera pasa a
+# float64 en la corrida en que aparece un nulo y el esquema del .arrow cambia de una vez a otra.
+# Claves y contadores enteros van como Int64 (int64 con nulos en Arrow); los montos, float64.
+# Los contadores que el cruce trae de un left join (nulos = socio sin pagos) quedan en float64.
+TIPOS: dict[str, dict[str, str]] = {
+    "odoo_cuotas_unificado": {
+        "MONTO": "float64",
+        "FECHA_PERIODO_KEY": "Int64",
+        "FECHA_PAGO_KEY": "Int64",
+        "FECHA_BASE_KEY": "Int64",
+        "CODIGO_SOCIO_ODOO": "Int64",
+        "ANIO_ARCHIVO": "Int64",
+        "MES_ARCHIVO": "Int64",
+    },
+    "odoo_resumen_socios": {
+        "Monto_pagado_total": "float64",
+        "Numero_pagos": "int64",
+        "Anio_ultimo_pago": "Int64",
+        "Mes_ultimo_pago": "Int64",
+    },
+    "odoo_vs_mora_socios": {
+        "Codigo_socio": "Int64",
+        "Monto_mora": "float64",
+        "num_cuotas_calc": "float64",
+        "Precio_membresia": "float64",
+        "Monto_pagado_total": "float64",
+        "Numero_pagos": "float64",
+        "Anio_ultimo_pago": "float64",
+        "Mes_ultimo_pago": "float64",
+        "Monto_mora_restante": "float64",
+        "Monto_mora_restante_fifo": "float64",
+    },
+    "Reporte_Montos_PowerBI_socios": {
+        "Codigo_socio": "Int64",
+        "Monto_total": "float64",
+    },
+}
+
+
+def ruta_arrow(path: Path) -> Path:
+    return Path(path).with_suffix(".arrow")
+
+
+def arrow_disponible() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def tipos_de(path: Path) -> dict[str, str]:
+    """Tipos numéricos declarados del intermedio (por nombre de archivo sin extensión)."""
+    return TIPOS.get(Path(path).stem, {})
+
+
+def aplicar_tipos(df: pd.DataFrame, tipos: dict[str, str]) -> pd.DataFrame:
+    """Convierte las columnas declaradas (las que estén en df) a su tipo, haya o no nulos."""
+    cambiar = {c: t for c, t in tipos.items() if c in df.columns and str(df[c].dtype) != t}
+    if not cambiar:
+        return df
+    out = df.copy()
+    for c, t in cambiar.items():
+        out[c] = pd.to_numeric(out[c], errors="coerce").astype(t)
+    return out
+
+
+def _esquema_estable(df: pd.DataFrame, tipos: dict[str, str] | None = None):
+    """DataFrame → pyarrow.Table con tipos que no dependen de los valores de esta corrida."""
+    import pyarrow as pa
+
+    out = aplicar_tipos(df, tipos or {}).copy()
+    out.columns = [str(c) for c in out.columns]
+    for c in out.columns:
+        s = out[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            out[c] = s.astype("datetime64[ns]")
+        elif s.dtype == object:
+            # Texto o mezcla texto/número (típico de Excel): siempre string, los nulos se mantienen
+            out[c] = s.where(s.isna(), s.astype(str))
+    campos = []
+    for c in out.columns:
+        s = out[c]
+        if s.dtype == object or pd.api.types.is_string_dtype(s):
+            campos.append(pa.field(c, pa.string()))
+        else:
+            # Int64 (nullable) → int64 con nulos; los numéricos no declarados se infieren
+            campos.append(pa.field(c, pa.Schema.from_pandas(out[[c]], preserve_index=False).field(c).type))
+    return pa.Table.from_pandas(out, schema=pa.schema(campos), preserve_index=False)
+
+
+def escribir_arrow(df: pd.DataFrame, path: Path) -> Path | None:
+    """Escribe <path>.arrow (IPC sin compresión, apto para memory_map); None si no hay pyarrow."""
+    if not arrow_disponible():
+        return None
+    import pyarrow as pa
+
+    destino = ruta_arrow(path)
+    tmp = destino.with_suffix(".arrow.tmp")
+    tabla = _esquema_estable(df, tipos_de(path))
+    with pa.OSFile(str(tmp), "wb") as f, pa.ipc.new_file(f, tabla.schema) as writer:
+        writer.write_table(tabla)
+    try:
+        tmp.replace(destino)
+    except PermissionError:
+        # En Windows no se puede reemplazar un archivo mapeado por otro proceso
+        tmp.unlink(missing_ok=True)
+        print(f"Aviso: {destino.name} está abierto en otro proceso; los lectores usarán el Excel.")
+        return None
+    return destino
+
+
+def guardar_intermedio(df: pd.DataFrame, path: Path, index: bool = False) -> Path:
+    """Guarda el intermedio en Excel (como siempre) y, después, en Arrow IPC."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_excel(path, index=index)
+    escribir_arrow(df.reset_index() if index else df, path)
+    return path
+
+
+def arrow_vigente(path: Path) -> bool:
+    """Hay .arrow y no es más viejo que el .xlsx (si el Excel se editó después, manda el Excel)."""
+    arrow = ruta_arrow(path)
+    if not arrow.exists() or not arrow_disponible():
+        return False
+    xlsx = Path(path)
+    return not xlsx.exists() or arrow.stat().st_mtime_ns >= xlsx.stat().st_mtime_ns
+
+
+def abrir_arrow(path: Path, columnas: list[str] | None = None):
+    """pyarrow.Table respaldada por el archivo mapeado en memoria (sin copiar los datos)."""
+    import pyarrow as pa
+
+    fuente = pa.memory_map(str(ruta_arrow(path)), "r")
+    tabla = pa.ipc.open_file(fuente).read_all()
+    if columnas is not None:
+        tabla = tabla.select([c for c in columnas if c in tabla.column_names])
+    return tabla
+
+
+def leer_intermedio(path: Path, columnas: list[str] | None = None) -> pd.DataFrame:
+    """Intermedio como DataFrame: desde el .arrow si está vigente, si no desde el .xlsx.
+
+    La conversión a pandas copia las columnas de texto; quien solo necesita filtrar o agregar
+    puede trabajar sobre `abrir_arrow` directamente.
+    """
+    if arrow_vigente(path):
+        df = abrir_arrow(path, columnas).to_pandas()
+    elif columnas is None:
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_excel(path, usecols=lambda c: c in set(columnas))
+    return aplicar_tipos(df, tipos_de(path))
@@ -0,0 +1,319 @@
+"""
+Exporta el modelo de Power BI como esquema estrella (hechos + dimensiones) en lugar
+de las hojas anchas desnormalizadas (`Detalle_mora`, "Montos por socio").
+
+Entradas:
+- RECUPERACION_DE_MORA.csv                       (cuotas pendientes con rango de días)
+- odoo/cuotas_*.xlsx                              (pagos Odoo, vía preparar_odoo_comparativo)
+- odoo/Membership (res.membership).xlsx + socios.xlsx (maestros de socios)
+- sep/Reporte_Montos_PowerBI_socios.xlsx          (plan de cuotas por socio)
+
+Salida:
+- sep/Modelo_Estrella_PowerBI.xlsx
+  - Dim_Socio, Dim_Calendario, Dim_Rango, Dim_Estado_Odoo
+  - Fact_Cuota_Pendiente, Fact_Pago_Odoo, Fact_Plan_Cuotas
+  - Fact_Cuota_Esperada (plan expandido a una fila por cuota, ver plan_cuotas.py)
+  - Agg_Pagos_Dia, Agg_Pagos_Semana, Agg_Pagos_Mes, Agg_Pagos_Anio (agregados de Fact_Pago_Odoo)
+  - Relaciones (documentación de las relaciones a crear en Power BI)
+
+Todas las claves son enteros. La clave 0 de cada dimensión representa "Desconocido"
+para que ninguna fila de hechos quede sin relación.
+
+Ejecutar: python modelo_estrella.py   (o python exportar_para_powerbi.py --estrella)
+Con --preview lee y escribe en preview/ (muestra de socios, ver muestra.py).
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agregados import agregar_multigrano
+from calendario import calendario_para, fecha_key, key_a_fecha
+from fuentes import leer_fuente
+from intermedios import leer_intermedio
+from muestra import ruta
+
+BASE_DIR = Path(__file__).parent
+
+CSV_MORA = BASE_DIR / "RECUPERACION_DE_MORA.csv"
+PLAN_FILE = ruta(BASE_DIR / "sep" / "Reporte_Montos_PowerBI_socios.xlsx")
+OUT_EXCEL = ruta(BASE_DIR / "sep" / "Modelo_Estrella_PowerBI.xlsx")
+
+# Rangos de días de mora: (clave, etiqueta Power BI, etiqueta corta del reporte, desde, hasta)
+RANGOS = [
+    (1, "1-30 días", "de 0 a 30", 0, 30),
+    (2, "31-60 días", "de 31 a 60", 31, 60),
+    (3, "61-90 días", "de 61 a 90", 61, 90),
+    (4, "91-120 días", "de 91 a 120", 91, 120),
+    (5, "Más de 121 días", "mas de 121 días", 121, None),
+]
+
+RELACIONES = [
+    ("Fact_Cuota_Pendiente", "SOCIO_KEY", "Dim_Socio", "SOCIO_KEY", True),
+    ("Fact_Cuota_Pendiente", "FECHA_KEY", "Dim_Calendario", "FECHA_KEY", True),
+    ("Fact_Cuota_Pendiente", "RANGO_KEY", "Dim_Rango", "RANGO_KEY", True),
+    ("Fact_Pago_Odoo", "SOCIO_KEY", "Dim_Socio", "SOCIO_KEY", True),
+    ("Fact_Pago_Odoo", "FECHA_PAGO_KEY", "Dim_Calendario", "FECHA_KEY", True),
+    ("Fact_Pago_Odoo", "FECHA_PERIODO_KEY", "Dim_Calendario", "FECHA_KEY", False),
+    ("Fact_Pago_Odoo", "ESTADO_KEY", "Dim_Estado_Odoo", "ESTADO_KEY", True),
+    ("Fact_Plan_Cuotas", "SOCIO_KEY", "Dim_Socio", "SOCIO_KEY", True),
+    ("Fact_Plan_Cuotas", "FECHA_KEY", "Dim_Calendario", "FECHA_KEY", True),
+    ("Fact_Plan_Cuotas", "RANGO_KEY", "Dim_Rango", "RANGO_KEY", True),
+    ("Fact_Cuota_Esperada", "SOCIO_KEY", "Dim_Socio", "SOCIO_KEY", True),
+    ("Fact_Cuota_Esperada", "FECHA_KEY", "Dim_Calendario", "FECHA_KEY", True),
+    ("Agg_Pagos_Dia", "FECHA_KEY", "Dim_Calendario", "FECHA_KEY", True),
+]
+
+
+def dim_rango() -> pd.DataFrame:
+    filas = [{"RANGO_KEY": 0, "Rango_dias": "Sin rango", "Rango_corto": "Sin rango", "Dias_desde": None, "Dias_hasta": None, "Orden": 99}]
+    for key, etiq, corto, desde, hasta in RANGOS:
+        filas.append(
+            {"RANGO_KEY": key, "Rango_dias": etiq, "Rango_corto": corto, "Dias_desde": desde, "Dias_hasta": hasta, "Orden": key}
+        )
+    dim = pd.DataFrame(filas)
+    dim["RANGO_KEY"] = dim["RANGO_KEY"].astype("int8")
+    return dim
+
+
+def rango_key_por_cuotas(num_cuotas: pd.Series) -> np.ndarray:
+    """Misma regla que rango_por_cuotas (1→0-30, 2→31-60, 3→61-90, 4-5→91-120, >5→121+), vectorizada."""
+    n = pd.to_numeric(num_cuotas, errors="coerce").fillna(0).to_numpy()
+    return np.select([n <= 0, n == 1, n == 2, n == 3, n <= 5], [0, 1, 2, 3, 4], default=5).astype("int8")
+
+
+def dim_socio(master: pd.DataFrame, socios: pd.DataFrame, *codigos: pd.Series) -> pd.DataFrame:
+    """Dimensión socio: Membership + socios.xlsx + cualquier código que aparezca en los hechos."""
+    todos = [master["Codigo_socio"], socios["Codigo_socio"]] + [pd.Series(c) for c in codigos]
+    cod = pd.to_numeric(pd.concat(todos, ignore_index=True), errors="coerce").dropna().astype("int64").unique()
+    dim = pd.DataFrame({"Codigo_socio": np.sort(cod)})
+    dim = dim.merge(master[["Codigo_socio", "Nombre_socio"]].astype({"Codigo_socio": "int64"}), on="Codigo_socio", how="left")
+    if not socios.empty:
+        cols = [c for c in ["Codigo_socio", "Estado_membresia", "Precio_membresia"] if c in socios.columns]
+        dim = dim.merge(socios[cols].astype({"Codigo_socio": "int64"}), on="Codigo_socio", how="left")
+    dim.insert(0, "SOCIO_KEY", np.arange(1, len(dim) + 1, dtype="int32"))
+    desconocido = pd.DataFrame([{"SOCIO_KEY": 0, "Codigo_socio": -1, "Nombre_socio": "Desconocido"}])
+    dim = pd.concat([desconocido, dim], ignore_index=True)
+    dim["SOCIO_KEY"] = dim["SOCIO_KEY"].astype("int32")
+    dim["Nombre_socio"] = dim["Nombre_socio"].fillna("").astype(str)
+    return dim
+
+
+def dim_calendario(cal: pd.DataFrame) -> pd.DataFrame:
+    """Dim_Calendario con la fila FECHA_KEY=0 "Desconocido" (hechos sin fecha)."""
+    fila = {}
+    for c in cal.columns:
+        s = cal[c]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            fila[c] = pd.NaT
+        elif pd.api.types.is_bool_dtype(s):
+            fila[c] = False
+        elif pd.api.types.is_numeric_dtype(s):
+            fila[c] = 0
+        else:
+            fila[c] = "Desconocido"
+    desconocido = pd.DataFrame([fila]).astype(cal.dtypes.to_dict())
+    return pd.concat([desconocido, cal], ignore_index=True)
+
+
+def _socio_keys(dim: pd.DataFrame, codigos) -> np.ndarray:
+    mapa = pd.Series(dim["SOCIO_KEY"].to_numpy(), index=dim["Codigo_socio"].to_numpy())
+    cod = pd.to_numeric(pd.Series(codigos), errors="coerce")
+    return cod.map(mapa).fillna(0).astype("int32").to_numpy()
+
+
+def cargar_mora_detalle() -> pd.DataFrame:
+    """Lee RECUPERACION_DE_MORA.csv (una fila por cuota pendiente); vacío si no existe."""
+    if not CSV_MORA.exists():
+        print(f"Aviso: no encontré {CSV_MORA.name}, Fact_Cuota_Pendiente quedará vacía.")
+        return pd.DataFrame()
+    # Fecha, socio, valor y columnas de rango; el resto del detalle no se usa aquí
+    return leer_fuente("mora_csv", CSV_MORA)
+
+
+def fact_cuota_pendiente(mora: pd.DataFrame, dim_soc: pd.DataFrame) -> pd.DataFrame:
+    cols = ["FECHA_KEY", "SOCIO_KEY", "RANGO_KEY", "Monto_USD"]
+    if mora.empty:
+        return pd.DataFrame(columns=cols)
+    # Columnas de rango por orden: 0-30, 31-60, 61-90, 91-120, 121+ (como en exportar_para_powerbi)
+    col_rangos = []
+    for k in ["0 a 30", "31 a 60", "61 a 90", "91 a 120", "121"]:
+        col = next((c for c in mora.columns if k in c and c not in col_rangos), None)
+        if col is not None:
+            col_rangos.append(col)
+    montos_rango = mora[col_rangos].apply(pd.to_numeric, errors="coerce").fillna(0.0).to_numpy()
+    tiene = (montos_rango > 0).any(axis=1)
+    rango = np.where(tiene, montos_rango.argmax(axis=1) + 1, 0).astype("int8")
+    if "VALOR" in mora.columns:
+        valor = pd.to_numeric(mora["VALOR"], errors="coerce")
+    else:
+        valor = pd.Series(montos_rango.sum(axis=1), index=mora.index)
+    col_fecha = next((c for c in mora.columns if "fecha" in c.lower()), None)
+    fecha = pd.to_datetime(mora[col_fecha], errors="coerce") if col_fecha else pd.Series(pd.NaT, index=mora.index)
+    return pd.DataFrame(
+        {
+            "FECHA_KEY": fecha_key(fecha).fillna(0).astype("int32").to_numpy(),
+            "SOCIO_KEY": _socio_keys(dim_soc, mora["Codigo asociado"]),
+            "RANGO_KEY": rango,
+            "Monto_USD": valor.fillna(0.0).round(2).to_numpy(),
+        }
+    )
+
+
+def dim_estado_odoo(det: pd.DataFrame) -> pd.DataFrame:
+    """Dimensión basura con las combinaciones de estado de comprobante, estado de socio y tipo de pago."""
+    cols = ["ESTADO", "ESTADO SOCIO", "TIPO PAGO"]
+    comb = det[cols].drop_duplicates().sort_values(cols).reset_index(drop=True)
+    comb.insert(0, "ESTADO_KEY", np.arange(1, len(comb) + 1, dtype="int16"))
+    comb = comb.rename(
+        columns={"ESTADO": "Estado_comprobante", "ESTADO SOCIO": "Estado_socio", "TIPO PAGO": "Tipo_pago"}
+    )
+    desconocido = pd.DataFrame(
+        [{"ESTADO_KEY": 0, "Estado_comprobante": "Desconocido", "Estado_socio": "Desconocido", "Tipo_pago": "Desconocido"}]
+    )
+    out = pd.concat([desconocido, comb], ignore_index=True)
+    out["ESTADO_KEY"] = out["ESTADO_KEY"].astype("int16")
+    return out
+
+
+def fact_pago_odoo(det: pd.DataFrame, dim_soc: pd.DataFrame, master: pd.DataFrame, dim_est: pd.DataFrame) -> pd.DataFrame:
+    from plan_cuotas import codigo_socio_por_nombre
+
+    # Igual que en el cruce: el socio de Odoo se identifica por nombre normalizado
+    codigo = codigo_socio_por_nombre(det, master)
+
+    est = dim_est.rename(columns={"Estado_comprobante": "ESTADO", "Estado_socio": "ESTADO SOCIO", "Tipo_pago": "TIPO PAGO"})
+    estado_key = det[["ESTADO", "ESTADO SOCIO", "TIPO PAGO"]].merge(est, how="left", on=["ESTADO", "ESTADO SOCIO", "TIPO PAGO"])["ESTADO_KEY"]
+
+    return pd.DataFrame(
+        {
+            "FECHA_PAGO_KEY": det["FECHA_PAGO_KEY"].fillna(0).astype("int32").to_numpy(),
+            "FECHA_PERIODO_KEY": det["FECHA_PERIODO_KEY"].fillna(0).astype("int32").to_numpy(),
+            "SOCIO_KEY": _socio_keys(dim_soc, codigo),
+            "ESTADO_KEY": estado_key.fillna(0).astype("int16").to_numpy(),
+            "COMPROBANTE": det["COMPROBANTE"].astype(str).to_numpy(),
+            "Monto_USD": det["MONTO"].round(2).to_numpy(),
+        }
+    )
+
+
+def cargar_plan() -> pd.DataFrame:
+    if not PLAN_FILE.exists():
+        print(f"Aviso: no encontré {PLAN_FILE.name}, Fact_Plan_Cuotas quedará vacía.")
+        return pd.DataFrame(columns=["Codigo_socio", "Monto_total", "Ultima_fecha_liquidacion", "texto_cuotas"])
+    plan = leer_intermedio(PLAN_FILE)
+    plan.columns = [str(c).strip() for c in plan.columns]
+    return plan
+
+
+def fact_plan_cuotas(plan: pd.DataFrame, dim_soc: pd.DataFrame) -> pd.DataFrame:
+    from plan_cuotas import parsear_plan
+
+    parseado = parsear_plan(plan)
+    num_cuotas = parseado["Num_cuotas"]
+    fecha = pd.to_datetime(plan.get("Ultima_fecha_liquidacion"), errors="coerce")
+    return pd.DataFrame(
+        {
+            "SOCIO_KEY": _socio_keys(dim_soc, plan["Codigo_socio"]),
+            "FECHA_KEY": fecha_key(fecha).fillna(0).astype("int32").to_numpy(),
+            "RANGO_KEY": rango_key_por_cuotas(num_cuotas),
+            "Num_cuotas": num_cuotas.fillna(0).astype("int16").to_numpy(),
+            "Monto_cuota": parseado["Monto_cuota"].to_numpy(),
+            "Monto_total": pd.to_numeric(plan["Monto_total"], errors="coerce").round(2).to_numpy(),
+        }
+    )
+
+
+def fact_cuota_esperada(cuotas: pd.DataFrame, dim_soc: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por cuota esperada del plan (ver plan_cuotas.expandir_plan)."""
+    return pd.DataFrame(
+        {
+            "SOCIO_KEY": _socio_keys(dim_soc, cuotas["Codigo_socio"]),
+            "FECHA_KEY": cuotas["FECHA_KEY"].to_numpy(),
+            "Secuencia": cuotas["Secuencia"].to_numpy(),
+            "Num_cuotas": cuotas["Num_cuotas"].to_numpy(),
+            "Monto_esperado": cuotas["Monto_esperado"].to_numpy(),
+        }
+    )
+
+
+def tabla_relaciones() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "Tabla_hechos": hechos,
+                "Columna_hechos": col,
+                "Dimension": dim,
+                "Columna_dimension": col_dim,
+                "Cardinalidad": "Varios a uno (*:1)",
+                "Direccion_filtro": "Única (dimensión → hechos)",
+                "Activa": "Sí" if activa else "No (usar USERELATIONSHIP)",
+            }
+            for hechos, col, dim, col_dim, activa in RELACIONES
+        ]
+    )
+
+
+def construir_modelo() -> dict[str, pd.DataFrame]:
+    """Construye todas las tablas del modelo estrella (nombre de hoja → DataFrame)."""
+    from cruzar_odoo_mora_socios import cargar_membership, cargar_socios
+    from plan_cuotas import cuotas_esperadas
+    from preparar_odoo_comparativo import cargar_y_unir_archivos, depurar_detalle, preparar_detalle
+
+    master = cargar_membership()
+    socios = cargar_socios()
+    mora = cargar_mora_detalle()
+    plan = cargar_plan()
+    det = depurar_detalle(preparar_detalle(cargar_y_unir_archivos()))
+
+    codigos_mora = mora["Codigo asociado"] if not mora.empty else pd.Series(dtype="float")
+    dim_soc = dim_socio(master, socios, codigos_mora, plan["Codigo_socio"])
+    dim_est = dim_estado_odoo(det)
+
+    f_cuota = fact_cuota_pendiente(mora, dim_soc)
+    f_pago = fact_pago_odoo(det, dim_soc, master, dim_est)
+    f_plan = fact_plan_cuotas(plan, dim_soc)
+    f_esperada = fact_cuota_esperada(cuotas_esperadas(plan, det, master), dim_soc)
+
+    claves = pd.concat(
+        [f_cuota["FECHA_KEY"], f_pago["FECHA_PAGO_KEY"], f_pago["FECHA_PERIODO_KEY"], f_plan["FECHA_KEY"], f_esperada["FECHA_KEY"]],
+        ignore_index=True,
+    )
+    cal = calendario_para(key_a_fecha(claves[claves > 0]))
+
+    agregados = agregar_multigrano(det, cal, col_fecha_key="FECHA_PAGO_KEY")
+
+    return {
+        "Dim_Socio": dim_soc,
+        "Dim_Calendario": dim_calendario(cal),
+        "Dim_Rango": dim_rango(),
+        "Dim_Estado_Odoo": dim_est,
+        "Fact_Cuota_Pendiente": f_cuota,
+        "Fact_Pago_Odoo": f_pago,
+        "Fact_Plan_Cuotas": f_plan,
+        "Fact_Cuota_Esperada": f_esperada,
+        **{f"Agg_Pagos_{grano}": tabla for grano, tabla in agregados.items()},
+        "Relaciones": tabla_relaciones(),
+    }
+
+
+def exportar_modelo_estrella(out_excel: Path = OUT_EXCEL) -> Path:
+    tablas = construir_modelo()
+    out_excel.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(out_excel, engine="openpyxl") as writer:
+        for hoja, tabla in tablas.items():
+            tabla.to_excel(writer, sheet_name=hoja, index=False)
+
+    print(f"Modelo estrella para Power BI generado: {out_excel}")
+    for hoja, tabla in tablas.items():
+        print(f"  {hoja}: {len(tabla)} filas, {tabla.shape[1]} columnas")
+    return out_excel
+
+
+def main():
+    return exportar_modelo_estrella()
+
+
+if __name__ == "__main__":
+    main()
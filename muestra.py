@@ -0,0 +1,276 @@
+"""
+Modo vista previa (--preview): toda la cadena sobre una muestra estratificada de socios.
+
+Para iterar sobre el diseño de los dashboards o las reglas de filtrado no hace falta correr
+todo sobre la cartera completa. Con `--preview`, cada etapa:
+- lee las fuentes crudas ya filtradas a los socios de la muestra (fuentes.leer_fuente e
+  iterar_cuotas filtran por código de socio; los pagos Odoo, por nombre normalizado);
+- escribe sus salidas bajo preview/ con la misma ruta relativa (los intermedios de la etapa
+  siguiente se leen también desde allí), sin tocar las salidas completas.
+
+La muestra es determinística: los socios (Membership ∪ reporte de mora) se agrupan en estratos
+por Clasificacion (del último cruce completo, si existe), rango de días de mora y estado de la
+membresía; dentro de cada estrato se ordenan por sha1(semilla:código) y se toman los primeros
+n_h = max(MINIMO, FRACCION · N_h) (o todos si el estrato es más chico). Se guarda en
+preview/muestra_socios.csv y solo se recalcula si cambian sus entradas (ver huellas.py).
+
+Los totales se escalan con el estimador estratificado T = Σ N_h · media_h, con error estándar
+sqrt(Σ N_h² (1 - n_h/N_h) s_h² / n_h); los socios de la muestra que no aparecen en una tabla
+cuentan como 0. Las distribuciones (proporciones, rankings) se muestran sin escalar: con
+asignación proporcional la muestra ya es representativa.
+
+Uso:
+    python muestra.py                      # arma la muestra y muestra los estratos
+    python muestra.py --pipeline           # corre todas las etapas con --preview
+    python cruzar_odoo_mora_socios.py --preview
+
+    from muestra import EN_PREVIEW, ruta, filtrar, estimar
+    OUT_CRUCE = ruta(ODOO_DIR / "odoo_vs_mora_socios.xlsx")   # preview/odoo/... en vista previa
+"""
+
+import hashlib
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent
+PREVIEW_DIR = BASE_DIR / "preview"
+
+ARCHIVO_MUESTRA = PREVIEW_DIR / "muestra_socios.csv"
+# Cruce completo (no el de la vista previa) para estratificar por Clasificacion
+CRUCE_COMPLETO = BASE_DIR / "odoo" / "odoo_vs_mora_socios.xlsx"
+
+EN_PREVIEW = "--preview" in sys.argv[1:]
+
+FRACCION = 0.10
+MINIMO = 2
+SEMILLA = "colmed"
+ESTRATOS = ["Clasificacion", "Rango", "Estado"]
+
+# Etapas de `--pipeline`, en orden de dependencia
+ETAPAS = [
+    "preparar_reporte_montos_powerbi.py",
+    "preparar_odoo_comparativo.py",
+    "cruzar_odoo_mora_socios.py",
+    "odoo/build_dashboard_odoo_vs_mora.py",
+    "build_dashboard_montos.py",
+    "plan_cuotas.py",
+    "modelo_estrella.py",
+    "conciliacion.py",
+    "calidad.py",
+]
+
+_muestra: pd.DataFrame | None = None
+_nombres: set[str] | None = None
+_construyendo = False
+
+
+def ruta(path: Path) -> Path:
+    """Ruta de una salida generada: la misma fuera de la vista previa, bajo preview/ dentro."""
+    path = Path(path)
+    if not EN_PREVIEW:
+        return path
+    destino = PREVIEW_DIR / path.resolve().relative_to(BASE_DIR.resolve())
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    return destino
+
+
+def _orden_hash(codigos) -> list[str]:
+    return [hashlib.sha1(f"{SEMILLA}:{int(c)}".encode("utf-8")).hexdigest() for c in codigos]
+
+
+def poblacion() -> pd.DataFrame:
+    """Todos los socios (Membership ∪ mora) con sus variables de estrato."""
+    from cruzar_odoo_mora_socios import cargar_membership, cargar_mora, cargar_socios
+
+    master = cargar_membership()
+    socios = cargar_socios()
+    mora = cargar_mora()
+    codigos = pd.Index(pd.concat([master["Codigo_socio"], mora["Codigo_socio"]]).dropna().astype("int64").unique())
+
+    estado = socios.drop_duplicates("Codigo_socio").set_index("Codigo_socio")["Estado_membresia"]
+    if "Estado_membresia_odoo" in master.columns:
+        estado = estado.combine_first(master.set_index("Codigo_socio")["Estado_membresia_odoo"])
+    rango = mora.set_index("Codigo_socio")["Rango_dias_por_cuotas"]
+    clasif = pd.Series(dtype=object)
+    if CRUCE_COMPLETO.exists():
+        from intermedios import leer_intermedio
+
+        cruce = leer_intermedio(CRUCE_COMPLETO, ["Codigo_socio", "Clasificacion"]).dropna(subset=["Codigo_socio"])
+        cruce = cruce.astype({"Codigo_socio": "int64"}).drop_duplicates("Codigo_socio")
+        clasif = cruce.set_index("Codigo_socio")["Clasificacion"]
+    return pd.DataFrame(
+        {
+            "Codigo_socio": codigos,
+            "Clasificacion": clasif.reindex(codigos).fillna("Fuera_del_cruce").to_numpy(),
+            "Rango": rango.reindex(codigos).fillna("Sin mora").to_numpy(),
+            "Estado": estado.reindex(codigos).fillna("Sin estado").astype(str).to_numpy(),
+        }
+    )
+
+
+def construir_muestra(pob: pd.DataFrame, fraccion: float = FRACCION, minimo: int = MINIMO) -> pd.DataFrame:
+    """Muestra estratificada determinística con tamaño y peso de cada estrato."""
+    pob = pob.assign(_orden=_orden_hash(pob["Codigo_socio"])).sort_values(ESTRATOS + ["_orden"])
+    grupos = pob.groupby(ESTRATOS, sort=False)
+    n_pob = grupos["Codigo_socio"].transform("size")
+    n_muestra = np.minimum(n_pob, np.maximum(minimo, np.round(fraccion * n_pob))).astype("int64")
+    elegidos = grupos.cumcount() < n_muestra
+    out = pob.assign(N_estrato=n_pob, n_estrato=n_muestra)[elegidos].drop(columns="_orden")
+    out["Peso"] = out["N_estrato"] / out["n_estrato"]
+    return out.reset_index(drop=True)
+
+
+def muestra() -> pd.DataFrame:
+    """Muestra vigente (desde preview/muestra_socios.csv si sus entradas no cambiaron)."""
+    global _muestra, _construyendo
+    if _muestra is not None:
+        return _muestra
+    from huellas import calcular_huella, registrar_huella, salida_vigente
+
+    from cruzar_odoo_mora_socios import ARCHIVO_MEMBERSHIP, ARCHIVO_MORA, ARCHIVO_SOCIOS
+
+    huella = calcular_huella(
+        [ARCHIVO_MEMBERSHIP, ARCHIVO_MORA, ARCHIVO_SOCIOS, CRUCE_COMPLETO],
+        parametros={"fraccion": FRACCION, "minimo": MINIMO, "semilla": SEMILLA},
+        codigo=[Path(__file__), BASE_DIR / "cruzar_odoo_mora_socios.py", BASE_DIR / "fuentes.py"],
+        con_muestra=False,
+    )
+    if salida_vigente([ARCHIVO_MUESTRA], huella):
+        _muestra = pd.read_csv(ARCHIVO_MUESTRA)
+        return _muestra
+    # Las fuentes se leen completas para armar la muestra (sin filtrar por ella misma)
+    _construyendo = True
+    try:
+        _muestra = construir_muestra(poblacion())
+    finally:
+        _construyendo = False
+    ARCHIVO_MUESTRA.parent.mkdir(parents=True, exist_ok=True)
+    _muestra.to_csv(ARCHIVO_MUESTRA, index=False)
+    registrar_huella([ARCHIVO_MUESTRA], huella)
+    return _muestra
+
+
+def nombres_muestra() -> set[str]:
+    """Nombres normalizados (como en el cruce) de los socios de la muestra."""
+    global _nombres
+    if _nombres is None:
+        from cruzar_odoo_mora_socios import cargar_membership
+
+        cods = set(muestra()["Codigo_socio"])
+        master = cargar_membership()
+        _nombres = set(master.loc[master["Codigo_socio"].isin(cods), "Nombre_norm"])
+    return _nombres
+
+
+def tamano_poblacion(m: pd.DataFrame) -> int:
+    return int(m.groupby(ESTRATOS)["N_estrato"].first().sum())
+
+
+def filtrar(df: pd.DataFrame, columna: str, por: str = "codigo") -> pd.DataFrame:
+    """Filas de los socios de la muestra (sin vista previa, `df` tal cual).
+
+    `por="codigo"` compara códigos de socio; `por="nombre"` compara el nombre normalizado
+    (pagos Odoo, que no traen código).
+    """
+    if not EN_PREVIEW or _construyendo or columna not in df.columns:
+        return df
+    if por == "nombre":
+        from fuentes import normalizar_nombres
+
+        clave = normalizar_nombres(df[columna])
+        return df[clave.isin(nombres_muestra()).to_numpy()].reset_index(drop=True)
+    clave = pd.to_numeric(df[columna], errors="coerce")
+    return df[clave.isin(set(muestra()["Codigo_socio"])).to_numpy()].reset_index(drop=True)
+
+
+def estimar(df: pd.DataFrame, col_codigo: str, columnas: list[str]) -> pd.DataFrame:
+    """Total estimado de la población y su error estándar para cada columna numérica.
+
+    Además de las columnas pedidas se estima `Socios` (cuántos socios aparecen en `df`).
+    """
+    m = muestra()
+    cod = pd.to_numeric(df[col_codigo], errors="coerce")
+    valores = pd.DataFrame({c: pd.to_numeric(df[c], errors="coerce").fillna(0.0) for c in columnas})
+    valores["Socios"] = 1.0
+    por_socio = valores[cod.notna().to_numpy()].groupby(cod.dropna().astype("int64").to_numpy()).agg(
+        {**{c: "sum" for c in columnas}, "Socios": "max"}
+    )
+    y = por_socio.reindex(m["Codigo_socio"].to_numpy()).fillna(0.0)
+    y.index = m.index
+    grupos = y.groupby([m[c] for c in ESTRATOS], sort=False)
+    medias, varianzas = grupos.mean(), grupos.var(ddof=1).fillna(0.0)
+    tam = m.groupby(ESTRATOS, sort=False)[["N_estrato", "n_estrato"]].first().reindex(medias.index)
+    n_pob, n_m = tam["N_estrato"].to_numpy()[:, None], tam["n_estrato"].to_numpy()[:, None]
+    total = (n_pob * medias.to_numpy()).sum(axis=0)
+    var = (n_pob**2 * (1 - n_m / n_pob) * varianzas.to_numpy() / n_m).sum(axis=0)
+    error = np.sqrt(var)
+    out = pd.DataFrame(
+        {
+            "Columna": list(y.columns),
+            "Total_muestra": y.sum().to_numpy(),
+            "Total_estimado": total,
+            "Error_estandar": error,
+            "IC95_inf": total - 1.96 * error,
+            "IC95_sup": total + 1.96 * error,
+            "Error_relativo_pct": np.where(total != 0, 100 * error / np.abs(np.where(total != 0, total, 1)), 0.0),
+        }
+    )
+    return out.round(2)
+
+
+def informar(etapa: str, df: pd.DataFrame, col_codigo: str, columnas: list[str]) -> pd.DataFrame:
+    """Imprime y guarda (preview/estimaciones/<etapa>.csv) los totales escalados de una etapa."""
+    est = estimar(df, col_codigo, columnas)
+    destino = PREVIEW_DIR / "estimaciones" / f"{etapa}.csv"
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    est.to_csv(destino, index=False)
+    m = muestra()
+    print(f"Vista previa: {len(m)} de {tamano_poblacion(m)} socios; totales escalados:")
+    print(est.to_string(index=False))
+    return est
+
+
+def marcar_html(html: str, estimaciones: pd.DataFrame | None = None) -> str:
+    """Agrega al dashboard un aviso de vista previa con los totales estimados."""
+    m = muestra()
+    detalle = ""
+    if estimaciones is not None:
+        detalle = " · ".join(
+            f"{r.Columna}: {r.Total_estimado:,.2f} ± {r.Error_estandar:,.2f}" for r in estimaciones.itertuples()
+        )
+        detalle = f"<br>Totales estimados (± error estándar): {detalle}"
+    aviso = (
+        '<div style="background:#fff3cd;color:#664d03;border:1px solid #ffe69c;padding:8px 12px;'
+        'font:13px sans-serif">'
+        f"<b>VISTA PREVIA</b> — muestra estratificada de {len(m)} de {tamano_poblacion(m)} socios "
+        f"(Clasificacion × rango × estado, fracción {FRACCION:.0%}). Las tablas y gráficos muestran "
+        f"solo la muestra; los KPI de totales están escalados a la población.{detalle}</div>"
+    )
+    return html.replace("<body>", "<body>\n" + aviso, 1)
+
+
+def main() -> None:
+    if "--pipeline" in sys.argv[1:]:
+        t0 = time.perf_counter()
+        for etapa in ETAPAS:
+            t = time.perf_counter()
+            r = subprocess.run([sys.executable, str(BASE_DIR / etapa), "--preview"], cwd=BASE_DIR)
+            print(f"[{etapa}] {'OK' if r.returncode == 0 else 'ERROR'} en {time.perf_counter() - t:.1f} s")
+            if r.returncode != 0:
+                sys.exit(r.returncode)
+        print(f"Vista previa completa en {time.perf_counter() - t0:.1f} s: {PREVIEW_DIR}")
+        return
+
+    m = muestra()
+    estratos = m.groupby(ESTRATOS).agg(N=("N_estrato", "first"), n=("Codigo_socio", "size"))
+    print(f"Muestra: {len(m)} socios de {tamano_poblacion(m)} en {len(estratos)} estratos → {ARCHIVO_MUESTRA}")
+    print(estratos.groupby(level=["Clasificacion", "Rango"]).sum().to_string())
+
+
+if __name__ == "__main__":
+    main()
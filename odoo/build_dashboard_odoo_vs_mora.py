@@ -8,24 +8,46 @@ Fuente:
 
 Salida:
 - odoo/dashboard_odoo_vs_mora.html
+
+Si ninguna entrada ni el código cambiaron desde la última generación, no se rehace el HTML
+(ver huellas.py). Para regenerarlo igual: python odoo/build_dashboard_odoo_vs_mora.py --forzar
+
+Con --preview lee y escribe en preview/ (muestra de socios, KPI escalados; ver muestra.py).
 """
 
 from pathlib import Path
 import json
+import sys
 
 import pandas as pd
 
-
-BASE_DIR = Path(__file__).parent
-IN_FILE = BASE_DIR / "odoo_vs_mora_socios.xlsx"
-OUT_HTML = BASE_DIR / "dashboard_odoo_vs_mora.html"
-PLAN_FILE = BASE_DIR.parent / "sep" / "Reporte_Montos_PowerBI_socios.xlsx"
-PAGOS_MES_FILE = BASE_DIR / "odoo_pagos_mensuales.xlsx"
-PAGOS_DIA_FILE = BASE_DIR / "odoo_pagos_por_dia.xlsx"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from agregados import cargar_agregados  # noqa: E402
+from calendario import calendario_para, meses_calendario  # noqa: E402
+from huellas import calcular_huella, cambios, registrar_huella, salida_vigente  # noqa: E402
+from intermedios import leer_intermedio  # noqa: E402
+from muestra import EN_PREVIEW, estimar, marcar_html, ruta  # noqa: E402
 
 
-def main() -> None:
-    df = pd.read_excel(IN_FILE)
+BASE_DIR = Path(__file__).parent
+IN_FILE = ruta(BASE_DIR / "odoo_vs_mora_socios.xlsx")
+OUT_HTML = ruta(BASE_DIR / "dashboard_odoo_vs_mora.html")
+PLAN_FILE = ruta(BASE_DIR.parent / "sep" / "Reporte_Montos_PowerBI_socios.xlsx")
+PAGOS_MES_FILE = ruta(BASE_DIR / "odoo_pagos_mensuales.xlsx")
+PAGOS_DIA_FILE = ruta(BASE_DIR / "odoo_pagos_por_dia.xlsx")
+CALENDARIO_FILE = ruta(BASE_DIR / "dim_calendario.xlsx")
+AGREGADOS_FILE = ruta(BASE_DIR / "odoo_pagos_agregados.xlsx")
+
+
+def main(forzar: bool = False) -> None:
+    entradas = [IN_FILE, PLAN_FILE, PAGOS_MES_FILE, PAGOS_DIA_FILE, CALENDARIO_FILE, AGREGADOS_FILE]
+    huella = calcular_huella(entradas)
+    if not forzar and salida_vigente([OUT_HTML], huella):
+        print(f"Sin cambios en entradas ni código: se conserva {OUT_HTML} (use --forzar para regenerar)")
+        return
+    print(f"Regenerando dashboard ({'; '.join(cambios([OUT_HTML], huella)) or 'forzado'})")
+
+    df = leer_intermedio(IN_FILE)
     df.columns = [str(c).strip() for c in df.columns]
 
     # Asegurar tipos
@@ -60,6 +82,14 @@ def main() -> None:
     total_socios_mora = int(df["Codigo_socio"].nunique())
     total_mora = float(df["Monto_mora"].sum())
     total_pagado = float(df["Monto_pagado_total"].sum())
+    estimaciones = None
+    if EN_PREVIEW:
+        # Vista previa: los KPI globales se escalan de la muestra a toda la cartera
+        estimaciones = estimar(df, "Codigo_socio", ["Monto_mora", "Monto_pagado_total"])
+        est = estimaciones.set_index("Columna")["Total_estimado"]
+        total_socios_mora = int(round(est["Socios"]))
+        total_mora = float(est["Monto_mora"])
+        total_pagado = float(est["Monto_pagado_total"])
     # Nuevo saldo de cartera global = cartera inicial histórica - pagos acumulados
     total_nuevo_saldo = max(total_mora - total_pagado, 0.0)
 
@@ -85,7 +115,7 @@ def main() -> None:
     total_provision = 0.0
     cuota_por_socio: dict[int, float] = {}
     try:
-        plan = pd.read_excel(PLAN_FILE)
+        plan = leer_intermedio(PLAN_FILE)
         plan.columns = [str(c).strip() for c in plan.columns]
         if "Codigo_socio" in plan.columns:
             plan["Codigo_socio"] = pd.to_numeric(plan["Codigo_socio"], errors="coerce").astype("Int64")
@@ -187,7 +217,8 @@ def main() -> None:
         pdia.columns = [str(c).strip() for c in pdia.columns]
         if {"fecha", "ANIO", "MES", "DIA", "Monto_pagado_dia"}.issubset(pdia.columns):
             pdia = pdia.dropna(subset=["fecha"])
-            pdia["fecha_str"] = pd.to_datetime(pdia["fecha"], errors="coerce").dt.strftime("%Y-%m-%d")
+            if "fecha_str" not in pdia.columns:
+                pdia["fecha_str"] = pd.to_datetime(pdia["fecha"], errors="coerce").dt.strftime("%Y-%m-%d")
             pdia["ANIO"] = pdia["ANIO"].astype(int)
             pdia["MES"] = pdia["MES"].astype(int)
             pdia["DIA"] = pdia["DIA"].astype(int)
@@ -201,6 +232,37 @@ def main() -> None:
     except Exception:
         pagos_dia_list = []
 
+    # Pagos por mes de caja (FECHA_PAGO) desde los agregados multigrano: el JS ya no suma días
+    pagos_mes_caja_list: list[dict] = []
+    try:
+        agregados = cargar_agregados(AGREGADOS_FILE)
+        if "Mes" in agregados:
+            pmc = agregados["Mes"]
+            pagos_mes_caja_list = pmc[["ANIO", "MES", "Monto_pagado", "Numero_pagos", "Socios_unicos"]].to_dict(
+                orient="records"
+            )
+    except Exception:
+        pagos_mes_caja_list = []
+
+    # Meses del calendario (días por mes y fin de mes) para que el JS no recalcule fechas
+    calendario_meses_list: list[dict] = []
+    try:
+        if CALENDARIO_FILE.exists():
+            cal = pd.read_excel(CALENDARIO_FILE)
+        else:
+            cal = calendario_para(pd.to_datetime([r["fecha_str"] for r in pagos_dia_list], errors="coerce"))
+        meses = meses_calendario(cal)
+        meses["FIN_MES"] = (
+            meses["ANIO"].astype(str)
+            + "-"
+            + meses["MES"].astype(str).str.zfill(2)
+            + "-"
+            + meses["DIAS_MES"].astype(str).str.zfill(2)
+        )
+        calendario_meses_list = meses[["ANIO", "MES", "DIAS_MES", "FIN_MES", "MES_ANIO"]].to_dict(orient="records")
+    except Exception:
+        calendario_meses_list = []
+
     # Resumen por clasificación
     resumen_clasif = (
         df.groupby("Clasificacion", dropna=False)
@@ -256,6 +318,8 @@ def main() -> None:
     pagos_mes_json = json.dumps(pagos_mes_list, ensure_ascii=False)
     pagos_dia_json = json.dumps(pagos_dia_list, ensure_ascii=False)
     socios_info_json = json.dumps(socios_info_list, ensure_ascii=False)
+    calendario_meses_json = json.dumps(calendario_meses_list, ensure_ascii=False)
+    pagos_mes_caja_json = json.dumps(pagos_mes_caja_list, ensure_ascii=False)
 
     html = f"""<!DOCTYPE html>
 <html lang="es">
@@ -700,6 +764,8 @@ def main() -> None:
     const PAGOS_MES = {pagos_mes_json};
     const PAGOS_DIA = {pagos_dia_json};
     const SOCIOS_INFO = {socios_info_json};
+    const CALENDARIO_MESES = {calendario_meses_json};
+    const PAGOS_MES_CAJA = {pagos_mes_caja_json};
     const PROVISION_MENSUAL = {total_provision};
     const TOTAL_SOCIOS_DB = {total_socios_db};
     const TOTAL_SOCIOS_MORA = {total_socios_mora};
@@ -725,12 +791,21 @@ def main() -> None:
 
     function updateNuevosSocios(periodo) {{ /* KPI desactivado por ahora */ }}
 
+    function mesCalendario(anio, mes) {{
+      return CALENDARIO_MESES.find(c => Number(c.ANIO) === Number(anio) && Number(c.MES) === Number(mes));
+    }}
+
+    function diasDelMes(anio, mes) {{
+      const c = mesCalendario(anio, mes);
+      return c ? Number(c.DIAS_MES) : new Date(Number(anio), Number(mes), 0).getDate();
+    }}
+
     function endOfMonthDateStr(anio, mes) {{
-      const d = new Date(Number(anio), Number(mes), 0);
-      const y = d.getFullYear();
-      const m = String(d.getMonth() + 1).padStart(2,'0');
-      const day = String(d.getDate()).padStart(2,'0');
-      return `${{y}}-${{m}}-${{day}}`;
+      const c = mesCalendario(anio, mes);
+      if (c) return c.FIN_MES;
+      const m = String(mes).padStart(2,'0');
+      const day = String(diasDelMes(anio, mes)).padStart(2,'0');
+      return `${{anio}}-${{m}}-${{day}}`;
     }}
 
     function calcProvisionEsperadaMensual(fechaStr) {{
@@ -786,14 +861,6 @@ def main() -> None:
       // La provisión esperada, pagos y nuevo saldo se calculan en updateKpisPorVista según Año/Mes/Día
     }}
 
-    function endOfMonthDateStr(anio, mes) {{
-      const d = new Date(Number(anio), Number(mes), 0);
-      const y = d.getFullYear();
-      const m = String(d.getMonth() + 1).padStart(2,'0');
-      const day = String(d.getDate()).padStart(2,'0');
-      return `${{y}}-${{m}}-${{day}}`;
-    }}
-
     function calcProvisionEsperadaMensual(fechaStr) {{
       // Suma de cuota mensual estimada de socios con Primer_pago_dt <= fechaStr
       let total = 0;
@@ -930,9 +997,10 @@ def main() -> None:
       const anioSel = 2026;
 
       // Mes
+      const fuenteMeses = PAGOS_MES_CAJA.length ? PAGOS_MES_CAJA : PAGOS_DIA;
       const meses = anioSel == null
         ? []
-        : [...new Set(PAGOS_DIA.filter(p => Number(p.ANIO) === anioSel).map(p => p.MES))]
+        : [...new Set(fuenteMeses.filter(p => Number(p.ANIO) === anioSel).map(p => Number(p.MES)))]
             .filter(m => m != null)
             .sort((a,b)=>a-b);
       selMes.innerHTML = '<option value=\"\">—</option>';
@@ -951,7 +1019,7 @@ def main() -> None:
         const prevDia = selDia.value;
         const dias = [];
         if (anioSel != null && mesSel != null) {{
-          const lastDay = new Date(anioSel, mesSel, 0).getDate();
+          const lastDay = diasDelMes(anioSel, mesSel);
           for (let d = 1; d <= lastDay; d++) dias.push(d);
         }}
         selDia.innerHTML = '<option value=\"\">—</option>';
@@ -986,19 +1054,27 @@ def main() -> None:
         const fechaStr = `${{anio}}-${{mes.padStart(2,'0')}}-${{dia.padStart(2,'0')}}`;
         const provMes = calcProvisionEsperadaMensual(fechaStr) * ratioMora;
         // Provisión esperada específica del día: cuota mensual / días del mes
-        const lastDay = new Date(Number(anio), Number(mes), 0).getDate();
+        const lastDay = diasDelMes(anio, mes);
         const provDia = lastDay > 0 ? (provMes / lastDay) : 0;
         const filaDia = PAGOS_DIA.find(p => p.fecha_str === fechaStr);
         const pagosDelDiaGlobal = filaDia ? Number(filaDia.Monto_pagado_dia || 0) : 0;
         const pagosDelDia = pagosDelDiaGlobal * ratioMora;
         // Nuevo saldo: cartera inicial filtrada − pagos acumulados de 2026 hasta este día
+        // Meses completos anteriores desde el agregado mensual + días del mes hasta la fecha
         let pagosAcumGlobal = 0;
+        const usarMesCaja = PAGOS_MES_CAJA.length > 0;
+        if (usarMesCaja) {{
+          PAGOS_MES_CAJA.forEach(p => {{
+            if (String(p.ANIO) === anio && Number(p.MES) < Number(mes)) pagosAcumGlobal += Number(p.Monto_pagado || 0);
+          }});
+        }}
         PAGOS_DIA.forEach(p => {{
           const f = String(p.fecha_str || '');
           const anioP = String(p.ANIO || '');
           if (!f) return;
           // Solo consideramos pagos del mismo año del filtro (2026 en nuestro caso)
           if (anioP !== anio) return;
+          if (usarMesCaja && Number(p.MES) !== Number(mes)) return;
           if (f <= fechaStr) pagosAcumGlobal += Number(p.Monto_pagado_dia || 0);
         }});
         const pagosAcumEsc = pagosAcumGlobal * ratioMora;
@@ -1091,7 +1167,7 @@ def main() -> None:
       const prevDia = selDia.value;
       const dias = [];
       if (anioSel != null && mesSel != null) {{
-        const lastDay = new Date(anioSel, mesSel, 0).getDate();
+        const lastDay = diasDelMes(anioSel, mesSel);
         for (let d = 1; d <= lastDay; d++) dias.push(d);
       }}
       selDia.innerHTML = '<option value=\"\">—</option>';
@@ -1139,11 +1215,13 @@ def main() -> None:
 </html>
 """
 
+    if EN_PREVIEW:
+        html = marcar_html(html, estimaciones)
     OUT_HTML.write_text(html, encoding="utf-8")
+    registrar_huella([OUT_HTML], huella)
     print(f"Dashboard Odoo vs mora generado: {OUT_HTML}")
     print(f"Provisión virtual mensual calculada: {total_provision:,.2f}")
 
 
 if __name__ == "__main__":
-    main()
-
+    main(forzar="--forzar" in sys.argv[1:])
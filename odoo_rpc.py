@@ -0,0 +1,422 @@
+"""
+Ingesta directa desde Odoo por JSON-RPC, sin exportar cuotas_AAAA_MM.xlsx ni Membership a mano.
+
+Cada modelo de MODELOS se lee con `search_read` paginado (LOTE registros por llamada) y se
+guarda tal cual, con los nombres de columna de las exportaciones, en el almacén local
+(cartera.sqlite, ver almacen.py):
+- odoo_cuotas      ← pagos/cuotas (mismas columnas que odoo/cuotas_*.xlsx)
+- odoo_membership  ← res.membership (código, nombre y estado de la membresía)
+
+Paginación por cursor: los registros se piden ordenados por (write_date, id) y cada página
+continúa después del último visto, así que una página no se corre aunque Odoo modifique
+registros durante la lectura. El cursor se guarda en _cargas al final de cada modelo (en la
+misma transacción que los registros): la siguiente corrida solo trae lo modificado desde
+entonces. Con --completo se descarta el cursor y se recarga todo (necesario para ver
+registros borrados en Odoo).
+
+HTTP: una sola sesión con un pool de conexiones keep-alive (http.client, sin dependencias)
+compartida por los hilos; los modelos se leen en paralelo con un máximo de CONCURRENCIA
+llamadas simultáneas.
+
+Cuando el almacén tiene registros de Odoo, preparar_odoo_comparativo.py y
+cruzar_odoo_mora_socios.cargar_membership los usan en lugar de los xlsx (las cuotas quedan
+agrupadas por mes de registro como odoo_rpc/cuotas_AAAA_MM, igual que un archivo mensual) e
+informan la fecha de sincronización y el último write_date. Si alguna exportación xlsx es más
+nueva que la última sincronización, se avisa y se usan los xlsx.
+
+Pruebas sin Odoo: --grabar ARCHIVO.jsonl guarda cada respuesta de una corrida real, y
+--reproducir ARCHIVO.jsonl levanta un servidor local (ServidorGrabado) que responde lo grabado
+y sincroniza contra él.
+
+Conexión (variables de entorno): ODOO_URL, ODOO_DB, ODOO_USUARIO, ODOO_CLAVE (contraseña o
+clave API). Los nombres de campo de MODELOS son los del servidor del Colegio; si cambian,
+se ajustan ahí.
+
+Uso:
+    python odoo_rpc.py                          # trae lo modificado desde la última corrida
+    python odoo_rpc.py --completo               # descarta los cursores y recarga todo
+    python odoo_rpc.py --grabar odoo_rpc.jsonl
+    python odoo_rpc.py --reproducir odoo_rpc.jsonl
+"""
+
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent
+
+LOTE = 2000
+CONCURRENCIA = 4
+TIMEOUT = 60
+REINTENTOS = 3
+
+# Tabla del almacén → modelo de Odoo y columna de la exportación → campo del modelo
+MODELOS = {
+    "odoo_cuotas": {
+        "modelo": "account.payment",
+        "campos": {
+            "COMPROBANTE": "name",
+            "MONTO": "amount",
+            "TIPO DE COMPROBANTE": "x_tipo_comprobante",
+            "TIPO PAGO": "x_tipo_pago",
+            "FECHA COMPROB.": "x_fecha_comprobante",
+            "FECHA REGISTRO": "date",
+            "FECHA APLICACION": "x_fecha_aplicacion",
+            "ESTADO": "x_estado",
+            "CONSUMIDOR": "partner_id",
+            "ESTADO SOCIO": "x_estado_socio",
+        },
+    },
+    "odoo_membership": {
+        "modelo": "res.membership",
+        "campos": {
+            "Codigo_socio": "x_codigo_socio",
+            "Nombre_socio": "partner_id",
+            "Estado_membresia_odoo": "state",
+            "Tipo_membresia": "membership_type_id",
+        },
+    },
+}
+
+CURSOR_INICIAL = ("1970-01-01 00:00:00", 0)
+
+
+class ErrorOdoo(RuntimeError):
+    """Error devuelto por el servidor JSON-RPC (campo `error` de la respuesta)."""
+
+
+# ---- cliente ----------------------------------------------------------------------------
+
+
+class SesionRPC:
+    """Cliente JSON-RPC con un pool de conexiones keep-alive, seguro entre hilos."""
+
+    def __init__(self, url: str, db: str, usuario: str, clave: str, conexiones: int = CONCURRENCIA, grabar: Path | None = None):
+        partes = urlsplit(url)
+        self._https = partes.scheme == "https"
+        self._host = partes.hostname
+        self._puerto = partes.port
+        self._ruta = (partes.path.rstrip("/") or "") + "/jsonrpc"
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(conexiones):
+            self._pool.put(None)  # las conexiones se abren al primer uso
+        self._ids = iter(range(1, sys.maxsize))
+        self._bloqueo = threading.Lock()
+        self._grabar = open(grabar, "a", encoding="utf-8") if grabar else None
+        self.db, self.clave = db, clave
+        self.llamadas = 0
+        self.uid = self.llamar("common", "login", [db, usuario, clave])
+        if not self.uid:
+            raise ErrorOdoo(f"Odoo rechazó el usuario {usuario!r} en la base {db!r}")
+
+    def _conexion(self) -> http.client.HTTPConnection:
+        clase = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return clase(self._host, self._puerto, timeout=TIMEOUT)
+
+    def llamar(self, servicio: str, metodo: str, args: list):
+        with self._bloqueo:
+            n = next(self._ids)
+            self.llamadas += 1
+        cuerpo = json.dumps(
+            {"jsonrpc": "2.0", "method": "call", "id": n, "params": {"service": servicio, "method": metodo, "args": args}}
+        ).encode("utf-8")
+        con = self._pool.get()
+        try:
+            for intento in range(REINTENTOS):
+                try:
+                    con = con or self._conexion()
+                    con.request("POST", self._ruta, body=cuerpo, headers={"Content-Type": "application/json", "Connection": "keep-alive"})
+                    resp = con.getresponse()
+                    datos = resp.read()
+                    if resp.status != 200:
+                        raise ErrorOdoo(f"HTTP {resp.status} en {servicio}.{metodo}")
+                    break
+                except (http.client.HTTPException, OSError):
+                    # Conexión cerrada por el servidor (keep-alive vencido): se abre otra
+                    if con is not None:
+                        con.close()
+                    con = None
+                    if intento == REINTENTOS - 1:
+                        raise
+                    time.sleep(0.5 * 2**intento)
+        finally:
+            self._pool.put(con)
+        respuesta = json.loads(datos)
+        if self._grabar is not None:
+            with self._bloqueo:
+                self._grabar.write(json.dumps({"clave": clave_llamada(servicio, metodo, args), "respuesta": respuesta}) + "\n")
+                self._grabar.flush()
+        if respuesta.get("error"):
+            err = respuesta["error"]
+            raise ErrorOdoo(err.get("data", {}).get("message") or err.get("message") or str(err))
+        return respuesta["result"]
+
+    def search_read(self, modelo: str, dominio: list, campos: list[str], limite: int, orden: str) -> list[dict]:
+        return self.llamar(
+            "object",
+            "execute_kw",
+            [self.db, self.uid, self.clave, modelo, "search_read", [dominio], {"fields": campos, "limit": limite, "order": orden}],
+        )
+
+    def cerrar(self) -> None:
+        while not self._pool.empty():
+            con = self._pool.get_nowait()
+            if con is not None:
+                con.close()
+        if self._grabar is not None:
+            self._grabar.close()
+
+
+def clave_llamada(servicio: str, metodo: str, args: list) -> str:
+    """Clave de una llamada para grabar/reproducir (sin la contraseña ni el uid)."""
+    if servicio == "object":
+        args = args[3:]
+    elif servicio == "common":
+        args = args[:2]
+    return hashlib.sha1(json.dumps([servicio, metodo, args], sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _dominio_desde(cursor: tuple[str, int]) -> list:
+    """Registros posteriores a (write_date, id) en el orden write_date, id."""
+    fecha, ultimo_id = cursor
+    return ["|", ("write_date", ">", fecha), "&", ("write_date", "=", fecha), ("id", ">", ultimo_id)]
+
+
+def leer_modelo(sesion: SesionRPC, tabla: str, cursor: tuple[str, int], lote: int = LOTE) -> tuple[list[dict], tuple[str, int]]:
+    """Todas las páginas de un modelo desde el cursor; devuelve los registros y el cursor nuevo."""
+    spec = MODELOS[tabla]
+    campos = list(dict.fromkeys(["id", "write_date", *spec["campos"].values()]))
+    registros: list[dict] = []
+    while True:
+        pagina = sesion.search_read(spec["modelo"], _dominio_desde(cursor), campos, lote, "write_date asc, id asc")
+        registros.extend(pagina)
+        if pagina:
+            cursor = (pagina[-1]["write_date"], pagina[-1]["id"])
+        if len(pagina) < lote:
+            return registros, cursor
+
+
+def _valor(v):
+    """Valor de Odoo → escalar: many2one [id, nombre] → nombre, False → None."""
+    if v is False:
+        return None
+    if isinstance(v, list):
+        return v[1] if len(v) == 2 else None
+    return v
+
+
+def a_tabla(tabla: str, registros: list[dict]) -> pd.DataFrame:
+    """Registros de Odoo con los nombres de columna de la exportación."""
+    campos = MODELOS[tabla]["campos"]
+    filas = {"odoo_id": [r["id"] for r in registros], "write_date": [r["write_date"] for r in registros]}
+    for columna, campo in campos.items():
+        filas[columna] = [_valor(r.get(campo)) for r in registros]
+    return pd.DataFrame(filas)
+
+
+# ---- almacén ----------------------------------------------------------------------------
+
+
+def _cursor_guardado(con, tabla: str) -> tuple[str, int]:
+    fila = con.execute("SELECT huella FROM _cargas WHERE tabla = ? AND parte = 'odoo_rpc'", (tabla,)).fetchone()
+    if not fila:
+        return CURSOR_INICIAL
+    fecha, ultimo_id = fila[0].rsplit("|", 1)
+    return fecha, int(ultimo_id)
+
+
+def guardar_registros(con, tabla: str, df: pd.DataFrame, cursor: tuple[str, int], completo: bool) -> int:
+    """Upsert por odoo_id y cursor nuevo en una transacción (con `completo`, reemplaza la tabla)."""
+    from almacen import TABLAS, _filas, _registrar_carga
+
+    columnas = [c for c, _t in TABLAS[tabla]]
+    marcas = ", ".join("?" * len(columnas))
+    with con:
+        if completo:
+            con.execute(f"DELETE FROM {tabla}")
+        con.executemany(f"INSERT OR REPLACE INTO {tabla} VALUES ({marcas})", _filas(df, columnas))
+        total = con.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+        _registrar_carga(con, tabla, "odoo_rpc", f"{cursor[0]}|{cursor[1]}", total)
+    return len(df)
+
+
+def sincronizar(sesion: SesionRPC, con=None, completo: bool = False, lote: int = LOTE) -> dict[str, int]:
+    """Lee los modelos en paralelo desde su cursor y guarda lo nuevo en el almacén."""
+    from almacen import conectar
+
+    con = con or conectar()
+    cursores = {t: (CURSOR_INICIAL if completo else _cursor_guardado(con, t)) for t in MODELOS}
+    res = {}
+    with ThreadPoolExecutor(max_workers=min(CONCURRENCIA, len(MODELOS))) as ex:
+        futuros = {t: ex.submit(leer_modelo, sesion, t, cursores[t], lote) for t in MODELOS}
+        # SQLite se escribe solo desde este hilo
+        for tabla, fut in futuros.items():
+            registros, cursor = fut.result()
+            res[tabla] = guardar_registros(con, tabla, a_tabla(tabla, registros), cursor, completo)
+    return res
+
+
+def _leer_almacen(tabla: str, archivos=()) -> pd.DataFrame | None:
+    """Tabla cruda de Odoo, o None si no hay registros o si algún xlsx de `archivos` es más nuevo
+    que la última sincronización (entonces mandan las exportaciones a mano). No crea la base."""
+    import sqlite3
+    from datetime import datetime
+
+    from almacen import DB_CARTERA
+
+    if not DB_CARTERA.exists():
+        return None
+    con = sqlite3.connect(f"file:{DB_CARTERA.as_posix()}?mode=ro", uri=True)
+    try:
+        existe = con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)).fetchone()
+        if not existe:
+            return None
+        df = pd.read_sql_query(f"SELECT * FROM {tabla} ORDER BY odoo_id", con)
+        fila = con.execute("SELECT cargado FROM _cargas WHERE tabla = ? AND parte = 'odoo_rpc'", (tabla,)).fetchone()
+    finally:
+        con.close()
+    if not len(df):
+        return None
+    sincronizado = fila[0] if fila else None
+    if sincronizado:
+        limite = datetime.fromisoformat(sincronizado).timestamp()
+        nuevos = [p for p in archivos if p.exists() and p.stat().st_mtime > limite]
+        if nuevos:
+            print(
+                f"  Aviso: {len(nuevos)} xlsx más nuevo(s) que la última sincronización de {tabla} "
+                f"({sincronizado}), p. ej. {nuevos[-1].name}: se usan los xlsx. "
+                f"Correr `python odoo_rpc.py` para actualizar el almacén."
+            )
+            return None
+    print(
+        f"  {tabla}: desde el almacén (JSON-RPC), {len(df)} registros, sincronizado {sincronizado or '?'}, "
+        f"último write_date {df['write_date'].max()}"
+    )
+    return df
+
+
+def cuotas_desde_almacen(archivos=()) -> pd.DataFrame | None:
+    """Cuotas Odoo como si vinieran de los archivos mensuales (__archivo = odoo_rpc/cuotas_AAAA_MM).
+
+    `archivos`: las exportaciones cuotas_*.xlsx; si alguna es más nueva que el almacén, None.
+    """
+    import muestra
+
+    df = _leer_almacen("odoo_cuotas", archivos)
+    if df is None:
+        return None
+    mes = pd.to_datetime(df["FECHA REGISTRO"], errors="coerce").dt.strftime("%Y_%m").fillna("sin_fecha")
+    out = df[list(MODELOS["odoo_cuotas"]["campos"])].copy()
+    out["__archivo"] = "odoo_rpc/cuotas_" + mes
+    # Un mes tras otro, como la concatenación de los archivos mensuales
+    out = out.sort_values("__archivo", kind="stable", ignore_index=True)
+    return muestra.filtrar(out, "CONSUMIDOR", por="nombre")
+
+
+def membership_desde_almacen(archivos=()) -> pd.DataFrame | None:
+    """Membership con las columnas y tipos de fuentes.FUENTES['membership'].
+
+    `archivos`: la exportación de Membership; si es más nueva que el almacén, None.
+    """
+    import muestra
+
+    df = _leer_almacen("odoo_membership", archivos)
+    if df is None:
+        return None
+    out = pd.DataFrame(
+        {
+            "Codigo_socio": pd.to_numeric(df["Codigo_socio"], errors="coerce").astype("Int64"),
+            "Nombre_socio": df["Nombre_socio"].astype(str).str.strip(),
+            "Estado_membresia_odoo": df["Estado_membresia_odoo"].astype(str).str.strip(),
+        }
+    )
+    return muestra.filtrar(out, "Codigo_socio")
+
+
+# ---- servidor de grabaciones ------------------------------------------------------------
+
+
+class ServidorGrabado(ThreadingHTTPServer):
+    """Servidor JSON-RPC local que responde las llamadas grabadas con --grabar."""
+
+    daemon_threads = True
+
+    def __init__(self, grabacion: Path, puerto: int = 0):
+        self.respuestas: dict[str, dict] = {}
+        with open(grabacion, encoding="utf-8") as f:
+            for linea in f:
+                if linea.strip():
+                    r = json.loads(linea)
+                    self.respuestas[r["clave"]] = r["respuesta"]
+        super().__init__(("127.0.0.1", puerto), _ManejadorGrabado)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _ManejadorGrabado(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como Odoo
+
+    def do_POST(self):
+        pedido = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        p = pedido["params"]
+        respuesta = self.server.respuestas.get(clave_llamada(p["service"], p["method"], p["args"]))
+        if respuesta is None:
+            respuesta = {"jsonrpc": "2.0", "error": {"message": f"Llamada no grabada: {p['service']}.{p['method']}"}}
+        cuerpo = json.dumps({**respuesta, "id": pedido.get("id")}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingesta de Odoo por JSON-RPC al almacén (cartera.sqlite).")
+    parser.add_argument("--completo", action="store_true", help="Descartar los cursores y recargar todo")
+    parser.add_argument("--lote", type=int, default=LOTE, help=f"Registros por llamada (por defecto {LOTE})")
+    parser.add_argument("--grabar", type=Path, help="Guardar las respuestas en un .jsonl para --reproducir")
+    parser.add_argument("--reproducir", type=Path, help="Sincronizar contra un servidor local con las respuestas grabadas")
+    args = parser.parse_args()
+
+    servidor = None
+    if args.reproducir:
+        servidor = ServidorGrabado(args.reproducir)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url, db, usuario, clave = servidor.url, os.environ.get("ODOO_DB", "colmed"), os.environ.get("ODOO_USUARIO", ""), ""
+    else:
+        faltan = [v for v in ("ODOO_URL", "ODOO_DB", "ODOO_USUARIO", "ODOO_CLAVE") if not os.environ.get(v)]
+        if faltan:
+            raise SystemExit(f"Faltan variables de entorno: {', '.join(faltan)}")
+        url, db, usuario, clave = (os.environ[v] for v in ("ODOO_URL", "ODOO_DB", "ODOO_USUARIO", "ODOO_CLAVE"))
+
+    t0 = time.perf_counter()
+    sesion = SesionRPC(url, db, usuario, clave, grabar=args.grabar)
+    try:
+        res = sincronizar(sesion, completo=args.completo, lote=args.lote)
+    finally:
+        sesion.cerrar()
+        if servidor is not None:
+            servidor.shutdown()
+    print(f"Odoo ({url}) → almacén: " + ", ".join(f"{t}: {n} registros" for t, n in res.items()))
+    print(f"  {sesion.llamadas} llamadas en {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
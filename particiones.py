@@ -0,0 +1,141 @@
+"""
+Exportación particionada por mes (Parquet + CSV) para la actualización incremental de Power BI.
+
+Cada tabla se escribe en carpetas estilo Hive, una partición por año/mes:
+
+    <carpeta>/parquet/ANIO_PAGO=2025/MES_PAGO=10/datos.parquet
+    <carpeta>/csv/ANIO_PAGO=2025/MES_PAGO=10/datos.csv
+
+En <carpeta>/_manifest.json se guarda la huella de contenido de cada partición;
+solo se reescriben las particiones cuya huella cambió (y se borran las que ya no existen),
+así la política de actualización incremental de Power BI carga únicamente los meses recientes.
+
+Las filas sin fecha van a la partición <ANIO>=0/<MES>=0.
+Parquet requiere pyarrow (o fastparquet); si no está instalado solo se escribe CSV.
+"""
+
+import hashlib
+import importlib.util
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = "_manifest.json"
+FORMATOS = ("parquet", "csv")
+
+
+def parquet_disponible() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None or importlib.util.find_spec("fastparquet") is not None
+
+
+def periodo_de(fechas) -> np.ndarray:
+    """Periodo AAAAMM (int) desde fechas o claves AAAAMMDD; 0 si no hay fecha."""
+    s = pd.Series(fechas)
+    if pd.api.types.is_datetime64_any_dtype(s):
+        per = s.dt.year * 100 + s.dt.month
+    else:
+        num = pd.to_numeric(s, errors="coerce")
+        if num.dropna().gt(99991231).any() or num.dropna().lt(10000101).any():
+            f = pd.to_datetime(s, errors="coerce")
+            per = f.dt.year * 100 + f.dt.month
+        else:
+            per = num // 100
+    return per.fillna(0).astype("int64").to_numpy()
+
+
+def huella_df(df: pd.DataFrame) -> str:
+    """Huella de contenido estable de un DataFrame (columnas + valores, sin índice)."""
+    h = hashlib.sha1()
+    h.update("|".join(f"{c}:{t}" for c, t in df.dtypes.astype(str).items()).encode("utf-8"))
+    if len(df):
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _para_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    # Las columnas object pueden mezclar números y texto (típico de Excel); Parquet exige un tipo.
+    out = df.copy()
+    for c in out.columns:
+        if out[c].dtype == object:
+            out[c] = out[c].astype("string")
+    out.columns = [str(c) for c in out.columns]
+    return out
+
+
+def _leer_manifest(carpeta: Path) -> dict:
+    path = carpeta / MANIFEST
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def escribir_particiones(
+    df: pd.DataFrame,
+    carpeta: Path,
+    fechas,
+    nombres: tuple[str, str] = ("ANIO", "MES"),
+    formatos: tuple[str, ...] = FORMATOS,
+) -> dict:
+    """Escribe df particionado por mes según `fechas` y devuelve un resumen (escritas/sin cambios/borradas)."""
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    formatos = tuple(f for f in formatos if f in FORMATOS)
+    if "parquet" in formatos and not parquet_disponible():
+        print("  Aviso: pyarrow/fastparquet no instalado, se omite la salida Parquet.")
+        formatos = tuple(f for f in formatos if f != "parquet")
+
+    col_anio, col_mes = nombres
+    periodo = periodo_de(fechas)
+    manifest_prev = _leer_manifest(carpeta)
+    manifest: dict = {}
+    escritas, iguales = [], []
+
+    # Un solo ordenamiento y cortes por periodo (evita un groupby con copia por grupo)
+    orden = np.argsort(periodo, kind="stable")
+    per_ord = periodo[orden]
+    cortes = np.flatnonzero(np.diff(per_ord)) + 1
+    inicios = np.r_[0, cortes] if len(per_ord) else np.array([], dtype=int)
+    finales = np.r_[cortes, len(per_ord)] if len(per_ord) else np.array([], dtype=int)
+
+    for ini, fin in zip(inicios, finales):
+        p = int(per_ord[ini])
+        nombre = f"{col_anio}={p // 100}/{col_mes}={p % 100:02d}"
+        parte = df.iloc[orden[ini:fin]]
+        huella = huella_df(parte)
+        manifest[nombre] = {"huella": huella, "filas": int(fin - ini), "formatos": list(formatos)}
+        previo = manifest_prev.get(nombre, {})
+        archivos_ok = all((carpeta / f / nombre / f"datos.{f}").exists() for f in formatos)
+        if previo.get("huella") == huella and archivos_ok and set(previo.get("formatos", [])) >= set(formatos):
+            iguales.append(nombre)
+            continue
+        for f in formatos:
+            destino = carpeta / f / nombre / f"datos.{f}"
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            tmp = destino.with_suffix(f".{f}.tmp")
+            if f == "parquet":
+                _para_parquet(parte).to_parquet(tmp, index=False)
+            else:
+                parte.to_csv(tmp, index=False, encoding="utf-8-sig", date_format="%Y-%m-%d")
+            tmp.replace(destino)
+        escritas.append(nombre)
+
+    borradas = [n for n in manifest_prev if n not in manifest]
+    for nombre in borradas:
+        for f in FORMATOS:
+            shutil.rmtree(carpeta / f / nombre, ignore_errors=True)
+
+    (carpeta / MANIFEST).write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    return {"escritas": escritas, "sin_cambios": iguales, "borradas": borradas}
+
+
+def resumen_particiones(carpeta: Path, res: dict) -> str:
+    return (
+        f"Particiones en {carpeta}: {len(res['escritas'])} escritas, "
+        f"{len(res['sin_cambios'])} sin cambios, {len(res['borradas'])} borradas"
+    )
@@ -0,0 +1,246 @@
+"""
+Perfil 360 por socio precalculado para consultas instantáneas de cobranza.
+
+Un registro JSON compacto por código de socio con todo lo que el gestor necesita ver:
+- nombre y estado de la membresía (Membership de Odoo), estado y precio (socios.xlsx)
+- monto y rango de mora (reporte de mora) y clasificación del cruce Odoo vs mora
+- cuotas pendientes (cantidad, monto, vencimiento más antiguo)
+- línea de tiempo de pagos Odoo (fecha, período, monto, comprobante, estado)
+
+Los registros se guardan en perfiles_socio.sqlite como clave → valor (Codigo_socio como
+INTEGER PRIMARY KEY, es decir el rowid de SQLite): una consulta es una sola búsqueda por
+clave, sin abrir ningún Excel. Cada registro lleva su huella (sha1 del JSON); al reconstruir
+solo se reescriben los socios cuyo perfil cambió y se borran los que ya no están. Si ninguna
+entrada ni el código cambiaron desde la última construcción, no se recalcula nada
+(ver huellas.py).
+
+Entradas (a través de cartera.CarteraStore):
+- odoo/Membership (res.membership).xlsx, socios.xlsx, Reporte_act_cuotas_completas.xlsx
+- odoo/odoo_vs_mora_socios (cruzar_odoo_mora_socios.py)
+- odoo/odoo_cuotas_unificado (preparar_odoo_comparativo.py)
+- BasesDeDatos-CUOTAS.xlsx o RECUPERACION_DE_MORA.csv (cuotas pendientes)
+
+Salida:
+- perfiles_socio.sqlite  (tabla perfiles: Codigo_socio, huella, perfil, actualizado)
+
+Uso:
+    python perfil_socio.py                # construye/actualiza los perfiles
+    python perfil_socio.py --forzar       # recalcula aunque nada haya cambiado
+    python perfil_socio.py --socio 7572   # muestra un perfil
+
+    from perfil_socio import buscar_perfil
+    buscar_perfil(7572)                   # dict o None
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from huellas import calcular_huella, cambios, registrar_huella, salida_vigente
+
+BASE_DIR = Path(__file__).parent
+ODOO_DIR = BASE_DIR / "odoo"
+
+DB_PERFILES = BASE_DIR / "perfiles_socio.sqlite"
+
+# Módulos que cartera.CarteraStore importa dentro de sus métodos (cargadores de cada tabla)
+MODULOS_CARGADORES = ["cartera", "aging", "plan_cuotas", "cruzar_odoo_mora_socios", "intermedios", "fuentes"]
+
+ENTRADAS = [
+    ODOO_DIR / "Membership (res.membership).xlsx",
+    BASE_DIR / "socios.xlsx",
+    BASE_DIR / "Reporte_act_cuotas_completas.xlsx",
+    ODOO_DIR / "odoo_vs_mora_socios.xlsx",
+    ODOO_DIR / "odoo_cuotas_unificado.xlsx",
+    BASE_DIR / "BasesDeDatos-CUOTAS.xlsx",
+    BASE_DIR / "RECUPERACION_DE_MORA.csv",
+]
+
+# Columnas del cruce que entran al perfil (además de las de los maestros)
+COLUMNAS_CRUCE = ["Clasificacion", "Monto_pagado_total", "Monto_mora_restante", "Monto_mora_restante_fifo", "Estado_socio_odoo_ultimo"]
+
+
+def _valor(v):
+    """Escalar apto para JSON: nulos → None, fechas ISO, montos con 2 decimales."""
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.strftime("%Y-%m-%d")
+    if isinstance(v, (np.integer, int)) and not isinstance(v, bool):
+        return int(v)
+    if isinstance(v, (np.floating, float)):
+        return round(float(v), 2)
+    return str(v) if not isinstance(v, (str, bool)) else v
+
+
+def _tramos(claves: np.ndarray) -> dict[int, tuple[int, int]]:
+    """Código → (inicio, fin) en un arreglo ordenado por código."""
+    if len(claves) == 0:
+        return {}
+    cortes = np.flatnonzero(claves[1:] != claves[:-1]) + 1
+    inicios = np.r_[0, cortes]
+    finales = np.r_[cortes, len(claves)]
+    return {int(k): (int(a), int(b)) for k, a, b in zip(claves[inicios], inicios, finales)}
+
+
+def construir_perfiles(store=None) -> dict[int, dict]:
+    """Perfil de cada socio presente en algún maestro, en la mora o en las cuotas pendientes."""
+    from cartera import CarteraStore
+
+    store = store or CarteraStore()
+    socios = store.tabla("socios").set_index("Codigo_socio")
+    cruce = store.tabla("mora").drop_duplicates("Codigo_socio").set_index("Codigo_socio")
+    pagos = store.tabla("pagos_socio")
+    pend = store.tabla("pendientes")
+
+    cod_pagos = pagos["Codigo_socio"].to_numpy("int64")
+    cod_pend = pend["Codigo_socio"].astype("int64").to_numpy()
+    codigos = sorted(set(socios.index.astype("int64")) | set(cruce.index.astype("int64")) | set(cod_pend.tolist()))
+
+    tramo_pagos = _tramos(cod_pagos)
+    tramo_pend = _tramos(cod_pend)
+    # Columnas como arreglos de Python una sola vez (el bucle por socio no toca pandas)
+    linea = {
+        "fecha": pagos["FECHA_PAGO"].dt.strftime("%Y-%m-%d").tolist(),
+        "periodo": pd.to_datetime(pagos["FECHA_PERIODO"], errors="coerce").dt.strftime("%Y-%m").tolist(),
+        "monto": pd.to_numeric(pagos["MONTO"], errors="coerce").round(2).tolist(),
+        "comprobante": pagos["COMPROBANTE"].tolist(),
+        "estado": pagos["ESTADO"].tolist(),
+    }
+    pend_fecha = pd.to_datetime(pend["Fecha"], errors="coerce")
+    pend_monto = pd.to_numeric(pend["Monto"], errors="coerce").fillna(0.0).to_numpy()
+
+    datos_socio = socios.reindex(codigos)
+    datos_cruce = cruce.reindex(codigos, columns=[c for c in COLUMNAS_CRUCE if c in cruce.columns])
+
+    perfiles = {}
+    for cod, fila, fila_cruce in zip(codigos, datos_socio.itertuples(index=False), datos_cruce.itertuples(index=False)):
+        f = fila._asdict()
+        perfil = {
+            "codigo": cod,
+            "nombre": _valor(f.get("Nombre_socio")),
+            "estado_membresia_odoo": _valor(f.get("Estado_membresia_odoo")),
+            "estado_membresia": _valor(f.get("Estado_membresia")),
+            "precio_membresia": _valor(f.get("Precio_membresia")),
+            "mora": {
+                "monto": _valor(f.get("Monto_mora")),
+                "rango": _valor(f.get("Rango_dias_por_cuotas")),
+                **{c.lower(): _valor(v) for c, v in fila_cruce._asdict().items()},
+            },
+        }
+        a, b = tramo_pend.get(cod, (0, 0))
+        perfil["cuotas_pendientes"] = {
+            "cantidad": b - a,
+            "monto": round(float(pend_monto[a:b].sum()), 2),
+            "mas_antigua": _valor(pend_fecha.iloc[a:b].min()) if b > a else None,
+        }
+        a, b = tramo_pagos.get(cod, (0, 0))
+        perfil["pagos"] = [
+            {k: _valor(linea[k][i]) for k in linea} for i in range(a, b)
+        ]
+        perfiles[cod] = perfil
+    return perfiles
+
+
+def _serializar(perfil: dict) -> str:
+    return json.dumps(perfil, ensure_ascii=False, separators=(",", ":"))
+
+
+def conectar(path: Path = DB_PERFILES) -> sqlite3.Connection:
+    con = sqlite3.connect(path)
+    with con:
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS perfiles "
+            "(Codigo_socio INTEGER PRIMARY KEY, huella TEXT NOT NULL, perfil TEXT NOT NULL, actualizado TEXT)"
+        )
+    return con
+
+
+def guardar_perfiles(perfiles: dict[int, dict], path: Path = DB_PERFILES) -> dict[str, int]:
+    """Upsert de los perfiles que cambiaron y borrado de los que ya no existen (una transacción)."""
+    con = conectar(path)
+    try:
+        previas = dict(con.execute("SELECT Codigo_socio, huella FROM perfiles"))
+        ahora = datetime.now().isoformat(timespec="seconds")
+        cambiados = []
+        for cod, perfil in perfiles.items():
+            texto = _serializar(perfil)
+            huella = hashlib.sha1(texto.encode("utf-8")).hexdigest()
+            if previas.get(cod) != huella:
+                cambiados.append((cod, huella, texto, ahora))
+        borrados = [(cod,) for cod in previas if cod not in perfiles]
+        with con:
+            con.executemany("INSERT OR REPLACE INTO perfiles VALUES (?, ?, ?, ?)", cambiados)
+            con.executemany("DELETE FROM perfiles WHERE Codigo_socio = ?", borrados)
+    finally:
+        con.close()
+    return {"actualizados": len(cambiados), "borrados": len(borrados), "total": len(perfiles)}
+
+
+def buscar_perfil(codigo: int, path: Path = DB_PERFILES) -> dict | None:
+    """Perfil de un socio (None si no existe o aún no se construyó la base)."""
+    if not Path(path).exists():
+        return None
+    con = sqlite3.connect(f"file:{Path(path).as_posix()}?mode=ro", uri=True)
+    try:
+        fila = con.execute("SELECT perfil FROM perfiles WHERE Codigo_socio = ?", (int(codigo),)).fetchone()
+    finally:
+        con.close()
+    return json.loads(fila[0]) if fila else None
+
+
+def actualizar(forzar: bool = False) -> dict[str, int] | None:
+    """Reconstruye los perfiles si cambió alguna entrada (None si no hizo falta)."""
+    # CarteraStore importa sus cargadores recién al usarlos: se cargan antes para que la huella
+    # de código (huellas.codigo_cargado) los cubra a ellos y a sus dependencias locales
+    for modulo in MODULOS_CARGADORES:
+        importlib.import_module(modulo)
+
+    huella = calcular_huella(ENTRADAS)
+    if not forzar and salida_vigente([DB_PERFILES], huella):
+        return None
+    print("Reconstruyendo perfiles: " + ", ".join(cambios([DB_PERFILES], huella)[:5]))
+    res = guardar_perfiles(construir_perfiles())
+    registrar_huella([DB_PERFILES], huella)
+    return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Perfil 360 por socio (perfiles_socio.sqlite).")
+    parser.add_argument("--socio", type=int, help="Mostrar el perfil de un socio")
+    parser.add_argument("--forzar", action="store_true", help="Recalcular aunque nada haya cambiado")
+    args = parser.parse_args()
+
+    if args.socio is not None:
+        t0 = time.perf_counter()
+        perfil = buscar_perfil(args.socio)
+        ms = (time.perf_counter() - t0) * 1000
+        if perfil is None:
+            sys.exit(f"Sin perfil para el socio {args.socio} (¿se ejecutó python perfil_socio.py?)")
+        print(json.dumps(perfil, ensure_ascii=False, indent=2))
+        print(f"Consulta en {ms:.2f} ms")
+        return
+
+    t0 = time.perf_counter()
+    res = actualizar(forzar=args.forzar)
+    if res is None:
+        print(f"Sin cambios: {DB_PERFILES.name} está al día.")
+    else:
+        print(
+            f"Perfiles: {res['total']} socios, {res['actualizados']} actualizados, {res['borrados']} borrados "
+            f"→ {DB_PERFILES}"
+        )
+    print(f"Tiempo: {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Expansión del plan de cuotas de cada socio a una fila por cuota esperada.
+
+El texto del plan ("25 CUOTAS 38.50") da la cantidad de cuotas y el monto de cada una; el
+primer pago en Odoo (Primer_pago) da el mes de la primera cuota. Con `np.repeat` se genera
+una fila por cuota (secuencia 1..N) y el mes de vencimiento sale de sumar la secuencia al
+mes inicial, sin recorrer socio por socio.
+
+Con esa tabla, lo esperado contra lo recibido por mes es un join por (socio, mes) con los
+pagos de Odoo agrupados por mes de aplicación (FECHA_PERIODO).
+
+Entradas:
+- sep/Reporte_Montos_PowerBI_socios.xlsx          (plan: Codigo_socio, texto_cuotas, Monto_total)
+- odoo/cuotas_*.xlsx + odoo/Membership (res.membership).xlsx (pagos y nombre → código de socio)
+
+Salida:
+- sep/plan_cuotas_expandido.parquet (o .csv si no hay pyarrow)  — una fila por cuota esperada
+- sep/Esperado_vs_recibido.xlsx  (hojas Por_mes y Por_socio_mes)
+
+Con --preview lee y escribe en preview/ (muestra de socios, ver muestra.py).
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fuentes import normalizar_nombres, parse_cuotas
+from intermedios import leer_intermedio
+from muestra import ruta
+from particiones import _para_parquet, parquet_disponible
+
+BASE_DIR = Path(__file__).parent
+
+PLAN_FILE = ruta(BASE_DIR / "sep" / "Reporte_Montos_PowerBI_socios.xlsx")
+OUT_EXPANDIDO = ruta(BASE_DIR / "sep" / "plan_cuotas_expandido")
+OUT_ESPERADO = ruta(BASE_DIR / "sep" / "Esperado_vs_recibido.xlsx")
+
+
+def parsear_plan(plan: pd.DataFrame) -> pd.DataFrame:
+    """Num_cuotas y Monto_cuota por socio desde texto_cuotas (o columnas num_cuotas/monto_cuota si vienen llenas)."""
+    texto = plan.get("texto_cuotas", pd.Series("", index=plan.index))
+    # '25 CUOTAS 38.50' → (25, 38.50), con el mismo parser que los dashboards (fuentes.parse_cuotas)
+    nums = pd.DataFrame(texto.map(parse_cuotas).tolist(), index=plan.index, columns=["n", "m"])
+    num_cuotas = pd.to_numeric(nums["n"], errors="coerce")
+    monto_cuota = pd.to_numeric(nums["m"], errors="coerce")
+    if "num_cuotas" in plan.columns:
+        num_cuotas = pd.to_numeric(plan["num_cuotas"], errors="coerce").fillna(num_cuotas)
+    if "monto_cuota" in plan.columns:
+        monto_cuota = pd.to_numeric(plan["monto_cuota"], errors="coerce").fillna(monto_cuota)
+    monto_total = pd.to_numeric(plan.get("Monto_total"), errors="coerce")
+    # Sin monto en el texto: monto total / cuotas (igual que la provisión del dashboard)
+    if monto_total is not None:
+        monto_cuota = monto_cuota.fillna(monto_total / num_cuotas.where(num_cuotas > 0))
+    return pd.DataFrame(
+        {
+            "Codigo_socio": pd.to_numeric(plan["Codigo_socio"], errors="coerce").astype("Int64"),
+            "Num_cuotas": num_cuotas,
+            "Monto_cuota": monto_cuota.round(2),
+        }
+    )
+
+
+def codigo_socio_por_nombre(det: pd.DataFrame, master: pd.DataFrame) -> pd.Series:
+    """Código de socio de cada pago Odoo por nombre normalizado (misma regla que el cruce)."""
+    nombre_a_codigo = pd.Series(master["Codigo_socio"].to_numpy(), index=master["Nombre_norm"].to_numpy())
+    nombre_a_codigo = nombre_a_codigo[~nombre_a_codigo.index.duplicated(keep="first")]
+    return normalizar_nombres(det["CONSUMIDOR"]).map(nombre_a_codigo)
+
+
+def primer_pago_por_socio(det: pd.DataFrame, codigos: pd.Series) -> pd.Series:
+    """Primer_pago (mínimo de FECHA_BASE) por código de socio."""
+    fechas = pd.to_datetime(det["FECHA_BASE"], errors="coerce")
+    ok = codigos.notna() & fechas.notna()
+    return fechas[ok].groupby(codigos[ok].astype("int64").to_numpy()).min()
+
+
+def expandir_plan(plan: pd.DataFrame, inicio: pd.Series) -> pd.DataFrame:
+    """Una fila por cuota esperada: Codigo_socio, Secuencia, Num_cuotas, ANIO_MES_KEY, FECHA_KEY, Monto_esperado.
+
+    `plan` viene de parsear_plan; `inicio` es la fecha de la primera cuota alineada con plan.
+    La cuota k vence el mismo día del mes que la primera (o el último día si el mes es más corto).
+    """
+    inicio = pd.to_datetime(pd.Series(inicio).reset_index(drop=True), errors="coerce")
+    plan = plan.reset_index(drop=True)
+    n = plan["Num_cuotas"].fillna(0).to_numpy(dtype="float64")
+    monto = plan["Monto_cuota"].to_numpy(dtype="float64")
+    validos = (n > 0) & np.isfinite(monto) & (monto > 0) & inicio.notna().to_numpy()
+    n = np.where(validos, n, 0).astype("int64")
+
+    total = int(n.sum())
+    fila = np.repeat(np.arange(len(plan)), n)
+    # Secuencia 1..N dentro de cada socio: posición global menos el inicio del bloque del socio
+    inicio_bloque = np.cumsum(n) - n
+    secuencia = np.arange(total) - np.repeat(inicio_bloque, n) + 1
+
+    f0 = inicio.where(pd.Series(validos)).fillna(pd.Timestamp("1970-01-01"))
+    mes0 = (f0.dt.year * 12 + f0.dt.month - 1).to_numpy(dtype="int64")
+    dia0 = f0.dt.day.to_numpy(dtype="int64")
+    mes_abs = mes0[fila] + secuencia - 1
+    anio = mes_abs // 12
+    mes = mes_abs % 12 + 1
+    # Días del mes de cada vencimiento: diferencia entre el 1 del mes siguiente y el 1 del mes
+    primero = (mes_abs - (1970 * 12)).astype("datetime64[M]")
+    dias_mes = ((primero + 1).astype("datetime64[D]") - primero.astype("datetime64[D]")).astype("int64")
+    dia = np.minimum(dia0[fila], dias_mes)
+
+    return pd.DataFrame(
+        {
+            "Codigo_socio": plan["Codigo_socio"].to_numpy()[fila],
+            "Secuencia": secuencia.astype("int16"),
+            "Num_cuotas": n[fila].astype("int16"),
+            "ANIO_MES_KEY": (anio * 100 + mes).astype("int32"),
+            "FECHA_KEY": (anio * 10000 + mes * 100 + dia).astype("int32"),
+            "Monto_esperado": monto[fila].round(2),
+        }
+    )
+
+
+def recibido_por_socio_mes(det: pd.DataFrame, codigos: pd.Series) -> pd.DataFrame:
+    """Pagos Odoo por (socio, mes de aplicación)."""
+    key = pd.to_numeric(det["FECHA_PERIODO_KEY"], errors="coerce")
+    ok = codigos.notna() & key.notna()
+    rec = pd.DataFrame(
+        {
+            "Codigo_socio": codigos[ok].astype("int64").to_numpy(),
+            "ANIO_MES_KEY": (key[ok] // 100).astype("int32").to_numpy(),
+            "Monto_recibido": det.loc[ok, "MONTO"].to_numpy(dtype="float64"),
+        }
+    )
+    return rec.groupby(["Codigo_socio", "ANIO_MES_KEY"], as_index=False)["Monto_recibido"].sum()
+
+
+def esperado_vs_recibido(cuotas: pd.DataFrame, recibido: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(por socio y mes, por mes): esperado, recibido y diferencia."""
+    esp = cuotas.astype({"Codigo_socio": "int64"}).groupby(["Codigo_socio", "ANIO_MES_KEY"], as_index=False).agg(
+        Monto_esperado=("Monto_esperado", "sum"), Cuotas_esperadas=("Secuencia", "size")
+    )
+    # Solo socios con plan: lo recibido de socios sin plan no tiene contra qué compararse
+    rec = recibido[recibido["Codigo_socio"].isin(esp["Codigo_socio"].unique())]
+    socio_mes = esp.merge(rec, on=["Codigo_socio", "ANIO_MES_KEY"], how="outer")
+    socio_mes[["Monto_esperado", "Monto_recibido"]] = socio_mes[["Monto_esperado", "Monto_recibido"]].fillna(0.0)
+    socio_mes["Cuotas_esperadas"] = socio_mes["Cuotas_esperadas"].fillna(0).astype("int64")
+    socio_mes["Diferencia"] = (socio_mes["Monto_recibido"] - socio_mes["Monto_esperado"]).round(2)
+    socio_mes = socio_mes.sort_values(["ANIO_MES_KEY", "Codigo_socio"]).reset_index(drop=True)
+
+    por_mes = socio_mes.groupby("ANIO_MES_KEY", as_index=False).agg(
+        Monto_esperado=("Monto_esperado", "sum"),
+        Monto_recibido=("Monto_recibido", "sum"),
+        Cuotas_esperadas=("Cuotas_esperadas", "sum"),
+        Socios_con_cuota=("Cuotas_esperadas", lambda s: int((s > 0).sum())),
+        Socios_que_pagaron=("Monto_recibido", lambda s: int((s > 0).sum())),
+    )
+    por_mes["Diferencia"] = (por_mes["Monto_recibido"] - por_mes["Monto_esperado"]).round(2)
+    por_mes["Cumplimiento_pct"] = (100 * por_mes["Monto_recibido"] / por_mes["Monto_esperado"].replace(0, np.nan)).round(1)
+    por_mes[["Monto_esperado", "Monto_recibido"]] = por_mes[["Monto_esperado", "Monto_recibido"]].round(2)
+    return socio_mes, por_mes
+
+
+def cargar_plan() -> pd.DataFrame:
+    if not PLAN_FILE.exists():
+        raise SystemExit(f"No encuentro el plan de cuotas: {PLAN_FILE}")
+    plan = leer_intermedio(PLAN_FILE)
+    plan.columns = [str(c).strip() for c in plan.columns]
+    return plan
+
+
+def cuotas_esperadas(plan: pd.DataFrame, det: pd.DataFrame, master: pd.DataFrame) -> pd.DataFrame:
+    """Plan parseado + Primer_pago de Odoo → tabla expandida (socios sin primer pago quedan fuera)."""
+    parseado = parsear_plan(plan)
+    primer = primer_pago_por_socio(det, codigo_socio_por_nombre(det, master))
+    inicio = parseado["Codigo_socio"].map(primer)
+    return expandir_plan(parseado, inicio)
+
+
+def guardar_expandido(cuotas: pd.DataFrame, destino: Path = OUT_EXPANDIDO) -> Path:
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    if parquet_disponible():
+        path = destino.with_suffix(".parquet")
+        _para_parquet(cuotas).to_parquet(path, index=False)
+    else:
+        path = destino.with_suffix(".csv")
+        cuotas.to_csv(path, index=False, encoding="utf-8-sig")
+    return path
+
+
+def main() -> None:
+    from cruzar_odoo_mora_socios import cargar_membership
+    from preparar_odoo_comparativo import cargar_y_unir_archivos, depurar_detalle, preparar_detalle
+
+    plan = cargar_plan()
+    master = cargar_membership()
+    det = depurar_detalle(preparar_detalle(cargar_y_unir_archivos()))
+    codigos = codigo_socio_por_nombre(det, master)
+
+    cuotas = cuotas_esperadas(plan, det, master)
+    print(f"Plan expandido: {len(cuotas)} cuotas esperadas de {cuotas['Codigo_socio'].nunique()} socios")
+    print(f"  Guardado en: {guardar_expandido(cuotas)}")
+
+    socio_mes, por_mes = esperado_vs_recibido(cuotas, recibido_por_socio_mes(det, codigos))
+    OUT_ESPERADO.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(OUT_ESPERADO, engine="openpyxl") as writer:
+        por_mes.to_excel(writer, sheet_name="Por_mes", index=False)
+        socio_mes.to_excel(writer, sheet_name="Por_socio_mes", index=False)
+    print(f"Esperado vs recibido guardado en: {OUT_ESPERADO}")
+    print(por_mes.tail(6).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,38 +3,64 @@ from pathlib import Path
 
 import pandas as pd
 
+from agregados import agregar_multigrano, guardar_agregados
+from calendario import calendario_para, fecha_key
+from compactar_odoo import (
+    SALIDAS_SIN_RETENIDOS,
+    anios_retenidos,
+    huellas_compactadas,
+    leer_historial,
+    pagos_mensuales_retenidos,
+)
+from huellas import hash_archivo
+from indice_dedup import IndiceDedup, claves_dedup, primeras
+from intermedios import guardar_intermedio
+from muestra import ruta
+from odoo_rpc import cuotas_desde_almacen
+from sketches import hash_socios, sketches_por_grupo
+from particiones import escribir_particiones, resumen_particiones
+from segmentos import Segmentos
 
 BASE_DIR = Path(__file__).parent
 ODOO_DIR = BASE_DIR / "odoo"
 
-OUT_DETALLE = ODOO_DIR / "odoo_cuotas_unificado.xlsx"
-OUT_RESUMEN = ODOO_DIR / "odoo_resumen_socios.xlsx"
-OUT_PAGOS_MES = ODOO_DIR / "odoo_pagos_mensuales.xlsx"
-OUT_PAGOS_DIA = ODOO_DIR / "odoo_pagos_por_dia.xlsx"
+# Con --preview, las salidas van a preview/odoo/ (ver muestra.py)
+OUT_DETALLE = ruta(ODOO_DIR / "odoo_cuotas_unificado.xlsx")
+OUT_RESUMEN = ruta(ODOO_DIR / "odoo_resumen_socios.xlsx")
+OUT_PAGOS_MES = ruta(ODOO_DIR / "odoo_pagos_mensuales.xlsx")
+OUT_PAGOS_DIA = ruta(ODOO_DIR / "odoo_pagos_por_dia.xlsx")
+OUT_CALENDARIO = ruta(ODOO_DIR / "dim_calendario.xlsx")
+OUT_AGREGADOS = ruta(ODOO_DIR / "odoo_pagos_agregados.xlsx")
+OUT_PARTICIONES = ruta(ODOO_DIR / "particiones" / "cuotas_detalle")
 
 
 def cargar_y_unir_archivos() -> pd.DataFrame:
-    """Lee todos los archivos cuotas_*.xlsx de la carpeta odoo y los une en un solo DataFrame."""
+    """Lee todos los archivos cuotas_*.xlsx de la carpeta odoo y los une en un solo DataFrame.
+
+    Si odoo_rpc.py ya trajo las cuotas al almacén, se usan esas (un grupo por mes de registro),
+    salvo que algún cuotas_*.xlsx sea más nuevo que la última sincronización.
+    Los meses compactados por compactar_odoo.py se leen de su partición anual.
+    """
+    desde_odoo = cuotas_desde_almacen(sorted(ODOO_DIR.glob("cuotas_*.xlsx")))
+    if desde_odoo is not None:
+        print(f"  Cuotas Odoo desde el almacén (JSON-RPC): {desde_odoo['__archivo'].nunique()} meses")
+        return desde_odoo
+
     if not ODOO_DIR.exists():
         raise SystemExit(f"No existe la carpeta Odoo: {ODOO_DIR}")
 
-    paths = sorted(ODOO_DIR.glob("cuotas_*.xlsx"))
-    if not paths:
+    # Solo las columnas que usa preparar_detalle (ver FUENTES["odoo_cuotas"] en fuentes.py)
+    try:
+        unido = leer_historial()
+    except ValueError as e:
+        raise SystemExit(f"Faltan columnas en los archivos de Odoo: {e}")
+    if unido is None:
         raise SystemExit(f"No se encontraron archivos cuotas_*.xlsx en {ODOO_DIR}")
-
-    dfs: list[pd.DataFrame] = []
-    for path in paths:
-        df = pd.read_excel(path)
-        df.columns = [str(c).strip() for c in df.columns]
-        df["__archivo"] = path.name
-        dfs.append(df)
-
-    unido = pd.concat(dfs, ignore_index=True)
     return unido
 
 
 def preparar_detalle(df: pd.DataFrame) -> pd.DataFrame:
-    """Normaliza columnas clave y agrega información de periodo (año/mes)."""
+    """Normaliza columnas clave y agrega las claves de fecha (AAAAMMDD) de pago y periodo."""
     # Asegurar columnas esperadas
     esperadas = [
         "COMPROBANTE",
@@ -71,31 +97,18 @@ def preparar_detalle(df: pd.DataFrame) -> pd.DataFrame:
 
     fecha_periodo = fecha_apl.combine_first(fecha_comp)
     det["FECHA_PERIODO"] = fecha_periodo
-    det["ANIO_PERIODO"] = det["FECHA_PERIODO"].dt.year
-    det["MES_PERIODO"] = det["FECHA_PERIODO"].dt.month
-
     det["FECHA_PAGO"] = fecha_reg
-    det["ANIO_PAGO"] = det["FECHA_PAGO"].dt.year
-    det["MES_PAGO"] = det["FECHA_PAGO"].dt.month
-    det["DIA_PAGO"] = det["FECHA_PAGO"].dt.day
-    det["SEMANA_PAGO"] = (
-        det["FECHA_PAGO"].dt.isocalendar().year.astype("Int64").astype(str)
-        + "-W"
-        + det["FECHA_PAGO"].dt.isocalendar().week.astype("Int64").astype(str).str.zfill(2)
-    )
-
     # FECHA_BASE se mantiene para compatibilidad: usamos periodo si existe,
     # y como último recurso FECHA_PAGO.
     fecha_base = fecha_periodo.combine_first(fecha_reg)
     det["FECHA_BASE"] = fecha_base
-    det["ANIO"] = det["FECHA_BASE"].dt.year
-    det["MES"] = det["FECHA_BASE"].dt.month
-    det["DIA"] = det["FECHA_BASE"].dt.day
-    det["SEMANA"] = (
-        det["FECHA_BASE"].dt.isocalendar().year.astype("Int64").astype(str)
-        + "-W"
-        + det["FECHA_BASE"].dt.isocalendar().week.astype("Int64").astype(str).str.zfill(2)
-    )
+
+    # Año/mes/día/semana ya no se derivan por fila: cada fecha lleva su clave
+    # entera AAAAMMDD que se une a la dimensión calendario (calendario.py). Se asigna el arreglo
+    # Int64 (no .to_numpy(), que con una fecha faltante lo vuelve float64 y rompe la relación).
+    det["FECHA_PERIODO_KEY"] = fecha_key(fecha_periodo).array
+    det["FECHA_PAGO_KEY"] = fecha_key(fecha_reg).array
+    det["FECHA_BASE_KEY"] = fecha_key(fecha_base).array
 
     # Código de socio Odoo a partir del comprobante, ej. MEM/2025/7572 → 7572.
     cod_segment = (
@@ -116,11 +129,21 @@ def preparar_detalle(df: pd.DataFrame) -> pd.DataFrame:
     return det
 
 
-def depurar_detalle(det: pd.DataFrame) -> pd.DataFrame:
-    """Elimina duplicados exactos (mismo comprobante+monto+fecha+consumidor) para no inflar totales."""
+def depurar_detalle(det: pd.DataFrame, indice: IndiceDedup | None = None) -> pd.DataFrame:
+    """Elimina duplicados exactos (mismo comprobante+monto+fecha+consumidor) para no inflar totales.
+
+    La clave de cada fila es un hash uint64 (indice_dedup.py); con `indice`, solo se depuran las
+    partes (__archivo) nuevas o cambiadas contra el índice persistente de las anteriores. Un
+    archivo mensual con el mismo sha1 que la última vez reutiliza su máscara sin recalcular claves.
+    """
     antes = len(det)
-    clave = ["COMPROBANTE", "MONTO", "FECHA REGISTRO", "CONSUMIDOR"]
-    det = det.drop_duplicates(subset=clave, keep="first").copy()
+    if indice is not None:
+        compactadas = huellas_compactadas()
+        huellas = {a: hash_archivo(ODOO_DIR / a) or compactadas.get(a) for a in det["__archivo"].unique()}
+        conservar = indice.depurar(det, huellas={a: h for a, h in huellas.items() if h})
+    else:
+        conservar = primeras(claves_dedup(det))
+    det = det[conservar].copy()
     if antes > len(det):
         print(f"  Depuración: {antes - len(det)} filas duplicadas eliminadas (total {len(det)})")
     return det
@@ -128,28 +151,19 @@ def depurar_detalle(det: pd.DataFrame) -> pd.DataFrame:
 
 def preparar_resumen_por_socio(det: pd.DataFrame) -> pd.DataFrame:
     """Construye un resumen por CONSUMIDOR (socio en Odoo)."""
-    # Agrupación básica
-    grp = det.groupby("CONSUMIDOR", dropna=False)
-
-    res = grp.agg(
-        Monto_pagado_total=("MONTO", "sum"),
-        Numero_pagos=("MONTO", "size"),
-        Primer_pago=("FECHA_BASE", "min"),
-        Ultimo_pago=("FECHA_BASE", "max"),
-    )
-
-    # Tomar el ESTADO SOCIO del último pago registrado para cada consumidor
-    # Ordenamos por FECHA_BASE y nos quedamos con la última fila por CONSUMIDOR
-    ult = (
-        det.sort_values(["CONSUMIDOR", "FECHA_BASE"])
-        .groupby("CONSUMIDOR", dropna=False)
-        .tail(1)
-        .set_index("CONSUMIDOR")
+    # Un solo ordenamiento por (CONSUMIDOR, FECHA_BASE); cada columna es una reducción por segmento.
+    # El último estado/tipo/comprobante es el de la última fila por FECHA_BASE.
+    seg = Segmentos(det["CONSUMIDOR"], orden=det["FECHA_BASE"])
+    res = seg.tabla(
+        "CONSUMIDOR",
+        Monto_pagado_total=seg.suma(det["MONTO"]),
+        Numero_pagos=seg.contar(),
+        Primer_pago=seg.minimo(det["FECHA_BASE"]),
+        Ultimo_pago=seg.maximo(det["FECHA_BASE"]),
+        Estado_socio_odoo_ultimo=seg.ultimo(det["ESTADO SOCIO"]),
+        Tipo_pago_ultimo=seg.ultimo(det["TIPO PAGO"]),
+        Estado_comprobante_ultimo=seg.ultimo(det["ESTADO"]),
     )
-
-    res["Estado_socio_odoo_ultimo"] = ult["ESTADO SOCIO"]
-    res["Tipo_pago_ultimo"] = ult["TIPO PAGO"]
-    res["Estado_comprobante_ultimo"] = ult["ESTADO"]
     res["Anio_ultimo_pago"] = res["Ultimo_pago"].dt.year
     res["Mes_ultimo_pago"] = res["Ultimo_pago"].dt.month
 
@@ -158,6 +172,42 @@ def preparar_resumen_por_socio(det: pd.DataFrame) -> pd.DataFrame:
     return res
 
 
+def preparar_pagos_mensuales(det: pd.DataFrame) -> pd.DataFrame:
+    """Monto, pagos y socios únicos (con su sketch) por año/mes del archivo de origen."""
+    det_archivo = det.dropna(subset=["ANIO_ARCHIVO", "MES_ARCHIVO"])
+    pagos_mes = (
+        det_archivo.groupby(["ANIO_ARCHIVO", "MES_ARCHIVO"], dropna=True)
+        .agg(
+            Monto_pagado_mes=("MONTO", "sum"),
+            Numero_pagos_mes=("MONTO", "size"),
+        )
+        .reset_index()
+    )
+    # Socios únicos con sketch fusionable: un mes nuevo se suma sin recontar la historia
+    periodo_archivo = (det_archivo["ANIO_ARCHIVO"] * 100 + det_archivo["MES_ARCHIVO"]).astype("int64").to_numpy()
+    sk_mes = sketches_por_grupo(periodo_archivo, hash_socios(det_archivo["CONSUMIDOR"]))
+    periodos = (pagos_mes["ANIO_ARCHIVO"] * 100 + pagos_mes["MES_ARCHIVO"]).astype("int64")
+    pagos_mes["Socios_unicos_mes"] = [sk_mes[int(p)].estimar() for p in periodos]
+    pagos_mes["Sketch_socios"] = [sk_mes[int(p)].serializar() for p in periodos]
+    pagos_mes = pagos_mes.rename(columns={"ANIO_ARCHIVO": "ANIO", "MES_ARCHIVO": "MES"})
+    return pagos_mes
+
+
+def preparar_pagos_por_dia(agg_dia: pd.DataFrame) -> pd.DataFrame:
+    """Grano diario de los agregados con los nombres de columna de odoo_pagos_por_dia."""
+    pagos_dia = agg_dia.rename(
+        columns={
+            "Monto_pagado": "Monto_pagado_dia",
+            "Numero_pagos": "Numero_pagos_dia",
+            "Socios_unicos": "Socios_unicos_dia",
+            "FECHA_STR": "fecha_str",
+        }
+    )
+    pagos_dia.insert(1, "fecha", pd.to_datetime(pagos_dia["fecha_str"]).dt.date)
+    pagos_dia = pagos_dia.drop(columns=["ANIO_MES"])
+    return pagos_dia
+
+
 def main() -> None:
     print(f"Leyendo archivos de Odoo en: {ODOO_DIR}")
     df = cargar_y_unir_archivos()
@@ -165,7 +215,11 @@ def main() -> None:
 
     det = preparar_detalle(df)
     print(f"Filas en detalle: {len(det)}")
-    det = depurar_detalle(det)
+    # La máscara depende también de la normalización de preparar_detalle (este archivo)
+    indice = IndiceDedup("odoo_detalle", codigo=[Path(__file__)])
+    det = depurar_detalle(det, indice)
+    u = indice.ultima
+    print(f"  Índice de depuración: {u['reutilizadas']} de {u['partes']} partes sin cambios, {u['filas_nuevas']} filas depuradas")
     # Conteos para análisis
     sin_fecha_pago = det["FECHA_PAGO"].isna().sum()
     sin_periodo = det["FECHA_PERIODO"].isna().sum()
@@ -173,53 +227,47 @@ def main() -> None:
         print(f"  Filas sin FECHA_PAGO: {sin_fecha_pago}, sin FECHA_PERIODO: {sin_periodo}")
 
     # Guardar detalle completo (todas las cuotas Odoo unificadas) — solo outputs, no originales
-    OUT_DETALLE.parent.mkdir(parents=True, exist_ok=True)
-    det.to_excel(OUT_DETALLE, index=False)
+    # Excel + Arrow IPC (los lectores posteriores abren el .arrow, ver intermedios.py)
+    guardar_intermedio(det, OUT_DETALLE)
     print(f"Detalle unificado guardado en: {OUT_DETALLE}")
+    # Mismo detalle particionado por mes de pago (Parquet/CSV); solo se reescriben meses que cambiaron
+    res = escribir_particiones(det, OUT_PARTICIONES, det["FECHA_PAGO_KEY"], nombres=("ANIO_PAGO", "MES_PAGO"))
+    print(resumen_particiones(OUT_PARTICIONES, res))
 
     # Guardar resumen por socio (CONSUMIDOR)
     resumen = preparar_resumen_por_socio(det)
-    resumen.to_excel(OUT_RESUMEN, index=True)
+    guardar_intermedio(resumen, OUT_RESUMEN, index=True)
     print(f"Resumen por socio guardado en: {OUT_RESUMEN}")
 
     # Resumen mensual por periodo del archivo (cada archivo = un mes: cuotas_YYYY_MM)
     # Así 2026-01 aparece si existe cuotas_2026_01.xlsx, con la suma de pagos de ese archivo
-    pagos_mes = (
-        det.dropna(subset=["ANIO_ARCHIVO", "MES_ARCHIVO"])
-        .groupby(["ANIO_ARCHIVO", "MES_ARCHIVO"], dropna=True)
-        .agg(
-            Monto_pagado_mes=("MONTO", "sum"),
-            Numero_pagos_mes=("MONTO", "size"),
-            Socios_unicos_mes=("CONSUMIDOR", "nunique"),
+    pagos_mes = preparar_pagos_mensuales(det)
+    retenidos = pagos_mensuales_retenidos()
+    if retenidos is not None:
+        print(
+            f"  AVISO: los años {', '.join(anios_retenidos())} están retenidos (solo agregados mensuales, ver "
+            f"compactar_odoo.py); se suman a {OUT_PAGOS_MES.name} pero NO están en: {'; '.join(SALIDAS_SIN_RETENIDOS)}"
         )
-        .reset_index()
-    )
-    pagos_mes = pagos_mes.rename(columns={"ANIO_ARCHIVO": "ANIO", "MES_ARCHIVO": "MES"})
+        # Años que compactar_odoo.py redujo a agregados: sus meses vienen ya resumidos
+        ya = set(zip(pagos_mes["ANIO"].astype("int64"), pagos_mes["MES"].astype("int64")))
+        nuevos = [(a, m) not in ya for a, m in zip(retenidos["ANIO"].astype("int64"), retenidos["MES"].astype("int64"))]
+        retenidos = retenidos[nuevos]
+        pagos_mes = pd.concat([retenidos, pagos_mes], ignore_index=True)
     pagos_mes.to_excel(OUT_PAGOS_MES, index=False)
     print(f"Resumen mensual de pagos guardado en: {OUT_PAGOS_MES}")
 
-    # Resumen por día de pagos (caja) usando FECHA_PAGO
-    det_con_fecha = det.dropna(subset=["FECHA_PAGO"])
-    pagos_dia = (
-        det_con_fecha.groupby(det_con_fecha["FECHA_PAGO"].dt.normalize(), dropna=True)
-        .agg(
-            Monto_pagado_dia=("MONTO", "sum"),
-            Numero_pagos_dia=("MONTO", "size"),
-            Socios_unicos_dia=("CONSUMIDOR", "nunique"),
-        )
-        .reset_index()
-        .rename(columns={"FECHA_PAGO": "fecha"})
-    )
-    pagos_dia["fecha"] = pd.to_datetime(pagos_dia["fecha"]).dt.date
-    pagos_dia["ANIO"] = pd.to_datetime(pagos_dia["fecha"]).dt.year
-    pagos_dia["MES"] = pd.to_datetime(pagos_dia["fecha"]).dt.month
-    pagos_dia["DIA"] = pd.to_datetime(pagos_dia["fecha"]).dt.day
-    pagos_dia["SEMANA"] = (
-        pd.to_datetime(pagos_dia["fecha"]).dt.isocalendar().year.astype("Int64").astype(str)
-        + "-W"
-        + pd.to_datetime(pagos_dia["fecha"]).dt.isocalendar().week.astype("Int64").astype(str).str.zfill(2)
-    )
-    pagos_dia["fecha_str"] = pagos_dia["fecha"].astype(str)
+    # Dimensión calendario única para toda la ejecución (cubre el rango de los datos)
+    cal = calendario_para(det["FECHA_PAGO"], det["FECHA_PERIODO"])
+    cal.to_excel(OUT_CALENDARIO, index=False)
+    print(f"Dimensión calendario guardada en: {OUT_CALENDARIO} ({len(cal)} días)")
+
+    # Agregados día / semana ISO / mes / año en una sola pasada (socios únicos sin doble conteo)
+    agregados = agregar_multigrano(det, cal, col_fecha_key="FECHA_PAGO_KEY")
+    guardar_agregados(agregados, OUT_AGREGADOS)
+    print(f"Agregados multigrano de pagos guardados en: {OUT_AGREGADOS}")
+
+    # Resumen por día de pagos (caja): grano diario de los agregados, con los nombres de siempre
+    pagos_dia = preparar_pagos_por_dia(agregados["Dia"])
     pagos_dia.to_excel(OUT_PAGOS_DIA, index=False)
     print(f"Resumen por día de pagos guardado en: {OUT_PAGOS_DIA}")
 
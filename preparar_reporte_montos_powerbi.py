@@ -13,6 +13,8 @@ Salida:
 - `sep/Reporte_Montos_PowerBI_socios.xlsx`
   con columnas limpias: Codigo_socio, Monto_total, Ultima_fecha_liquidacion,
   texto_cuotas, num_cuotas, monto_cuota, monto_calculado.
+
+Con --preview solo procesa los socios de la muestra y escribe en preview/ (ver muestra.py).
 """
 
 from pathlib import Path
@@ -20,9 +22,12 @@ import re
 
 import pandas as pd
 
+from intermedios import guardar_intermedio
+from muestra import EN_PREVIEW, filtrar, informar, ruta
+
 BASE_DIR = Path(__file__).parent
 IN_FILE = BASE_DIR / "sep" / "Reporte_Montos-act_cuotas_completas.xlsx"
-OUT_FILE = BASE_DIR / "sep" / "Reporte_Montos_PowerBI_socios.xlsx"
+OUT_FILE = ruta(BASE_DIR / "sep" / "Reporte_Montos_PowerBI_socios.xlsx")
 
 
 def parse_cuotas(texto: str):
@@ -79,6 +84,7 @@ def main():
         out["texto_cuotas"] = df[col_cuotas].astype(str).where(df[col_cuotas].notna(), "")
     else:
         out["texto_cuotas"] = ""
+    out = filtrar(out, "Codigo_socio")
 
     # Parsear cuotas
     nums = []
@@ -92,11 +98,12 @@ def main():
     out["monto_calculado"] = out["num_cuotas"].fillna(0) * out["monto_cuota"].fillna(0.0)
 
     # Guardar
-    OUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    out.to_excel(OUT_FILE, index=False)
+    guardar_intermedio(out, OUT_FILE)
     print(f"Archivo preparado para Power BI: {OUT_FILE}")
     print("Columnas:", out.columns.tolist())
     print("Filas:", len(out))
+    if EN_PREVIEW:
+        informar("reporte_montos", out, "Codigo_socio", ["Monto_total", "monto_calculado"])
 
 
 if __name__ == "__main__":
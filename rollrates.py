@@ -0,0 +1,232 @@
+"""
+Matrices de roll-rate: cómo se mueven las cuotas entre rangos de mora y estados de un corte a otro.
+
+Cada vez que llega una versión nueva de BasesDeDatos-CUOTAS se guarda una foto compacta
+(snapshot) con una fila por cuota: clave hash de 64 bits (socio + año + mes + descripción),
+estado, monto y día de vencimiento. Entre dos fotos consecutivas se hace un merge por esa
+clave (join vectorizado, sin recorrer filas) y cada cuota queda con su "situación" antes y
+después: el rango de días si está PEN (según aging.BORDES a la fecha de la foto) o el estado
+(PGD, APL, CON, DEV, MI). Las cuotas que aparecen o desaparecen se marcan "Nueva"/"Baja".
+
+Las transiciones ya calculadas se guardan agregadas en historico/cuotas/_transiciones.csv;
+al registrar una foto nueva solo se procesa el último par (no se recalcula la historia).
+
+Entradas:
+- BasesDeDatos-CUOTAS.xlsx (hoja BD CuotasPendientes)
+- historico/cuotas/cuotas_AAAAMMDD.(parquet|csv)  (fotos registradas)
+
+Salida:
+- sep/RollRates_cuotas.xlsx  (Transiciones, Matriz_cuotas, Matriz_monto, Tasas_roll)
+
+Ejecutar:
+    python rollrates.py                       # registra la foto actual y actualiza las matrices
+    python rollrates.py --fecha 2026-01-31    # fecha de la foto (por defecto: modificación del archivo)
+    python rollrates.py --archivo otra_version.xlsx --fecha 2025-12-31
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aging import BORDES, a_dias, etiquetas_rangos
+from particiones import _para_parquet, parquet_disponible
+
+BASE_DIR = Path(__file__).parent
+
+ARCHIVO_CUOTAS = BASE_DIR / "BasesDeDatos-CUOTAS.xlsx"
+HOJA_CUOTAS = "BD CuotasPendientes"
+SNAP_DIR = BASE_DIR / "historico" / "cuotas"
+TRANSICIONES = SNAP_DIR / "_transiciones.csv"
+OUT_ROLL = BASE_DIR / "sep" / "RollRates_cuotas.xlsx"
+
+ESTADOS = ["PEN", "PGD", "APL", "CON", "DEV", "MI"]
+NUEVA, BAJA = "Nueva", "Baja"
+
+
+def claves_cuota(df: pd.DataFrame) -> np.ndarray:
+    """Clave uint64 por cuota: hash de (socio, anio, mes, descripcion) + n° de repetición."""
+    cols = [c for c in ["socio_id", "anio", "mes", "descripcion"] if c in df.columns]
+    # Normalizar antes de pasar a texto: una celda vacía hace que read_excel lea la columna como
+    # float ("2025.0") y cambiaría la clave de todas las filas, no solo la de esa
+    base = pd.DataFrame(
+        {
+            c: (pd.to_numeric(df[c], errors="coerce").astype("Int64") if c != "descripcion" else df[c]).astype(str).str.strip().fillna("")
+            for c in cols
+        }
+    )
+    # Si el mismo socio tiene dos cuotas iguales en el mismo mes, se distinguen por orden de aparición
+    base["_rep"] = base.groupby(cols, sort=False, dropna=False).cumcount().astype(str)
+    return pd.util.hash_pandas_object(base, index=False).to_numpy(dtype="uint64")
+
+
+def foto_desde_excel(archivo: Path = ARCHIVO_CUOTAS) -> pd.DataFrame:
+    """Lee la hoja de cuotas y la reduce a la foto compacta (CUOTA_KEY, SOCIO, ESTADO, MONTO, VENC_DIA)."""
+    # Solo las columnas de la foto; claves_cuota normaliza los tipos por su cuenta
+    usadas = {"socio_id", "anio", "mes", "descripcion", "estado", "monto", "fecha_liquidacion"}
+    df = pd.read_excel(archivo, sheet_name=HOJA_CUOTAS, usecols=lambda c: str(c).strip() in usadas)
+    fecha = pd.to_datetime(df["fecha_liquidacion"], errors="coerce")
+    if fecha.isna().any() and {"anio", "mes"} <= set(df.columns):
+        fecha = fecha.fillna(pd.to_datetime(pd.DataFrame({"year": df["anio"], "month": df["mes"], "day": 1}), errors="coerce"))
+    dias = a_dias(fecha)
+    return pd.DataFrame(
+        {
+            "CUOTA_KEY": claves_cuota(df),
+            "SOCIO": pd.to_numeric(df["socio_id"], errors="coerce").fillna(-1).astype("int64"),
+            "ESTADO": df["estado"].astype(str).str.strip().str.upper(),
+            "MONTO": pd.to_numeric(df["monto"], errors="coerce").fillna(0.0).round(2),
+            "VENC_DIA": np.where(dias == np.iinfo("int64").min, -1, dias).astype("int32"),
+        }
+    )
+
+
+def _ruta_foto(fecha: pd.Timestamp, formato: str) -> Path:
+    return SNAP_DIR / f"cuotas_{fecha:%Y%m%d}.{formato}"
+
+
+def guardar_foto(foto: pd.DataFrame, fecha) -> Path:
+    fecha = pd.Timestamp(fecha).normalize()
+    SNAP_DIR.mkdir(parents=True, exist_ok=True)
+    if parquet_disponible():
+        destino = _ruta_foto(fecha, "parquet")
+        _para_parquet(foto).to_parquet(destino, index=False)
+    else:
+        destino = _ruta_foto(fecha, "csv")
+        foto.to_csv(destino, index=False)
+    return destino
+
+
+def listar_fotos() -> list[tuple[pd.Timestamp, Path]]:
+    """Fotos registradas ordenadas por fecha (si hay parquet y csv de la misma fecha, gana parquet)."""
+    fotos: dict[pd.Timestamp, Path] = {}
+    for p in sorted(SNAP_DIR.glob("cuotas_*.*")):
+        if p.suffix not in (".parquet", ".csv"):
+            continue
+        fecha = pd.to_datetime(p.stem.split("_")[-1], format="%Y%m%d", errors="coerce")
+        if pd.notna(fecha) and (fecha not in fotos or p.suffix == ".parquet"):
+            fotos[fecha] = p
+    return sorted(fotos.items())
+
+
+def leer_foto(path: Path) -> pd.DataFrame:
+    foto = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+    foto["CUOTA_KEY"] = foto["CUOTA_KEY"].astype("uint64")
+    foto["ESTADO"] = foto["ESTADO"].astype(str)
+    return foto
+
+
+def situacion(foto: pd.DataFrame, fecha, bordes=BORDES) -> np.ndarray:
+    """Rango de días de mora (si la cuota está PEN y vencida) o el estado de la cuota."""
+    corte = a_dias([pd.Timestamp(fecha)])[0]
+    etiquetas = np.array(etiquetas_rangos(bordes) + ["PEN por vencer"], dtype=object)
+    dias_mora = corte - foto["VENC_DIA"].to_numpy(dtype="int64")
+    idx = np.searchsorted(np.asarray(bordes), dias_mora, side="right") - 1
+    idx = np.where(dias_mora < 0, len(etiquetas) - 1, idx)
+    es_pen = foto["ESTADO"].to_numpy() == "PEN"
+    return np.where(es_pen, etiquetas[idx], foto["ESTADO"].to_numpy(dtype=object))
+
+
+def diferencia(previa: pd.DataFrame, nueva: pd.DataFrame, f_previa, f_nueva, bordes=BORDES) -> pd.DataFrame:
+    """Transición por cuota entre dos fotos (merge por CUOTA_KEY)."""
+    a = previa[["CUOTA_KEY", "SOCIO", "MONTO"]].assign(Desde=situacion(previa, f_previa, bordes))
+    b = nueva[["CUOTA_KEY", "SOCIO", "MONTO"]].assign(Hacia=situacion(nueva, f_nueva, bordes))
+    t = a.merge(b, on="CUOTA_KEY", how="outer", suffixes=("_previo", "_nuevo"))
+    t["Desde"] = t["Desde"].fillna(NUEVA)
+    t["Hacia"] = t["Hacia"].fillna(BAJA)
+    t["SOCIO"] = t["SOCIO_previo"].fillna(t["SOCIO_nuevo"]).astype("int64")
+    # Monto de referencia: el de la foto previa (el saldo que "rueda"); para nuevas, el actual
+    t["MONTO"] = t["MONTO_previo"].fillna(t["MONTO_nuevo"]).fillna(0.0)
+    return t[["CUOTA_KEY", "SOCIO", "Desde", "Hacia", "MONTO"]]
+
+
+def agregar_transiciones(t: pd.DataFrame, f_previa, f_nueva) -> pd.DataFrame:
+    """Cuotas, monto y socios distintos por par (Desde, Hacia)."""
+    g = t.groupby(["Desde", "Hacia"], sort=False)
+    out = g.agg(Cuotas=("CUOTA_KEY", "size"), Monto=("MONTO", "sum"), Socios=("SOCIO", "nunique")).reset_index()
+    out.insert(0, "Fecha_hasta", pd.Timestamp(f_nueva).normalize())
+    out.insert(0, "Fecha_desde", pd.Timestamp(f_previa).normalize())
+    out["Monto"] = out["Monto"].round(2)
+    return out
+
+
+def _orden_situaciones(bordes=BORDES) -> list[str]:
+    return [NUEVA, "PEN por vencer"] + etiquetas_rangos(bordes) + [e for e in ESTADOS if e != "PEN"] + [BAJA]
+
+
+def matriz(trans: pd.DataFrame, valor: str = "Cuotas", bordes=BORDES) -> pd.DataFrame:
+    """Matriz Desde × Hacia (suma de `valor` sobre todas las fechas de `trans`)."""
+    m = trans.pivot_table(index="Desde", columns="Hacia", values=valor, aggfunc="sum", fill_value=0)
+    orden = _orden_situaciones(bordes)
+    filas = [s for s in orden if s in m.index] + [s for s in m.index if s not in orden]
+    cols = [s for s in orden if s in m.columns] + [s for s in m.columns if s not in orden]
+    return m.loc[filas, cols]
+
+
+def tasas_roll(m: pd.DataFrame) -> pd.DataFrame:
+    """Matriz normalizada por fila (proporción de cada situación de origen que pasa a cada destino)."""
+    tot = m.sum(axis=1).replace(0, np.nan)
+    return m.div(tot, axis=0).round(4).fillna(0.0)
+
+
+def cargar_transiciones() -> pd.DataFrame:
+    if not TRANSICIONES.exists():
+        return pd.DataFrame(columns=["Fecha_desde", "Fecha_hasta", "Desde", "Hacia", "Cuotas", "Monto", "Socios"])
+    return pd.read_csv(TRANSICIONES, parse_dates=["Fecha_desde", "Fecha_hasta"])
+
+
+def actualizar_transiciones(bordes=BORDES) -> pd.DataFrame:
+    """Procesa solo los pares de fotos consecutivas que aún no están en _transiciones.csv."""
+    hist = cargar_transiciones()
+    hechos = set(zip(pd.to_datetime(hist["Fecha_desde"]), pd.to_datetime(hist["Fecha_hasta"])))
+    fotos = listar_fotos()
+    nuevas = []
+    for (f_prev, p_prev), (f_new, p_new) in zip(fotos[:-1], fotos[1:]):
+        if (f_prev, f_new) in hechos:
+            continue
+        t = diferencia(leer_foto(p_prev), leer_foto(p_new), f_prev, f_new, bordes)
+        nuevas.append(agregar_transiciones(t, f_prev, f_new))
+        print(f"  Transiciones {f_prev:%Y-%m-%d} → {f_new:%Y-%m-%d}: {len(t)} cuotas comparadas")
+    if nuevas:
+        # Un par ya procesado cuyas fotos vecinas cambiaron (foto intermedia insertada) se descarta
+        pares_validos = {(a, b) for (a, _), (b, _) in zip(fotos[:-1], fotos[1:])}
+        hist = hist[[(a, b) in pares_validos for a, b in zip(hist["Fecha_desde"], hist["Fecha_hasta"])]]
+        hist = pd.concat([hist] + nuevas, ignore_index=True).sort_values(["Fecha_hasta", "Desde", "Hacia"])
+        TRANSICIONES.parent.mkdir(parents=True, exist_ok=True)
+        hist.to_csv(TRANSICIONES, index=False, date_format="%Y-%m-%d")
+    return hist
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Registra una foto de cuotas y actualiza las matrices de roll-rate")
+    parser.add_argument("--archivo", type=Path, default=ARCHIVO_CUOTAS)
+    parser.add_argument("--fecha", help="Fecha de la foto AAAA-MM-DD (por defecto: fecha de modificación del archivo)")
+    parser.add_argument("--sin-registrar", action="store_true", help="Solo recalcula matrices con las fotos existentes")
+    args = parser.parse_args(argv)
+
+    if not args.sin_registrar:
+        if not args.archivo.exists():
+            raise SystemExit(f"No encuentro el archivo de cuotas: {args.archivo}")
+        fecha = pd.Timestamp(args.fecha) if args.fecha else pd.Timestamp(args.archivo.stat().st_mtime, unit="s")
+        destino = guardar_foto(foto_desde_excel(args.archivo), fecha)
+        print(f"Foto registrada: {destino}")
+
+    trans = actualizar_transiciones()
+    if trans.empty:
+        print("Hace falta al menos dos fotos para calcular roll-rates.")
+        return
+
+    ultimo = trans[trans["Fecha_hasta"] == trans["Fecha_hasta"].max()]
+    m_cuotas = matriz(ultimo, "Cuotas")
+    OUT_ROLL.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(OUT_ROLL, engine="openpyxl") as writer:
+        trans.to_excel(writer, sheet_name="Transiciones", index=False)
+        m_cuotas.to_excel(writer, sheet_name="Matriz_cuotas")
+        matriz(ultimo, "Monto").to_excel(writer, sheet_name="Matriz_monto")
+        tasas_roll(m_cuotas).to_excel(writer, sheet_name="Tasas_roll")
+    print(f"Roll-rates guardados en: {OUT_ROLL}")
+    print(tasas_roll(m_cuotas).to_string())
+
+
+if __name__ == "__main__":
+    main()
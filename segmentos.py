@@ -0,0 +1,106 @@
+"""
+Reducciones por socio (o cualquier clave) con un solo ordenamiento.
+
+En lugar de un groupby por cada estadística, la tabla de hechos se ordena una vez por
+(clave, orden opcional) y cada estadística es una pasada lineal con `ufunc.reduceat` sobre
+los límites de segmento: suma, conteo (con máscara), mínimo/máximo y el último valor según
+el orden (p. ej. el estado del último pago por fecha).
+
+Uso:
+    seg = Segmentos(det["CONSUMIDOR"], orden=det["FECHA_BASE"])
+    res = seg.tabla(
+        Monto=seg.suma(det["MONTO"]),
+        Pagos=seg.contar(),
+        Primero=seg.minimo(det["FECHA_BASE"]),
+        Estado=seg.ultimo(det["ESTADO SOCIO"]),
+    )
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class Segmentos:
+    """Índice de segmentos de una tabla ordenada por clave.
+
+    Las filas con clave nula quedan fuera. Con `orden`, dentro de cada clave las filas se
+    ordenan por ese valor (nulos al final, como sort_values) y `ultimo`/`primero` lo respetan.
+    """
+
+    def __init__(self, claves, orden=None):
+        claves = pd.Series(claves).reset_index(drop=True)
+        codigos, self.claves = pd.factorize(claves, sort=True)
+        self.n_filas = len(claves)
+        if orden is None:
+            idx = np.argsort(codigos, kind="stable")
+        else:
+            o = pd.Series(orden).reset_index(drop=True)
+            if pd.api.types.is_datetime64_any_dtype(o):
+                o = o.astype("datetime64[ns]")
+            # Nulos al final dentro de cada clave (mismo criterio que sort_values)
+            nulo = o.isna().to_numpy()
+            rango = pd.factorize(o, sort=True)[0]
+            idx = np.lexsort((rango, nulo, codigos))
+        self.orden = idx[codigos[idx] >= 0]
+        cod = codigos[self.orden]
+        cortes = np.flatnonzero(cod[1:] != cod[:-1]) + 1
+        self.inicios = np.r_[0, cortes].astype("int64") if len(cod) else np.array([], dtype="int64")
+        self.finales = np.r_[cortes, len(cod)].astype("int64") if len(cod) else np.array([], dtype="int64")
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    def _ordenar(self, valores) -> np.ndarray:
+        v = valores.to_numpy() if isinstance(valores, pd.Series) else np.asarray(valores)
+        if len(v) != self.n_filas:
+            raise ValueError(f"Se esperaban {self.n_filas} valores, llegaron {len(v)}")
+        return v[self.orden]
+
+    def _reducir(self, ufunc, v: np.ndarray) -> np.ndarray:
+        if len(self.inicios) == 0:
+            return v[:0]
+        return ufunc.reduceat(v, self.inicios)
+
+    def suma(self, valores) -> np.ndarray:
+        v = pd.to_numeric(pd.Series(self._ordenar(valores)), errors="coerce").fillna(0.0).to_numpy(dtype="float64")
+        return self._reducir(np.add, v)
+
+    def contar(self, mascara=None) -> np.ndarray:
+        """Filas por segmento (o solo las que cumplen `mascara`)."""
+        if mascara is None:
+            return (self.finales - self.inicios).astype("int64")
+        return self._reducir(np.add, self._ordenar(mascara).astype("int64"))
+
+    def algun(self, mascara) -> np.ndarray:
+        return self.contar(mascara) > 0
+
+    def _extremo(self, valores, ufunc, relleno_nat) -> np.ndarray:
+        v = self._ordenar(valores)
+        if np.issubdtype(v.dtype, np.datetime64):
+            i = v.astype("datetime64[ns]").astype("int64")
+            nat = np.isnat(v)
+            i = np.where(nat, relleno_nat, i)
+            r = self._reducir(ufunc, i)
+            r = np.where(r == relleno_nat, np.iinfo("int64").min, r)
+            return r.astype("datetime64[ns]").astype(v.dtype)
+        v = pd.to_numeric(pd.Series(v), errors="coerce").to_numpy(dtype="float64")
+        # fmin/fmax ignoran NaN salvo que todo el segmento sea NaN
+        return self._reducir(np.fmax if ufunc is np.maximum else np.fmin, v)
+
+    def minimo(self, valores) -> np.ndarray:
+        return self._extremo(valores, np.minimum, np.iinfo("int64").max)
+
+    def maximo(self, valores) -> np.ndarray:
+        return self._extremo(valores, np.maximum, np.iinfo("int64").min)
+
+    def ultimo(self, valores) -> np.ndarray:
+        """Valor de la última fila de cada segmento según `orden`."""
+        return self._ordenar(valores)[self.finales - 1] if len(self.finales) else np.array([])
+
+    def primero(self, valores) -> np.ndarray:
+        return self._ordenar(valores)[self.inicios] if len(self.inicios) else np.array([])
+
+    def tabla(self, nombre_indice: str | None = None, **columnas) -> pd.DataFrame:
+        """DataFrame indexado por clave con las columnas calculadas."""
+        idx = pd.Index(self.claves, name=nombre_indice)
+        return pd.DataFrame(columnas, index=idx)
@@ -0,0 +1,149 @@
+"""
+Conteo de socios distintos fusionable (para agregados incrementales y roll-ups).
+
+Cada agregado guarda un `ConteoDistinto` serializado en la columna `Sketch_socios`:
+
+- Modo exacto: conjunto ordenado de hashes de 64 bits de los socios (mientras haya
+  hasta UMBRAL_EXACTO socios). La fusión es una unión de conjuntos y el conteo es exacto
+  (salvo colisiones de hash de 64 bits, despreciables a esta escala).
+- Modo aproximado: HyperLogLog con 2**P registros (P=12 → 4096 registros de 1 byte).
+  Se pasa a este modo automáticamente al superar el umbral. Error estándar relativo
+  ≈ 1.04 / sqrt(2**P) = 1.6 %; en ~95 % de los casos el error es menor a ±3.3 %
+  y en ~99 % menor a ±4.9 %. Con corrección de rango pequeño (linear counting).
+
+Fusionar sketches permite sumar un mes nuevo a los agregados existentes o subir de
+día → semana → mes sin volver a leer los pagos crudos.
+"""
+
+import base64
+import zlib
+
+import numpy as np
+import pandas as pd
+
+P = 12
+M = 1 << P
+UMBRAL_EXACTO = 1024
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def hash_socios(valores) -> np.ndarray:
+    """Hash estable de 64 bits por socio (códigos o nombres)."""
+    arr = pd.Series(valores).dropna().astype(str).to_numpy(dtype=object)
+    return pd.util.hash_array(arr).astype("uint64")
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Número de bits significativos de cada uint64 (vectorizado, sin pasar por float)."""
+    x = x.astype("uint64").copy()
+    n = np.zeros(x.shape, dtype="int64")
+    for s in (32, 16, 8, 4, 2, 1):
+        m = x >= np.uint64(1 << s)
+        n += m * s
+        x = np.where(m, x >> np.uint64(s), x)
+    return n + (x > 0)
+
+
+def _registros_hll(hashes: np.ndarray) -> np.ndarray:
+    regs = np.zeros(M, dtype="uint8")
+    if len(hashes) == 0:
+        return regs
+    h = hashes.astype("uint64")
+    idx = (h >> np.uint64(64 - P)).astype("int64")
+    resto = (h << np.uint64(P)) & _MASK64
+    rho = np.where(resto == 0, 64 - P + 1, 64 - _bit_length(resto) + 1).astype("uint8")
+    np.maximum.at(regs, idx, rho)
+    return regs
+
+
+class ConteoDistinto:
+    """Conjunto exacto de hashes por debajo del umbral; HyperLogLog por encima."""
+
+    __slots__ = ("exacto", "registros", "umbral")
+
+    def __init__(self, exacto: np.ndarray | None = None, registros: np.ndarray | None = None, umbral: int = UMBRAL_EXACTO):
+        self.umbral = umbral
+        self.exacto = None if registros is not None else np.unique(np.asarray(exacto if exacto is not None else [], dtype="uint64"))
+        self.registros = registros
+        if self.exacto is not None and len(self.exacto) > umbral:
+            self.registros = _registros_hll(self.exacto)
+            self.exacto = None
+
+    @classmethod
+    def desde_hashes(cls, hashes: np.ndarray, umbral: int = UMBRAL_EXACTO) -> "ConteoDistinto":
+        return cls(exacto=hashes, umbral=umbral)
+
+    @classmethod
+    def desde_socios(cls, valores, umbral: int = UMBRAL_EXACTO) -> "ConteoDistinto":
+        return cls(exacto=hash_socios(valores), umbral=umbral)
+
+    @property
+    def es_exacto(self) -> bool:
+        return self.registros is None
+
+    def fusionar(self, otro: "ConteoDistinto") -> "ConteoDistinto":
+        """Unión de dos sketches (no modifica los originales)."""
+        if self.es_exacto and otro.es_exacto:
+            return ConteoDistinto(exacto=np.union1d(self.exacto, otro.exacto), umbral=self.umbral)
+        a = self.registros if not self.es_exacto else _registros_hll(self.exacto)
+        b = otro.registros if not otro.es_exacto else _registros_hll(otro.exacto)
+        return ConteoDistinto(registros=np.maximum(a, b), umbral=self.umbral)
+
+    def __or__(self, otro: "ConteoDistinto") -> "ConteoDistinto":
+        return self.fusionar(otro)
+
+    def estimar(self) -> int:
+        if self.es_exacto:
+            return int(len(self.exacto))
+        regs = self.registros.astype("float64")
+        alpha = 0.7213 / (1 + 1.079 / M)
+        est = alpha * M * M / np.sum(np.power(2.0, -regs))
+        ceros = int(np.count_nonzero(self.registros == 0))
+        if est <= 2.5 * M and ceros:
+            est = M * np.log(M / ceros)
+        return int(round(est))
+
+    def __len__(self) -> int:
+        return self.estimar()
+
+    def serializar(self) -> str:
+        """Texto compacto (cabe en una celda de Excel): 'E:' exacto o 'H:' HyperLogLog."""
+        if self.es_exacto:
+            return "E:" + base64.b64encode(zlib.compress(self.exacto.astype("<u8").tobytes(), 9)).decode("ascii")
+        return "H:" + base64.b64encode(zlib.compress(self.registros.tobytes(), 9)).decode("ascii")
+
+    @classmethod
+    def deserializar(cls, texto, umbral: int = UMBRAL_EXACTO) -> "ConteoDistinto":
+        if not isinstance(texto, str) or len(texto) < 2:
+            return cls(umbral=umbral)
+        datos = zlib.decompress(base64.b64decode(texto[2:]))
+        if texto.startswith("H:"):
+            return cls(registros=np.frombuffer(datos, dtype="uint8").copy(), umbral=umbral)
+        return cls(exacto=np.frombuffer(datos, dtype="<u8").astype("uint64"), umbral=umbral)
+
+
+def sketches_por_grupo(grupos: np.ndarray, hashes: np.ndarray) -> dict:
+    """Un sketch por valor de `grupos` (un solo ordenamiento y cortes por segmento)."""
+    grupos = np.asarray(grupos)
+    hashes = np.asarray(hashes, dtype="uint64")
+    orden = np.lexsort((hashes, grupos))
+    g = grupos[orden]
+    h = hashes[orden]
+    if len(g) == 0:
+        return {}
+    cortes = np.flatnonzero(g[1:] != g[:-1]) + 1
+    inicios = np.r_[0, cortes]
+    finales = np.r_[cortes, len(g)]
+    return {g[i].item(): ConteoDistinto.desde_hashes(h[i:j]) for i, j in zip(inicios, finales)}
+
+
+def fusionar_serializados(textos) -> str:
+    """Fusiona una lista de sketches serializados y devuelve el resultado serializado."""
+    acc = ConteoDistinto()
+    for t in textos:
+        acc = acc | ConteoDistinto.deserializar(t)
+    return acc.serializar()
+
+
+def estimar_serializado(texto) -> int:
+    return ConteoDistinto.deserializar(texto).estimar()